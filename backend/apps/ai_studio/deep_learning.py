@@ -3,6 +3,8 @@ Advanced Deep Learning Models for ShareWise AI
 Implements state-of-the-art neural networks for financial prediction
 """
 
+import os
+import math
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -25,22 +27,78 @@ DEVICE = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 print(f"Using device: {DEVICE}")
 
 
+def loader_options(pin_memory: Optional[bool] = None) -> Dict[str, Any]:
+    """DataLoader worker and pinning settings for this machine"""
+    # One core stays with the training loop; more than 4 workers rarely helps window slicing
+    num_workers = min(4, max((os.cpu_count() or 1) - 1, 0))
+    return {
+        'num_workers': num_workers,
+        'pin_memory': torch.cuda.is_available() if pin_memory is None else pin_memory,
+        'persistent_workers': num_workers > 0,
+    }
+
+
+def save_feature_memmap(features: np.ndarray, path: str) -> np.memmap:
+    """Write a (time x features) float32 array to a .npy file and reopen it memory-mapped"""
+    array = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=features.shape)
+    chunk = 100_000
+    for start in range(0, len(features), chunk):
+        array[start:start + chunk] = features[start:start + chunk]
+    array.flush()
+    return np.load(path, mmap_mode='r')
+
+
 class TimeSeriesDataset(Dataset):
-    """Custom dataset for time series financial data"""
+    """
+    Sliding windows over one contiguous (time x features) array.
+
+    Item ``i`` is ``features[start + i : start + i + sequence_length]`` with the
+    target at ``start + i + sequence_length``. Windows are sliced out on demand,
+    so memory is one copy of the features however long the windows are, and
+    train/validation/test splits are just index ranges over the same array.
+    ``features`` may be a read-only np.memmap (see save_feature_memmap) for
+    training sets that do not fit in RAM; only the windows in the current
+    batch are then read from disk.
+    """
     
-    def __init__(self, features: np.ndarray, targets: np.ndarray, sequence_length: int = 60):
-        self.features = torch.FloatTensor(features)
-        self.targets = torch.FloatTensor(targets)
+    def __init__(self, features: np.ndarray, targets: np.ndarray, sequence_length: int = 60,
+                 start: int = 0, end: Optional[int] = None):
         self.sequence_length = sequence_length
+        self.start = start
+        self.end = len(features) - sequence_length if end is None else end
+        self.targets = torch.as_tensor(np.asarray(targets, dtype=np.float32))
+        self._path = getattr(features, 'filename', None) if isinstance(features, np.memmap) else None
+        if self._path is not None:
+            self._array = features
+            self.features = None
+        else:
+            # Shares memory with the array; windows are views into it
+            self._array = None
+            self.features = torch.from_numpy(np.ascontiguousarray(features, dtype=np.float32))
         
     def __len__(self):
-        return len(self.features) - self.sequence_length
+        return max(self.end - self.start, 0)
     
     def __getitem__(self, idx):
-        return (
-            self.features[idx:idx + self.sequence_length],
-            self.targets[idx + self.sequence_length]
-        )
+        if idx < 0:
+            idx += len(self)
+        position = self.start + idx
+        window_end = position + self.sequence_length
+        if self.features is not None:
+            window = self.features[position:window_end]
+        else:
+            if self._array is None:
+                # Reopened lazily in DataLoader workers
+                self._array = np.load(self._path, mmap_mode='r')
+            window = torch.from_numpy(np.array(self._array[position:window_end], dtype=np.float32))
+        return window, self.targets[window_end]
+    
+    def __getstate__(self):
+        # Workers reopen the memmap rather than receiving a pickled copy of it
+        state = self.__dict__.copy()
+        if self._path is not None:
+            state['_array'] = None
+        return state
 
 
 class TransformerBlock(nn.Module):
@@ -385,43 +443,68 @@ class DeepFinancialPredictor:
         df: pd.DataFrame, 
         target_column: str,
         sequence_length: int = 60,
-        test_size: float = 0.2
+        test_size: float = 0.2,
+        memmap_path: Optional[str] = None
     ) -> Tuple[DataLoader, DataLoader, DataLoader]:
         """Prepare data for training"""
         
         # Extract features and target
         feature_columns = [col for col in df.columns if col != target_column]
-        features = df[feature_columns].values
-        targets = df[target_column].values
-        
-        # Scale features
-        features_scaled = self.scaler.fit_transform(features)
+        features = df[feature_columns].to_numpy(dtype=np.float32)
+        targets = df[target_column].to_numpy(dtype=np.float32)
         
-        # Create sequences
-        X, y = [], []
-        for i in range(len(features_scaled) - sequence_length):
-            X.append(features_scaled[i:i + sequence_length])
-            y.append(targets[i + sequence_length])
-        
-        X, y = np.array(X), np.array(y)
-        
-        # Train-validation-test split
-        X_temp, X_test, y_temp, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=42, shuffle=False
-        )
+        return self.prepare_arrays(features, targets, sequence_length, test_size, memmap_path=memmap_path)
+    
+    def prepare_arrays(
+        self,
+        features: np.ndarray,
+        targets: np.ndarray,
+        sequence_length: int = 60,
+        test_size: float = 0.2,
+        batch_size: int = 32,
+        memmap_path: Optional[str] = None,
+        scaler_sample_size: int = 1_000_000
+    ) -> Tuple[DataLoader, DataLoader, DataLoader]:
+        """
+        Scale ``features`` and build windowed loaders over a single copy of them.
+
+        ``features`` may be an np.memmap. With ``memmap_path`` the scaled
+        features are written there and read back memory-mapped, so neither
+        the input nor the scaled copy has to fit in RAM; the scaler is then
+        fitted on an evenly spaced sample of at most ``scaler_sample_size`` rows.
+        """
         
-        X_train, X_val, y_train, y_val = train_test_split(
-            X_temp, y_temp, test_size=0.2, random_state=42, shuffle=False
-        )
+        # Scale features
+        if memmap_path is None and not isinstance(features, np.memmap):
+            features_scaled = self.scaler.fit_transform(features).astype(np.float32, copy=False)
+        else:
+            step = max(len(features) // scaler_sample_size, 1)
+            self.scaler.fit(np.asarray(features[::step]))
+            path = memmap_path or f"{features.filename}.scaled.npy"
+            features_scaled = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=features.shape)
+            chunk = 100_000
+            for start in range(0, len(features), chunk):
+                features_scaled[start:start + chunk] = self.scaler.transform(np.asarray(features[start:start + chunk]))
+            features_scaled.flush()
+            features_scaled = np.load(path, mmap_mode='r')
+        
+        # Chronological train-validation-test split over window start positions
+        # (same boundaries train_test_split(shuffle=False) gave on the materialised windows)
+        n_windows = max(len(features_scaled) - sequence_length, 0)
+        n_test = math.ceil(n_windows * test_size)
+        n_temp = n_windows - n_test
+        n_val = math.ceil(n_temp * 0.2)
+        n_train = n_temp - n_val
         
         # Create datasets and dataloaders
-        train_dataset = TimeSeriesDataset(X_train, y_train, sequence_length=0)
-        val_dataset = TimeSeriesDataset(X_val, y_val, sequence_length=0)
-        test_dataset = TimeSeriesDataset(X_test, y_test, sequence_length=0)
-        
-        train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True, num_workers=4)
-        val_loader = DataLoader(val_dataset, batch_size=32, shuffle=False, num_workers=4)
-        test_loader = DataLoader(test_dataset, batch_size=32, shuffle=False, num_workers=4)
+        train_dataset = TimeSeriesDataset(features_scaled, targets, sequence_length, 0, n_train)
+        val_dataset = TimeSeriesDataset(features_scaled, targets, sequence_length, n_train, n_temp)
+        test_dataset = TimeSeriesDataset(features_scaled, targets, sequence_length, n_temp, n_windows)
+        
+        options = loader_options()
+        train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, **options)
+        val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False, **options)
+        test_loader = DataLoader(test_dataset, batch_size=batch_size, shuffle=False, **options)
         
         return train_loader, val_loader, test_loader
     
@@ -7,6 +7,8 @@ from typing import Dict, List, Any, Tuple, Optional
 from datetime import datetime, timedelta
 import math
 
+from apps.trading.option_pricing import black_scholes
+
 
 class FnOBacktester:
     """Backtesting engine specialized for F&O strategies"""
@@ -22,34 +24,8 @@ class FnOBacktester:
         """
         Calculate Black-Scholes Greeks for options
         """
-        from scipy.stats import norm
-        import math
-        
-        # Black-Scholes calculations
-        d1 = (math.log(spot / strike) + (risk_free_rate + 0.5 * volatility ** 2) * time_to_expiry) / (volatility * math.sqrt(time_to_expiry))
-        d2 = d1 - volatility * math.sqrt(time_to_expiry)
-        
-        if option_type.lower() == 'call':
-            delta = norm.cdf(d1)
-            option_price = spot * norm.cdf(d1) - strike * math.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2)
-        else:  # put
-            delta = -norm.cdf(-d1)
-            option_price = strike * math.exp(-risk_free_rate * time_to_expiry) * norm.cdf(-d2) - spot * norm.cdf(-d1)
-        
-        gamma = norm.pdf(d1) / (spot * volatility * math.sqrt(time_to_expiry))
-        theta = -(spot * norm.pdf(d1) * volatility) / (2 * math.sqrt(time_to_expiry)) - \
-                risk_free_rate * strike * math.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2 if option_type.lower() == 'call' else -d2)
-        vega = spot * norm.pdf(d1) * math.sqrt(time_to_expiry)
-        rho = strike * time_to_expiry * math.exp(-risk_free_rate * time_to_expiry) * norm.cdf(d2 if option_type.lower() == 'call' else -d2)
-        
-        return {
-            'price': option_price,
-            'delta': delta,
-            'gamma': gamma,
-            'theta': theta / 365,  # Per day
-            'vega': vega / 100,    # Per 1% volatility change
-            'rho': rho / 100       # Per 1% interest rate change
-        }
+        greeks = black_scholes(spot, strike, time_to_expiry, volatility, risk_free_rate, option_type)
+        return {name: float(value) for name, value in greeks.items()}
     
     def backtest_options_strategy(self, strategy_config: Dict, market_data: pd.DataFrame) -> Dict[str, Any]:
         """
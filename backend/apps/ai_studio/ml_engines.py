@@ -252,18 +252,40 @@ class DeepLearningEngine(MLEngine):
         return model
     
     def prepare_sequences(self, X: np.ndarray, y: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        """Prepare sequences for LSTM/CNN models"""
+        """
+        Prepare sequences for LSTM/CNN models.
+
+        Returns a read-only strided view of shape (len(X) - sequence_length,
+        sequence_length, n_features) over ``X`` itself, paired with
+        y[sequence_length:]. Nothing is copied here.
+        """
         if self.model_type not in ['lstm', 'cnn', 'transformer']:
             return X, y
         
-        X_seq = []
-        y_seq = []
-        
-        for i in range(self.sequence_length, len(X)):
-            X_seq.append(X[i-self.sequence_length:i])
-            y_seq.append(y[i])
+        length = self.sequence_length
+        if len(X) <= length:
+            return np.empty((0, length, X.shape[1]), dtype=X.dtype), np.asarray(y)[:0]
         
-        return np.array(X_seq), np.array(y_seq)
+        windows = np.lib.stride_tricks.sliding_window_view(X, length, axis=0)[:-1]
+        return windows.transpose(0, 2, 1), np.asarray(y)[length:]
+    
+    def window_dataset(self, X: np.ndarray, y: Optional[np.ndarray] = None, shuffle: bool = False):
+        """
+        tf.data pipeline that cuts the same windows as prepare_sequences per batch.
+
+        Keras would materialise a strided view into a full (windows x
+        sequence_length x features) tensor; this keeps one copy of ``X``.
+        """
+        length = self.sequence_length
+        dataset = keras.utils.timeseries_dataset_from_array(
+            X[:-1],
+            np.asarray(y)[length:] if y is not None else None,
+            sequence_length=length,
+            batch_size=self.model_config.get('batch_size', 32),
+            shuffle=shuffle,
+            seed=42 if shuffle else None,
+        )
+        return dataset.prefetch(tf.data.AUTOTUNE)
     
     def train(self, X_train: np.ndarray, y_train: np.ndarray, 
               X_val: np.ndarray = None, y_val: np.ndarray = None) -> Dict[str, Any]:
@@ -277,22 +299,13 @@ class DeepLearningEngine(MLEngine):
         else:
             X_val_scaled = None
         
-        # Prepare sequences if needed
-        if self.model_type in ['lstm', 'cnn', 'transformer']:
-            X_train_seq, y_train_seq = self.prepare_sequences(X_train_scaled, y_train)
-            if X_val_scaled is not None:
-                X_val_seq, y_val_seq = self.prepare_sequences(X_val_scaled, y_val)
-            else:
-                X_val_seq, y_val_seq = None, None
-        else:
-            X_train_seq, y_train_seq = X_train_scaled, y_train
-            X_val_seq, y_val_seq = X_val_scaled, y_val
+        sequential = self.model_type in ['lstm', 'cnn', 'transformer']
         
         # Build model
-        if self.model_type in ['lstm', 'cnn', 'transformer']:
-            input_shape = (X_train_seq.shape[1], X_train_seq.shape[2])
+        if sequential:
+            input_shape = (self.sequence_length, X_train_scaled.shape[1])
         else:
-            input_shape = (X_train_seq.shape[1],)
+            input_shape = (X_train_scaled.shape[1],)
         
         self.model = self.build_model(input_shape)
         
@@ -312,18 +325,32 @@ class DeepLearningEngine(MLEngine):
         ]
         
         # Training
-        validation_data = None
-        if X_val_seq is not None and y_val_seq is not None:
-            validation_data = (X_val_seq, y_val_seq)
-        
-        history = self.model.fit(
-            X_train_seq, y_train_seq,
-            validation_data=validation_data,
-            epochs=self.model_config.get('epochs', 100),
-            batch_size=self.model_config.get('batch_size', 32),
-            callbacks=callbacks,
-            verbose=1
-        )
+        if sequential:
+            # Windows are cut per batch from the scaled arrays
+            validation_data = None
+            if X_val_scaled is not None and y_val is not None:
+                validation_data = self.window_dataset(X_val_scaled, y_val)
+            
+            history = self.model.fit(
+                self.window_dataset(X_train_scaled, y_train, shuffle=True),
+                validation_data=validation_data,
+                epochs=self.model_config.get('epochs', 100),
+                callbacks=callbacks,
+                verbose=1
+            )
+        else:
+            validation_data = None
+            if X_val_scaled is not None and y_val is not None:
+                validation_data = (X_val_scaled, y_val)
+            
+            history = self.model.fit(
+                X_train_scaled, y_train,
+                validation_data=validation_data,
+                epochs=self.model_config.get('epochs', 100),
+                batch_size=self.model_config.get('batch_size', 32),
+                callbacks=callbacks,
+                verbose=1
+            )
         
         # Return training metrics
         return {
@@ -339,8 +366,7 @@ class DeepLearningEngine(MLEngine):
         X_scaled = self.scaler.transform(X)
         
         if self.model_type in ['lstm', 'cnn', 'transformer']:
-            X_seq, _ = self.prepare_sequences(X_scaled, np.zeros(len(X_scaled)))
-            return self.model.predict(X_seq)
+            return self.model.predict(self.window_dataset(X_scaled))
         else:
             return self.model.predict(X_scaled)
 
@@ -613,11 +639,25 @@ class AdvancedFeatureEngineer:
             df['time_to_expiry'] = pd.to_datetime(df['expiry_date']) - pd.to_datetime(df['date'])
             df['time_to_expiry_days'] = df['time_to_expiry'].dt.days
             
+            # Black-Scholes Greeks for every row in one vectorized pass
+            if 'delta' not in df.columns and 'implied_volatility' in df.columns:
+                from apps.trading.option_pricing import black_scholes
+                greeks = black_scholes(
+                    df['underlying_price'].to_numpy(dtype=float),
+                    df['strike_price'].to_numpy(dtype=float),
+                    df['time_to_expiry'].dt.total_seconds().to_numpy() / (365 * 86400),
+                    df['implied_volatility'].to_numpy(dtype=float),
+                    option_type=df['option_type'].to_numpy(),
+                )
+                for name in ('delta', 'gamma', 'theta', 'vega'):
+                    df[name] = greeks[name]
+            
             # Implied volatility features
             df['iv_rank'] = df.groupby('symbol')['implied_volatility'].rank(pct=True)
-            df['iv_percentile'] = df.groupby('symbol')['implied_volatility'].rolling(252).apply(
-                lambda x: (x.iloc[-1] <= x).mean()
-            )
+            # Share of the symbol's last 252 observations at or below the current IV (rolling rank)
+            df['iv_percentile'] = df.groupby('symbol')['implied_volatility'].rolling(252).rank(
+                method='max', pct=True
+            ).reset_index(level=0, drop=True)
         
         if 'futures_price' in df.columns:
             # Futures features
@@ -0,0 +1,231 @@
+"""
+Model Artifacts for ShareWise AI
+One on-disk layout for trained models, shared by the Django app and the
+standalone ml_server (so this module must not import Django):
+
+    <root>/model_<model_id>/
+        CURRENT                     version currently served
+        v<version>/manifest.json    feature names, version, format, checksum
+        v<version>/model.joblib     uncompressed joblib (or model.h5 / model.json)
+
+joblib artifacts are written uncompressed so their NumPy arrays can be loaded
+with ``mmap_mode='r'``: every process that loads the same version maps the
+same file, and the arrays are shared through the OS page cache instead of
+each worker holding its own decompressed copy. Finding the current version is
+one small file read rather than a directory glob, and a version directory is
+never modified once published (CURRENT is switched atomically).
+"""
+import os
+import json
+import shutil
+import hashlib
+import logging
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone as dt_timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+CURRENT_NAME = 'CURRENT'
+
+FORMAT_FILES = {
+    'joblib': 'model.joblib',
+    'keras': 'model.h5',
+    'xgboost': 'model.json',
+}
+
+
+@dataclass
+class ArtifactManifest:
+    """Everything needed to load and feed one model version"""
+    model_id: str
+    version: str
+    format: str
+    filename: str
+    checksum: str  # sha256 of the model file
+    file_size: int
+    feature_names: List[str] = field(default_factory=list)
+    model_class: Optional[str] = None
+    model_type: Optional[str] = None
+    target_variable: Optional[str] = None
+    created_at: Optional[str] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ArtifactManifest':
+        known = {name: data[name] for name in cls.__dataclass_fields__ if name in data}
+        return cls(**known)
+
+
+def file_checksum(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_format(model: Any) -> str:
+    """Serialization used for ``model`` (same precedence as the old save_model_file)"""
+    if hasattr(model, 'save'):  # TensorFlow/Keras models
+        return 'keras'
+    if hasattr(model, 'save_model'):  # XGBoost models
+        return 'xgboost'
+    return 'joblib'
+
+
+class ModelArtifactStore:
+    """Versioned model artifacts under ``root``"""
+
+    def __init__(self, root: str, keep_versions: int = 2):
+        self.root = root
+        self.keep_versions = keep_versions
+
+    def model_dir(self, model_id) -> str:
+        return os.path.join(self.root, f"model_{model_id}")
+
+    @staticmethod
+    def is_artifact_dir(path: Optional[str]) -> bool:
+        return bool(path) and os.path.isfile(os.path.join(path, CURRENT_NAME))
+
+    # Writing
+
+    def save(self, model: Any, model_id, feature_names: Optional[List[str]] = None,
+             **metadata) -> ArtifactManifest:
+        """Write a new version of ``model_id`` and make it current"""
+        model_id = str(model_id)
+        model_dir = self.model_dir(model_id)
+        os.makedirs(model_dir, exist_ok=True)
+
+        version = datetime.now(dt_timezone.utc).strftime('%Y%m%d%H%M%S%f')
+        staging = os.path.join(model_dir, f".v{version}.{os.getpid()}.tmp")
+        os.makedirs(staging)
+        try:
+            fmt = artifact_format(model)
+            filename = FORMAT_FILES[fmt]
+            model_path = os.path.join(staging, filename)
+            if fmt == 'keras':
+                model.save(model_path)
+            elif fmt == 'xgboost':
+                model.save_model(model_path)
+            else:
+                # Uncompressed, so NumPy arrays can be memory-mapped on load
+                joblib.dump(model, model_path, compress=0)
+
+            manifest = ArtifactManifest(
+                model_id=model_id,
+                version=version,
+                format=fmt,
+                filename=filename,
+                checksum=file_checksum(model_path),
+                file_size=os.path.getsize(model_path),
+                feature_names=[str(name) for name in (feature_names or [])],
+                model_class=type(model).__name__,
+                model_type=metadata.pop('model_type', None),
+                target_variable=metadata.pop('target_variable', None),
+                created_at=datetime.now(dt_timezone.utc).isoformat(),
+                extra=metadata,
+            )
+            with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+                json.dump(manifest.to_dict(), f, indent=2)
+            os.rename(staging, os.path.join(model_dir, f"v{version}"))
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._set_current(model_dir, version)
+        self.prune(model_id)
+        logger.info(f"Model artifact saved: {model_dir} v{version} ({manifest.file_size} bytes)")
+        return manifest
+
+    @staticmethod
+    def _set_current(model_dir: str, version: str) -> None:
+        pointer = os.path.join(model_dir, CURRENT_NAME)
+        staging = f"{pointer}.{os.getpid()}.tmp"
+        with open(staging, 'w') as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(staging, pointer)
+
+    def prune(self, model_id, keep: Optional[int] = None) -> List[str]:
+        """Remove all but the newest ``keep`` versions (the current one is always kept)"""
+        keep = self.keep_versions if keep is None else keep
+        model_dir = self.model_dir(model_id)
+        current = self.current_version(model_id)
+        versions = sorted(self.versions(model_id), reverse=True)
+        removed = []
+        for version in versions[max(keep, 1):]:
+            if version == current:
+                continue
+            # Processes that still map the old file keep their pages until they drop it
+            shutil.rmtree(os.path.join(model_dir, f"v{version}"), ignore_errors=True)
+            removed.append(version)
+        return removed
+
+    def delete(self, model_id) -> None:
+        shutil.rmtree(self.model_dir(model_id), ignore_errors=True)
+
+    # Reading
+
+    def versions(self, model_id) -> List[str]:
+        model_dir = self.model_dir(model_id)
+        if not os.path.isdir(model_dir):
+            return []
+        return [name[1:] for name in os.listdir(model_dir)
+                if name.startswith('v') and os.path.isdir(os.path.join(model_dir, name))]
+
+    def current_version(self, model_id) -> Optional[str]:
+        try:
+            with open(os.path.join(self.model_dir(model_id), CURRENT_NAME)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def manifest(self, model_id, version: Optional[str] = None) -> Optional[ArtifactManifest]:
+        version = version or self.current_version(model_id)
+        if version is None:
+            return None
+        path = os.path.join(self.model_dir(model_id), f"v{version}", MANIFEST_NAME)
+        try:
+            with open(path) as f:
+                return ArtifactManifest.from_dict(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def load(self, model_id, version: Optional[str] = None, mmap: bool = True,
+             verify: bool = True) -> Tuple[Any, ArtifactManifest]:
+        """
+        Load ``version`` (default: current) of ``model_id``; returns (model, manifest).
+
+        joblib artifacts are memory-mapped read-only unless ``mmap`` is False.
+        Raises FileNotFoundError for unknown models and ValueError when the
+        checksum does not match.
+        """
+        manifest = self.manifest(model_id, version)
+        if manifest is None:
+            raise FileNotFoundError(f"No model artifact for {model_id}")
+        path = os.path.join(self.model_dir(model_id), f"v{manifest.version}", manifest.filename)
+        if verify and file_checksum(path) != manifest.checksum:
+            raise ValueError(f"Checksum mismatch for model {model_id} v{manifest.version}")
+
+        if manifest.format == 'keras':
+            import tensorflow as tf
+            model = tf.keras.models.load_model(path)
+        elif manifest.format == 'xgboost':
+            import xgboost as xgb
+            # Rebuild the saved type (XGBRegressor, XGBRanker, Booster, ...); older manifests default to the classifier
+            model_class = getattr(xgb, manifest.model_class or '', None)
+            if not (isinstance(model_class, type) and hasattr(model_class, 'load_model')):
+                model_class = xgb.XGBClassifier
+            model = model_class()
+            model.load_model(path)
+        else:
+            model = joblib.load(path, mmap_mode='r' if mmap else None)
+        return model, manifest
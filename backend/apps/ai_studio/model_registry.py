@@ -0,0 +1,205 @@
+"""
+Model Registry for ShareWise AI
+Keeps deserialized trained models warm inside the Django process so
+predictions do not re-read and unpickle the model file on every request.
+Entries are keyed by (model_id, version): the artifact version from the
+CURRENT pointer for models saved through ModelArtifactStore (whose arrays are
+memory-mapped and shared between workers), or path, mtime and size for older
+single-file models. A retrained model gets a new key even when it was written
+by another process (e.g. a Celery worker), and the stale version is dropped
+on the next lookup. The cache is LRU with a cap on entries and on the
+estimated memory held.
+"""
+import os
+import pickle
+import logging
+import threading
+import warnings
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+from django.conf import settings
+
+from .model_artifacts import ModelArtifactStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadedModel:
+    """A deserialized model and what is needed to feed it"""
+    model_id: str
+    version: tuple
+    model: Any = field(repr=False)
+    feature_names: List[str]
+    model_type: Optional[str] = None
+    target_variable: Optional[str] = None
+    created_at: Optional[str] = None
+    size_bytes: int = 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The dict load_trained_model has always returned"""
+        return {
+            'model': self.model,
+            'feature_names': self.feature_names,
+            'model_type': self.model_type,
+            'target_variable': self.target_variable,
+            'created_at': self.created_at,
+        }
+
+    def feature_row(self, input_data: Dict[str, Any]) -> np.ndarray:
+        """One (1 x n_features) row in feature_names order"""
+        names = self.feature_names
+        return np.fromiter((float(input_data[name]) for name in names), dtype=np.float64,
+                           count=len(names)).reshape(1, -1)
+
+    def predict(self, features: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """(predictions, probabilities); classifiers run predict_proba once and take the argmax class"""
+        model = self.model
+        with warnings.catch_warnings():
+            # Models fitted on DataFrames warn on every ndarray call; the row is built in feature_names order
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            if hasattr(model, 'predict_proba') and hasattr(model, 'classes_'):
+                probabilities = np.asarray(model.predict_proba(features))
+                return np.asarray(model.classes_)[np.argmax(probabilities, axis=1)], probabilities
+            return np.asarray(model.predict(features)), None
+
+
+def _read_model_file(path: str) -> Any:
+    if path.endswith('.joblib'):
+        return joblib.load(path)
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class ModelRegistry:
+    """LRU cache of LoadedModel keyed by (model_id, version)"""
+
+    def __init__(self, max_models: Optional[int] = None, memory_budget_mb: Optional[int] = None):
+        self.max_models = max_models or getattr(settings, 'ML_MODEL_REGISTRY_MAX_MODELS', 8)
+        self.memory_budget = (memory_budget_mb or getattr(settings, 'ML_MODEL_REGISTRY_MEMORY_MB', 512)) * 1024 * 1024
+        self._entries: 'OrderedDict[Tuple[str, tuple], LoadedModel]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def file_version(path: str) -> tuple:
+        if ModelArtifactStore.is_artifact_dir(path):
+            store = ModelArtifactStore(os.path.dirname(path))
+            return path, store.current_version(os.path.basename(path)[len('model_'):])
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def get(self, ml_model) -> LoadedModel:
+        """
+        The current version of ``ml_model``'s trained model, loading it on a miss.
+
+        Raises FileNotFoundError when the model has no file on disk.
+        """
+        path = ml_model.model_file_path
+        if not path or not os.path.exists(path):
+            raise FileNotFoundError("Model file not found")
+
+        model_id = str(ml_model.id)
+        key = (model_id, self.file_version(path))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            load_lock = self._load_locks.setdefault(model_id, threading.Lock())
+
+        # One load per model at a time; concurrent requests wait for it instead of unpickling in parallel
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+            entry = self._load(ml_model, model_id, key[1])
+            with self._lock:
+                self.misses += 1
+                for stale in [k for k in self._entries if k[0] == model_id]:
+                    del self._entries[stale]
+                self._entries[key] = entry
+                self._evict()
+        logger.info(f"Loaded model {model_id} into registry ({entry.size_bytes / 1024 / 1024:.1f} MB)")
+        return entry
+
+    def _load(self, ml_model, model_id: str, version: tuple) -> LoadedModel:
+        path = version[0]
+        if ModelArtifactStore.is_artifact_dir(path):
+            store = ModelArtifactStore(os.path.dirname(path))
+            model, manifest = store.load(os.path.basename(path)[len('model_'):], version[1])
+            return LoadedModel(
+                model_id=model_id, version=version, model=model,
+                feature_names=manifest.feature_names or list(ml_model.features or []),
+                model_type=manifest.model_type or ml_model.model_type,
+                target_variable=manifest.target_variable or ml_model.target_variable,
+                created_at=manifest.created_at, size_bytes=manifest.file_size,
+            )
+
+        size = version[2]
+        data = _read_model_file(path)
+        if isinstance(data, dict) and 'model' in data:
+            # ModelTrainer._save_model bundle
+            return LoadedModel(
+                model_id=model_id, version=version, model=data['model'],
+                feature_names=list(data.get('feature_names') or []),
+                model_type=data.get('model_type'), target_variable=data.get('target_variable'),
+                created_at=data.get('created_at'), size_bytes=size,
+            )
+
+        # Bare estimator (tasks.save_model_file); feature names come from the model row
+        feature_names = (ml_model.training_results or {}).get('feature_names') or ml_model.features or \
+            list(getattr(data, 'feature_names_in_', []))
+        return LoadedModel(
+            model_id=model_id, version=version, model=data, feature_names=list(feature_names),
+            model_type=ml_model.model_type, target_variable=ml_model.target_variable,
+            created_at=ml_model.training_completed_at.isoformat() if ml_model.training_completed_at else None,
+            size_bytes=size,
+        )
+
+    def _evict(self) -> None:
+        # File size stands in for resident size; the newest entry always stays
+        used = sum(entry.size_bytes for entry in self._entries.values())
+        while len(self._entries) > 1 and (len(self._entries) > self.max_models or used > self.memory_budget):
+            (model_id, _), entry = self._entries.popitem(last=False)
+            used -= entry.size_bytes
+            logger.info(f"Evicted model {model_id} from registry")
+
+    def invalidate(self, model_id) -> None:
+        """Drop every cached version of ``model_id`` (called when a new version is saved)"""
+        model_id = str(model_id)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == model_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'models': len(self._entries),
+                'memory_bytes': sum(entry.size_bytes for entry in self._entries.values()),
+                'memory_budget_bytes': self.memory_budget,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Global instances
+artifact_store = ModelArtifactStore(
+    getattr(settings, 'ML_MODEL_ARTIFACT_ROOT', os.path.join(settings.MEDIA_ROOT, 'ml_models')),
+    keep_versions=getattr(settings, 'ML_MODEL_ARTIFACT_KEEP_VERSIONS', 2),
+)
+model_registry = ModelRegistry()
@@ -2,6 +2,7 @@ from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from .models import MLModel, ModelLeasing
+from .model_registry import model_registry
 import logging
 
 User = get_user_model()
@@ -38,10 +39,16 @@ def model_leased(sender, instance, created, **kwargs):
 @receiver(post_delete, sender=MLModel)
 def cleanup_model_files(sender, instance, **kwargs):
     """Clean up model files when model is deleted"""
+    model_registry.invalidate(instance.id)
     if instance.model_file_path:
         try:
             import os
-            if os.path.exists(instance.model_file_path):
+            import shutil
+            if os.path.isdir(instance.model_file_path):
+                # Artifact directory with all saved versions
+                shutil.rmtree(instance.model_file_path)
+                logger.info(f"Cleaned up model file: {instance.model_file_path}")
+            elif os.path.exists(instance.model_file_path):
                 os.remove(instance.model_file_path)
                 logger.info(f"Cleaned up model file: {instance.model_file_path}")
         except Exception as e:
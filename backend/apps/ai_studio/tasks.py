@@ -1,13 +1,17 @@
 import os
 import json
 import pickle
+import hashlib
 import joblib
 from datetime import datetime, timedelta
 from celery import shared_task
 from django.utils import timezone
 from django.conf import settings
+from django.core.cache import cache
 import logging
 
+from .model_registry import model_registry, artifact_store
+
 try:
     import pandas as pd
     import numpy as np
@@ -173,7 +177,7 @@ def start_model_training(self, model_id, training_job_id):
         backtest_results = run_backtest(trained_model, X_test, y_test)
         
         # Save model file
-        model_file_path = save_model_file(trained_model, model_id)
+        model_file_path = save_model_file(trained_model, model_id, list(getattr(X, 'columns', model.features)))
         
         # Update model with results
         model.accuracy = metrics['accuracy']
@@ -233,12 +237,42 @@ def start_model_training(self, model_id, training_job_id):
         raise e
 
 
+TRAINING_SYMBOLS = ['NIFTY', 'BANKNIFTY', 'FINNIFTY', 'RELIANCE', 'TCS']
+FNO_MODEL_TYPES = ['OPTIONS_STRATEGY', 'FUTURES_MOMENTUM', 'VOLATILITY_TRADING']
+
+
+def feature_set_cache_key(symbols, period_days, end_date, feature_groups):
+    """Cache key for an engineered training frame: (symbol set, window, feature groups)"""
+    spec = json.dumps({
+        'symbols': sorted(symbols),
+        'window': [period_days, end_date.strftime('%Y%m%d%H')],
+        'features': list(feature_groups),
+    }, sort_keys=True)
+    return f"feature_set:{hashlib.sha256(spec.encode()).hexdigest()[:32]}"
+
+
 def prepare_training_data(model):
-    """Prepare enhanced training data for the model"""
+    """
+    Prepare enhanced training data for the model.
+
+    The engineered frame is cached per (symbol set, window, feature groups),
+    so retraining and hyperparameter searches over the same window reuse it
+    instead of rebuilding every feature.
+    """
     try:
         end_date = datetime.now()
         start_date = end_date - timedelta(days=model.training_period_days)
-        
+
+        include_fno = model.model_type in FNO_MODEL_TYPES
+        feature_groups = ['technical', 'fno' if include_fno else None, 'lag:close,volume,volatility:1,2,3,5',
+                          'rolling:returns:5,10,20', 'signal_type']
+        cache_key = feature_set_cache_key(TRAINING_SYMBOLS, model.training_period_days, end_date,
+                                          [group for group in feature_groups if group])
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Reusing cached feature set ({len(cached)} samples, {len(cached.columns)} features)")
+            return cached.copy()
+
         # Enhanced mock data generation with realistic patterns
         np.random.seed(42)
         n_samples = model.training_period_days * 10  # 10 samples per day
@@ -246,11 +280,7 @@ def prepare_training_data(model):
         # Generate base price series with trends
         base_price = 1500
         price_changes = np.random.normal(0, 0.02, n_samples)  # 2% daily volatility
-        prices = [base_price]
-        for change in price_changes:
-            new_price = prices[-1] * (1 + change)
-            prices.append(new_price)
-        prices = np.array(prices[1:])
+        prices = base_price * np.cumprod(1 + price_changes)
         
         # Generate volume with inverse correlation to price changes
         volumes = 50000 + np.random.normal(0, 15000, n_samples) + \
@@ -260,7 +290,7 @@ def prepare_training_data(model):
         # Create comprehensive dataset
         data = {
             'timestamp': pd.date_range(start=start_date, end=end_date, periods=n_samples),
-            'symbol': np.random.choice(['NIFTY', 'BANKNIFTY', 'FINNIFTY', 'RELIANCE', 'TCS'], n_samples),
+            'symbol': np.random.choice(TRAINING_SYMBOLS, n_samples),
             'open': prices + np.random.normal(0, prices * 0.001),
             'high': prices + np.abs(np.random.normal(0, prices * 0.005)),
             'low': prices - np.abs(np.random.normal(0, prices * 0.005)),
@@ -275,7 +305,7 @@ def prepare_training_data(model):
         df = AdvancedFeatureEngineer.create_technical_features(df)
         
         # Add F&O specific features if applicable
-        if model.model_type in ['OPTIONS_STRATEGY', 'FUTURES_MOMENTUM', 'VOLATILITY_TRADING']:
+        if include_fno:
             # Add mock F&O data
             df['strike_price'] = df['close'] + np.random.normal(0, 100, len(df))
             df['implied_volatility'] = 0.2 + np.random.normal(0, 0.05, len(df))
@@ -301,8 +331,9 @@ def prepare_training_data(model):
         # Remove NaN values
         df = df.dropna()
         
+        cache.set(cache_key, df, getattr(settings, 'FEATURE_SET_CACHE_TTL', 3600))
         logger.info(f"Generated {len(df)} samples with {len(df.columns)} features")
-        return df
+        return df.copy()
         
     except Exception as e:
         logger.error(f"Error preparing training data: {str(e)}")
@@ -311,55 +342,40 @@ def prepare_training_data(model):
 
 def generate_intelligent_signals(df):
     """Generate intelligent buy/sell signals based on technical analysis"""
-    signals = []
+    # Multi-factor signal generation, scored over whole columns
+    buy_signals = np.zeros(len(df), dtype=np.int64)
+    sell_signals = np.zeros(len(df), dtype=np.int64)
     
-    for i in range(len(df)):
-        # Multi-factor signal generation
-        buy_signals = 0
-        sell_signals = 0
-        
-        # RSI signals
-        if 'rsi' in df.columns:
-            rsi = df.iloc[i]['rsi']
-            if rsi < 30:
-                buy_signals += 2
-            elif rsi > 70:
-                sell_signals += 2
-        
-        # MACD signals
-        if 'macd' in df.columns and 'macd_signal' in df.columns:
-            macd = df.iloc[i]['macd']
-            macd_signal = df.iloc[i]['macd_signal']
-            if macd > macd_signal:
-                buy_signals += 1
-            else:
-                sell_signals += 1
-        
-        # Bollinger Band signals
-        if 'bb_position' in df.columns:
-            bb_pos = df.iloc[i]['bb_position']
-            if bb_pos < 0.2:
-                buy_signals += 1
-            elif bb_pos > 0.8:
-                sell_signals += 1
-        
-        # Price momentum
-        if 'price_to_sma_20' in df.columns:
-            price_ratio = df.iloc[i]['price_to_sma_20']
-            if price_ratio > 1.02:
-                buy_signals += 1
-            elif price_ratio < 0.98:
-                sell_signals += 1
-        
-        # Determine final signal
-        if buy_signals > sell_signals + 1:
-            signals.append('BUY')
-        elif sell_signals > buy_signals + 1:
-            signals.append('SELL')
-        else:
-            signals.append('HOLD')
+    # RSI signals
+    if 'rsi' in df.columns:
+        rsi = df['rsi'].to_numpy(dtype=np.float64)
+        buy_signals += np.where(rsi < 30, 2, 0)
+        sell_signals += np.where(rsi > 70, 2, 0)
+    
+    # MACD signals (a missing value counts as a sell, as a failed comparison always has)
+    if 'macd' in df.columns and 'macd_signal' in df.columns:
+        macd_above = df['macd'].to_numpy(dtype=np.float64) > df['macd_signal'].to_numpy(dtype=np.float64)
+        buy_signals += macd_above
+        sell_signals += ~macd_above
+    
+    # Bollinger Band signals
+    if 'bb_position' in df.columns:
+        bb_pos = df['bb_position'].to_numpy(dtype=np.float64)
+        buy_signals += bb_pos < 0.2
+        sell_signals += bb_pos > 0.8
+    
+    # Price momentum
+    if 'price_to_sma_20' in df.columns:
+        price_ratio = df['price_to_sma_20'].to_numpy(dtype=np.float64)
+        buy_signals += price_ratio > 1.02
+        sell_signals += price_ratio < 0.98
     
-    return signals
+    # Determine final signal
+    return np.select(
+        [buy_signals > sell_signals + 1, sell_signals > buy_signals + 1],
+        ['BUY', 'SELL'],
+        default='HOLD'
+    ).tolist()
 
 
 def engineer_features(data, selected_features, target_variable):
@@ -799,44 +815,14 @@ def run_backtest(model, X_test, y_test):
         }
 
 
-def save_model_file(model, model_id):
-    """Save trained model to file with enhanced serialization"""
+def save_model_file(model, model_id, feature_names=None):
+    """Save trained model as a new artifact version (memory-mappable, with manifest)"""
     try:
-        # Create models directory if it doesn't exist
-        models_dir = os.path.join(settings.BASE_DIR, 'media', 'ml_models')
-        os.makedirs(models_dir, exist_ok=True)
-        
-        # Save model with timestamp
-        timestamp = int(datetime.now().timestamp())
-        model_filename = f"model_{model_id}_{timestamp}"
-        
-        # Choose appropriate serialization method
-        if hasattr(model, 'save'):  # TensorFlow/Keras models
-            model_path = os.path.join(models_dir, f"{model_filename}.h5")
-            model.save(model_path)
-        elif hasattr(model, 'save_model'):  # XGBoost/LightGBM models
-            model_path = os.path.join(models_dir, f"{model_filename}.model")
-            model.save_model(model_path)
-        else:
-            # Use joblib for sklearn models (better than pickle for large arrays)
-            model_path = os.path.join(models_dir, f"{model_filename}.joblib")
-            joblib.dump(model, model_path, compress=3)
-        
-        # Also save metadata
-        metadata = {
-            'model_id': model_id,
-            'timestamp': timestamp,
-            'model_type': type(model).__name__,
-            'serialization_method': 'tensorflow' if hasattr(model, 'save') else 
-                                  'xgboost' if hasattr(model, 'save_model') else 'joblib',
-            'file_size': os.path.getsize(model_path) if os.path.exists(model_path) else 0
-        }
-        
-        metadata_path = os.path.join(models_dir, f"{model_filename}_metadata.json")
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        manifest = artifact_store.save(model, model_id, feature_names=feature_names)
+        model_registry.invalidate(model_id)
         
-        logger.info(f"Model saved: {model_path} (Size: {metadata['file_size']} bytes)")
+        model_path = artifact_store.model_dir(model_id)
+        logger.info(f"Model saved: {model_path} v{manifest.version} (Size: {manifest.file_size} bytes)")
         return model_path
         
     except Exception as e:
@@ -15,8 +15,11 @@ from typing import Dict, List, Any, Optional, Tuple
 from decimal import Decimal
 
 from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import FilteredRelation, Q
+from django.db.models.fields.json import KT
 
 # ML Libraries
 from sklearn.model_selection import train_test_split, GridSearchCV, TimeSeriesSplit
@@ -65,6 +68,7 @@ except ImportError as e:
     print("To enable: pip install torch pytorch-lightning optuna tensorboard")
 
 from .models import MLModel, TrainingJob
+from .model_registry import model_registry, artifact_store
 from apps.trading.models import TradingSignal, TradingOrder, AutomatedTradeExecution
 
 logger = logging.getLogger(__name__)
@@ -117,6 +121,12 @@ class ModelDataProcessor:
         self.model = model
         self.logger = logging.getLogger(f"{__name__}.{self.__class__.__name__}")
     
+    # Indicator keys read from signal.market_data['technical_indicators'], with their defaults
+    INDICATOR_DEFAULTS = {
+        'rsi': 50, 'macd': 0, 'macd_signal': 0, 'sma_20': 0, 'sma_50': 0, 'ema_12': 0, 'ema_26': 0,
+        'bb_upper': 0, 'bb_lower': 0, 'atr': 0, 'volume_ratio': 1, 'volatility': 0, 'price_change': 0,
+    }
+    
     def fetch_training_data(self) -> pd.DataFrame:
         """Fetch historical trading data for model training"""
         
@@ -124,77 +134,78 @@ class ModelDataProcessor:
         end_date = timezone.now()
         start_date = end_date - timedelta(days=self.model.training_period_days)
         
-        # Fetch trading signals and executions
-        signals = TradingSignal.objects.filter(
-            user=self.model.user,
-            created_at__range=[start_date, end_date]
-        ).select_related('user')
-        
-        executions = AutomatedTradeExecution.objects.filter(
-            signal__user=self.model.user,
-            created_at__range=[start_date, end_date],
-            status=AutomatedTradeExecution.ExecutionStatus.COMPLETED
-        ).select_related('signal')
-        
-        # Convert to DataFrame
-        data_rows = []
-        
-        for signal in signals:
-            # Find corresponding execution
-            execution = executions.filter(signal=signal).first()
-            
-            # Extract features from market data
-            market_data = signal.market_data or {}
-            technical_indicators = market_data.get('technical_indicators', {})
-            
-            row = {
-                'signal_id': str(signal.id),
-                'symbol': signal.symbol,
-                'signal_type': signal.signal_type,
-                'confidence_score': float(signal.confidence_score),
-                'entry_price': float(signal.entry_price),
-                'target_price': float(signal.target_price) if signal.target_price else None,
-                'stop_loss': float(signal.stop_loss) if signal.stop_loss else None,
-                'timestamp': signal.timestamp,
-                
-                # Technical indicators as features
-                'rsi': technical_indicators.get('rsi', 50),
-                'macd': technical_indicators.get('macd', 0),
-                'macd_signal': technical_indicators.get('macd_signal', 0),
-                'sma_20': technical_indicators.get('sma_20', 0),
-                'sma_50': technical_indicators.get('sma_50', 0),
-                'ema_12': technical_indicators.get('ema_12', 0),
-                'ema_26': technical_indicators.get('ema_26', 0),
-                'bb_upper': technical_indicators.get('bb_upper', 0),
-                'bb_lower': technical_indicators.get('bb_lower', 0),
-                'atr': technical_indicators.get('atr', 0),
-                'volume_ratio': technical_indicators.get('volume_ratio', 1),
-                'volatility': technical_indicators.get('volatility', 0),
-                'price_change': technical_indicators.get('price_change', 0),
-                
-                # Outcome variables
-                'was_executed': execution is not None,
-                'actual_pnl': float(execution.total_pnl) if execution else 0,
-                'was_profitable': execution.total_pnl > 0 if execution else False,
-                'execution_time_hours': 0
-            }
-            
-            # Calculate execution time
-            if execution and execution.exit_executed_at:
-                duration = execution.exit_executed_at - execution.entry_executed_at
-                row['execution_time_hours'] = duration.total_seconds() / 3600
-            
-            data_rows.append(row)
+        # Repeated training runs for the same user and window reuse the extracted dataset
+        cache_key = f"training_data:{self.model.user_id}:{self.model.training_period_days}:{end_date:%Y%m%d%H}"
+        df = cache.get(cache_key)
+        if df is not None:
+            self.logger.info(f"Prepared training data: {len(df)} samples (cached)")
+            return df.copy()
         
-        df = pd.DataFrame(data_rows)
+        df = self._query_training_data(start_date, end_date)
         
         if df.empty:
             # Create synthetic data for testing
             df = self._generate_synthetic_data()
+        else:
+            cache.set(cache_key, df, getattr(settings, 'TRAINING_DATA_CACHE_TTL', 3600))
         
         self.logger.info(f"Prepared training data: {len(df)} samples")
         return df
     
+    def _query_training_data(self, start_date: datetime, end_date: datetime) -> pd.DataFrame:
+        """
+        Signals in the window joined to their completed executions, in one query.
+
+        Indicator values are extracted from the market_data JSON by the
+        database and rows are streamed straight into DataFrame columns. A
+        signal with several completed executions keeps the newest one, as the
+        per-signal ``executions.first()`` lookup did.
+        """
+        completed = FilteredRelation('executions', condition=Q(
+            executions__status=AutomatedTradeExecution.ExecutionStatus.COMPLETED,
+            executions__created_at__range=[start_date, end_date],
+        ))
+        indicators = {
+            name: KT(f'market_data__technical_indicators__{name}') for name in self.INDICATOR_DEFAULTS
+        }
+        columns = ['signal_id', 'symbol', 'signal_type', 'confidence_score', 'entry_price', 'target_price',
+                   'stop_loss', 'timestamp', 'execution_id', 'actual_pnl', 'entry_executed_at',
+                   'exit_executed_at', *indicators]
+        rows = TradingSignal.objects.filter(
+            user=self.model.user,
+            created_at__range=[start_date, end_date]
+        ).annotate(
+            completed_execution=completed, **indicators
+        ).order_by(
+            '-timestamp', 'id', '-completed_execution__created_at'
+        ).values_list(
+            'id', 'symbol', 'signal_type', 'confidence_score', 'entry_price', 'target_price', 'stop_loss',
+            'timestamp', 'completed_execution__id', 'completed_execution__total_pnl',
+            'completed_execution__entry_executed_at', 'completed_execution__exit_executed_at', *indicators
+        )
+        
+        df = pd.DataFrame.from_records(rows.iterator(chunk_size=5000), columns=columns)
+        if df.empty:
+            return df
+        df = df.drop_duplicates('signal_id', keep='first').reset_index(drop=True)
+        
+        df['signal_id'] = df['signal_id'].astype(str)
+        for column in ('confidence_score', 'entry_price', 'target_price', 'stop_loss'):
+            df[column] = pd.to_numeric(df[column].astype(object), errors='coerce')
+        for name, default in self.INDICATOR_DEFAULTS.items():
+            df[name] = pd.to_numeric(df[name], errors='coerce').fillna(default)
+        
+        # Outcome variables
+        df['was_executed'] = df['execution_id'].notna()
+        df['actual_pnl'] = pd.to_numeric(df['actual_pnl'].astype(object), errors='coerce').fillna(0.0)
+        df['was_profitable'] = df['was_executed'] & (df['actual_pnl'] > 0)
+        duration = pd.to_datetime(df['exit_executed_at'], utc=True) - pd.to_datetime(df['entry_executed_at'], utc=True)
+        df['execution_time_hours'] = (duration.dt.total_seconds() / 3600).fillna(0.0)
+        
+        return df[['signal_id', 'symbol', 'signal_type', 'confidence_score', 'entry_price', 'target_price',
+                   'stop_loss', 'timestamp', *self.INDICATOR_DEFAULTS, 'was_executed', 'actual_pnl',
+                   'was_profitable', 'execution_time_hours']]
+    
     def _generate_synthetic_data(self) -> pd.DataFrame:
         """Generate synthetic training data for testing"""
         np.random.seed(42)  # For reproducible results
@@ -581,30 +592,19 @@ class ModelTrainer:
             return {name: 1.0 / len(feature_names) for name in feature_names}
     
     def _save_model(self, model, feature_names) -> str:
-        """Save trained model to file"""
-        
-        # Create model directory
-        model_dir = os.path.join(settings.MEDIA_ROOT, 'ml_models')
-        os.makedirs(model_dir, exist_ok=True)
-        
-        # Generate unique filename
-        timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"model_{self.model.id}_{timestamp}.pkl"
-        filepath = os.path.join(model_dir, filename)
-        
-        # Save model and metadata
-        model_data = {
-            'model': model,
-            'feature_names': list(feature_names),
-            'model_type': self.model.model_type,
-            'target_variable': self.model.target_variable,
-            'created_at': timezone.now().isoformat()
-        }
-        
-        with open(filepath, 'wb') as f:
-            pickle.dump(model_data, f)
+        """Save trained model as a new artifact version; returns the artifact directory"""
+        
+        manifest = artifact_store.save(
+            model,
+            self.model.id,
+            feature_names=list(feature_names),
+            model_type=self.model.model_type,
+            target_variable=self.model.target_variable,
+        )
+        model_registry.invalidate(self.model.id)
         
-        self.logger.info(f"Model saved to: {filepath}")
+        filepath = artifact_store.model_dir(self.model.id)
+        self.logger.info(f"Model saved to: {filepath} (version {manifest.version})")
         return filepath
 
 
@@ -745,14 +745,7 @@ def load_trained_model(model_id: str):
     """Load a trained model for inference"""
     try:
         model = MLModel.objects.get(id=model_id, status=MLModel.Status.COMPLETED)
-        
-        if not model.model_file_path or not os.path.exists(model.model_file_path):
-            raise FileNotFoundError("Model file not found")
-        
-        with open(model.model_file_path, 'rb') as f:
-            model_data = pickle.load(f)
-        
-        return model_data
+        return model_registry.get(model).as_dict()
         
     except Exception as e:
         logger.error(f"Error loading model {model_id}: {e}")
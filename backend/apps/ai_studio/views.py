@@ -1,4 +1,5 @@
 import os
+import logging
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.conf import settings
@@ -24,11 +25,14 @@ except ImportError:
     CELERY_AVAILABLE = False
 
 from .training_pipeline import start_model_training, get_training_progress, load_trained_model
+from .model_registry import model_registry
 
 from .security import security_manager, access_control, api_security
 from .model_monitoring import ModelMonitor, ModelLifecycleManager
 from .ml_engines import MLEngineFactory
 
+logger = logging.getLogger(__name__)
+
 
 class MLModelViewSet(ModelViewSet):
     """ViewSet for ML Model CRUD operations"""
@@ -574,9 +578,11 @@ def predict_with_model(request, model_id):
                 'error': 'Model must be deployed to make predictions'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Load trained model
-        model_data = load_trained_model(str(model.id))
-        if not model_data:
+        # Warm model from the in-process registry
+        try:
+            loaded = model_registry.get(model)
+        except Exception as e:
+            logger.error(f"Error loading model {model.id}: {e}")
             return Response({
                 'error': 'Failed to load trained model'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -589,29 +595,31 @@ def predict_with_model(request, model_id):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Validate input features
-        expected_features = model_data['feature_names']
+        expected_features = loaded.feature_names
         missing_features = [f for f in expected_features if f not in input_data]
         if missing_features:
             return Response({
                 'error': f'Missing required features: {missing_features}'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Prepare input data
-        import pandas as pd
-        input_df = pd.DataFrame([input_data])
-        input_df = input_df[expected_features]  # Ensure correct order
+        # Feature row in training order
+        try:
+            features = loaded.feature_row(input_data)
+        except (TypeError, ValueError) as e:
+            return Response({
+                'error': f'Feature values must be numeric: {e}'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Make prediction
-        trained_model = model_data['model']
-        prediction = trained_model.predict(input_df)[0]
+        # Make prediction (one predict_proba call for classifiers)
+        predictions, probabilities = loaded.predict(features)
+        prediction = predictions[0].item() if hasattr(predictions[0], 'item') else predictions[0]
         
         # Get confidence/probability if available
         confidence = None
-        if hasattr(trained_model, 'predict_proba'):
-            probabilities = trained_model.predict_proba(input_df)[0]
-            confidence = float(max(probabilities))
-        elif hasattr(trained_model, 'decision_function'):
-            decision_score = trained_model.decision_function(input_df)[0]
+        if probabilities is not None:
+            confidence = float(probabilities[0].max())
+        elif hasattr(loaded.model, 'decision_function'):
+            decision_score = loaded.model.decision_function(features)[0]
             confidence = float(abs(decision_score))
         
         # Log prediction for monitoring
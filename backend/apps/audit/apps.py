@@ -14,5 +14,4 @@ class AuditConfig(AppConfig):
         """
         Import signal handlers when the app is ready
         """
-        # Import any signal handlers here if needed
-        pass
\ No newline at end of file
+        import apps.audit.signals
\ No newline at end of file
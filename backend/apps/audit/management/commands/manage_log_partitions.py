@@ -0,0 +1,96 @@
+"""
+Management command to maintain monthly partitions of the audit and log tables
+"""
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.audit.partitioning import partition_manager, PARTITIONED_TABLES
+
+
+class Command(BaseCommand):
+    help = 'Convert log tables to monthly partitions, create upcoming partitions and detach old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--table',
+            action='append',
+            default=[],
+            help='Table to act on (repeatable; default: every partitioned log table)'
+        )
+        parser.add_argument(
+            '--convert',
+            action='store_true',
+            help='Convert existing tables to partitioned tables (one-time)'
+        )
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=3,
+            help='Months of partitions to keep created ahead of the current one'
+        )
+        parser.add_argument(
+            '--detach-before',
+            help='Detach partitions that end on or before this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--drop',
+            action='store_true',
+            help='Drop detached partitions instead of keeping them as standalone tables'
+        )
+        parser.add_argument(
+            '--status',
+            action='store_true',
+            help='Only show the current partitions'
+        )
+
+    def handle(self, *args, **options):
+        if not partition_manager.is_supported():
+            raise CommandError('Table partitioning requires PostgreSQL')
+
+        try:
+            specs = [partition_manager.get_table(table) for table in options['table']] or PARTITIONED_TABLES
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['status']:
+            status = partition_manager.status()
+            for spec in specs:
+                info = status[spec.table]
+                if not info['exists']:
+                    self.stdout.write(f'{spec.table}: missing')
+                elif not info['partitioned']:
+                    self.stdout.write(f'{spec.table}: not partitioned')
+                else:
+                    self.stdout.write(f"{spec.table}: {', '.join(info['partitions'])}")
+            return
+
+        cutoff = None
+        if options['detach_before']:
+            try:
+                cutoff = timezone.make_aware(datetime.strptime(options['detach_before'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError('--detach-before must be a date in YYYY-MM-DD format')
+
+        for spec in specs:
+            if options['convert']:
+                try:
+                    created = partition_manager.convert(spec, options['months_ahead'])
+                except ValueError as e:
+                    self.stdout.write(self.style.WARNING(f'{spec.table}: {e}'))
+                    continue
+                self.stdout.write(f'{spec.table}: converted ({len(created)} partitions created)')
+            else:
+                created = partition_manager.ensure_partitions(spec, options['months_ahead'])
+                if created:
+                    self.stdout.write(f"{spec.table}: created {', '.join(created)}")
+
+            if cutoff is not None:
+                detached = partition_manager.detach_before(spec, cutoff, drop=options['drop'])
+                if detached:
+                    action = 'dropped' if options['drop'] else 'detached'
+                    self.stdout.write(f"{spec.table}: {action} {', '.join(detached)}")
+
+        self.stdout.write(self.style.SUCCESS('Log partitions up to date'))
@@ -11,6 +11,8 @@ from django.utils.deprecation import MiddlewareMixin
 from django.urls import resolve
 from django.http import HttpRequest, HttpResponse
 
+from apps.security.rate_limiter import rate_limiter
+
 from .services import audit_logger
 from .models import AuditEvent
 
@@ -271,7 +273,6 @@ class SecurityMiddleware(MiddlewareMixin):
     def __init__(self, get_response):
         super().__init__(get_response)
         self.get_response = get_response
-        self._request_counts = {}  # Simple in-memory counter (use Redis in production)
     
     def process_request(self, request: HttpRequest) -> Optional[HttpResponse]:
         """
@@ -345,36 +346,25 @@ class SecurityMiddleware(MiddlewareMixin):
         """
         try:
             client_ip = self._get_client_ip(request)
-            current_minute = int(time.time() // 60)
-            
-            # Initialize counter for this IP/minute
-            key = f"{client_ip}:{current_minute}"
-            if key not in self._request_counts:
-                self._request_counts[key] = 0
+            limit = self.RATE_LIMITS['requests_per_minute']
             
-            self._request_counts[key] += 1
+            # Shared across workers; one atomic check per request
+            result = rate_limiter.hit(f"security:ip:{client_ip}", limit, 60)
             
             # Check if rate limit exceeded
-            if self._request_counts[key] > self.RATE_LIMITS['requests_per_minute']:
+            if not result.allowed:
                 audit_logger.log_security_event(
                     category='RATE_LIMITING',
                     threat_level='MEDIUM',
                     title='Rate limit exceeded',
-                    description=f"IP {client_ip} exceeded rate limit: {self._request_counts[key]} requests/minute",
+                    description=f"IP {client_ip} exceeded rate limit: more than {limit} requests/minute",
                     request=request,
-                    indicators=[f"requests_per_minute: {self._request_counts[key]}"],
+                    indicators=[f"requests_per_minute: >{limit}"],
                     attack_vector='RATE_LIMITING',
                     blocked=False,
                     action_taken='LOGGED'
                 )
             
-            # Clean up old entries (keep only last 2 minutes)
-            current_time = int(time.time() // 60)
-            keys_to_remove = [k for k in self._request_counts.keys() 
-                            if int(k.split(':')[1]) < current_time - 2]
-            for key in keys_to_remove:
-                del self._request_counts[key]
-            
         except Exception as e:
             logger.error(f"Error checking rate limits: {e}")
     
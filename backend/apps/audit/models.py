@@ -256,8 +256,9 @@ class SecurityEvent(models.Model):
     blocked = models.BooleanField(default=False)
     action_taken = models.TextField(blank=True)
     
-    # Related Audit Event
-    audit_event = models.ForeignKey(AuditEvent, on_delete=models.CASCADE, related_name='security_events')
+    # Related Audit Event (no database constraint: audit_events may be partitioned, see partitioning.py)
+    audit_event = models.ForeignKey(AuditEvent, on_delete=models.CASCADE, related_name='security_events',
+                                    db_constraint=False)
     
     # Timing
     timestamp = models.DateTimeField(default=timezone.now, db_index=True)
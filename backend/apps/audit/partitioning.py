@@ -0,0 +1,302 @@
+"""
+Log Table Partitioning for ShareWise AI
+Monthly range partitions (PostgreSQL declarative partitioning) for the
+append-only audit, compliance and market data log tables. Timestamp range
+filters then only touch the partitions in range, and retention drops whole
+partitions instead of deleting rows.
+
+An existing table is converted without copying its rows: it is renamed and
+attached to the new partitioned table as a single "legacy" partition that
+covers everything before the start of next month. Monthly partitions are
+created from there on by ``ensure_partitions`` (run daily from Celery beat),
+and the legacy partition is dropped by retention like any other once it is
+entirely past the cutoff.
+"""
+import re
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LEGACY_SUFFIX = '_legacy'
+
+BOUND_RE = re.compile(r"FROM \((?:'([^']+)'|MINVALUE)\) TO \((?:'([^']+)'|MAXVALUE)\)")
+
+
+@dataclass(frozen=True)
+class PartitionedTable:
+    """A log table partitioned by month on ``column``"""
+    table: str
+    column: str
+
+
+PARTITIONED_TABLES = [
+    PartitionedTable('audit_events', 'timestamp'),
+    PartitionedTable('audit_data_access', 'timestamp'),
+    PartitionedTable('audit_security_events', 'timestamp'),
+    PartitionedTable('compliance_audit_trail', 'timestamp'),
+    PartitionedTable('market_data_log', 'created_at'),
+]
+
+
+@dataclass
+class PartitionInfo:
+    name: str
+    lower: Optional[datetime]  # None for MINVALUE
+    upper: Optional[datetime]  # None for MAXVALUE
+
+
+def month_start(value: datetime) -> datetime:
+    """Start of the (local) month containing ``value``"""
+    local = timezone.localtime(value)
+    return local.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    month_index = value.month - 1 + months
+    naive = value.replace(tzinfo=None, year=value.year + month_index // 12, month=month_index % 12 + 1)
+    return timezone.make_aware(naive)
+
+
+class LogPartitionManager:
+    """Create, list and detach monthly partitions of the tables in PARTITIONED_TABLES"""
+
+    def __init__(self, using: str = 'default'):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def get_table(self, table: str) -> PartitionedTable:
+        for spec in PARTITIONED_TABLES:
+            if spec.table == table:
+                return spec
+        raise ValueError(f"{table} is not a partitioned log table")
+
+    # Introspection
+
+    def is_supported(self) -> bool:
+        return self.connection.vendor == 'postgresql'
+
+    def _relkind(self, table: str) -> Optional[str]:
+        with self.connection.cursor() as cursor:
+            cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def is_partitioned(self, table: str) -> bool:
+        return self.is_supported() and self._relkind(table) == 'p'
+
+    def partitions(self, table: str) -> List[PartitionInfo]:
+        """Partitions of ``table`` ordered by lower bound"""
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+                FROM pg_inherits
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                WHERE pg_inherits.inhparent = to_regclass(%s)
+                """,
+                [table]
+            )
+            rows = cursor.fetchall()
+
+        partitions = []
+        for name, bound in rows:
+            match = BOUND_RE.search(bound or '')
+            if match is None:
+                continue  # DEFAULT partition
+            lower, upper = match.groups()
+            partitions.append(PartitionInfo(
+                name=name,
+                lower=datetime.fromisoformat(lower) if lower else None,
+                upper=datetime.fromisoformat(upper) if upper else None,
+            ))
+        return sorted(partitions, key=lambda p: (p.lower is not None, p.lower or datetime.min))
+
+    def status(self) -> Dict[str, Dict]:
+        result = {}
+        for spec in PARTITIONED_TABLES:
+            relkind = self._relkind(spec.table) if self.is_supported() else None
+            result[spec.table] = {
+                'exists': relkind is not None,
+                'partitioned': relkind == 'p',
+                'partitions': [p.name for p in self.partitions(spec.table)] if relkind == 'p' else [],
+            }
+        return result
+
+    # Conversion
+
+    def convert(self, spec: PartitionedTable, months_ahead: int = 3) -> List[str]:
+        """
+        Turn an existing table into a partitioned one; returns the partitions created.
+
+        The long-running steps (unique index build and CHECK validation on
+        the existing rows) run before the short exclusive-lock transaction
+        that swaps the tables.
+        """
+        if not self.is_supported():
+            raise ValueError("Table partitioning requires PostgreSQL")
+        relkind = self._relkind(spec.table)
+        if relkind is None:
+            raise ValueError(f"Table {spec.table} does not exist")
+        if relkind == 'p':
+            return []
+
+        qn = self.connection.ops.quote_name
+        table, column = spec.table, spec.column
+        legacy = f"{table}{LEGACY_SUFFIX}"
+        boundary = add_months(month_start(timezone.now()), 1)
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conrelid::regclass::text FROM pg_constraint WHERE contype = 'f' AND confrelid = to_regclass(%s)",
+                [table]
+            )
+            referencing = [row[0] for row in cursor.fetchall()]
+            if referencing:
+                raise ValueError(
+                    f"{table} is referenced by foreign keys from {', '.join(referencing)}; "
+                    f"partitioned tables cannot be referenced by id alone"
+                )
+
+            # The partition key has to be part of the primary key
+            cursor.execute(
+                f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {qn(table + '_id_part_uniq')} "
+                f"ON {qn(table)} (id, {qn(column)})"
+            )
+            # Lets ATTACH skip scanning the old rows
+            cursor.execute(f"ALTER TABLE {qn(table)} DROP CONSTRAINT IF EXISTS {qn(table + '_part_bound')}")
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_part_bound')} "
+                f"CHECK ({qn(column)} IS NOT NULL AND {qn(column)} < %s) NOT VALID",
+                [boundary]
+            )
+            cursor.execute(f"ALTER TABLE {qn(table)} VALIDATE CONSTRAINT {qn(table + '_part_bound')}")
+
+        with transaction.atomic(using=self.using), self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s AND schemaname = current_schema()",
+                [table]
+            )
+            indexes = cursor.fetchall()
+            cursor.execute(
+                "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'f')",
+                [table]
+            )
+            constraints = cursor.fetchall()
+            primary_key = next((name for name, kind, _ in constraints if kind == 'p'), None)
+
+            cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}")
+            if primary_key:
+                cursor.execute(f"ALTER TABLE {qn(legacy)} RENAME CONSTRAINT {qn(primary_key)} "
+                               f"TO {qn(primary_key + LEGACY_SUFFIX)}")
+            for name, _ in indexes:
+                if name not in (primary_key, table + '_id_part_uniq'):
+                    cursor.execute(f"ALTER INDEX {qn(name)} RENAME TO {qn(name + LEGACY_SUFFIX)}")
+
+            cursor.execute(
+                f"CREATE TABLE {qn(table)} (LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING STORAGE) "
+                f"PARTITION BY RANGE ({qn(column)})"
+            )
+            cursor.execute(f"ALTER TABLE {qn(table)} ADD PRIMARY KEY (id, {qn(column)})")
+            for name, definition in indexes:
+                if name not in (primary_key, table + '_id_part_uniq'):
+                    # Definitions still name the original table, which is now the partitioned one
+                    cursor.execute(definition)
+            for name, kind, definition in constraints:
+                if kind == 'f':
+                    cursor.execute(f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(name)} {definition}")
+
+            cursor.execute(
+                f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(legacy)} FOR VALUES FROM (MINVALUE) TO (%s)",
+                [boundary]
+            )
+            created = self.ensure_partitions(spec, months_ahead)
+
+        logger.info(f"Converted {table} to monthly partitions ({len(created)} created)")
+        return created
+
+    # Maintenance
+
+    def ensure_partitions(self, spec: PartitionedTable, months_ahead: int = 3) -> List[str]:
+        """Create monthly partitions up to ``months_ahead`` months past the current one"""
+        if not self.is_partitioned(spec.table):
+            return []
+
+        qn = self.connection.ops.quote_name
+        current = month_start(timezone.now())
+        end = add_months(current, months_ahead + 1)
+        existing = self.partitions(spec.table)
+        uppers = [p.upper for p in existing if p.upper is not None]
+        start = max(uppers + [current]) if uppers else current
+        start = month_start(start)
+
+        created = []
+        with self.connection.cursor() as cursor:
+            while start < end:
+                upper = add_months(start, 1)
+                name = f"{spec.table}_p{start:%Y%m}"
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {qn(name)} PARTITION OF {qn(spec.table)} "
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    [start, upper]
+                )
+                created.append(name)
+                start = upper
+        return created
+
+    def detach_before(self, spec: PartitionedTable, cutoff: datetime, drop: bool = False) -> List[str]:
+        """Detach (and optionally drop) partitions that end on or before ``cutoff``"""
+        if not self.is_partitioned(spec.table):
+            return []
+
+        qn = self.connection.ops.quote_name
+        detached = []
+        with self.connection.cursor() as cursor:
+            for partition in self.partitions(spec.table):
+                if partition.upper is None or partition.upper > cutoff:
+                    continue
+                cursor.execute(f"ALTER TABLE {qn(spec.table)} DETACH PARTITION {qn(partition.name)}")
+                if drop:
+                    cursor.execute(f"DROP TABLE {qn(partition.name)}")
+                detached.append(partition.name)
+        if detached:
+            logger.info(f"{'Dropped' if drop else 'Detached'} {len(detached)} partitions of {spec.table}")
+        return detached
+
+    def droppable_until(self, table: str, cutoff: datetime) -> Optional[datetime]:
+        """End of the newest partition of ``table`` that ends on or before ``cutoff``"""
+        try:
+            if not self.is_partitioned(table):
+                return None
+            uppers = [p.upper for p in self.partitions(table) if p.upper is not None and p.upper <= cutoff]
+        except Exception as e:
+            logger.error(f"Error reading partitions of {table}: {e}")
+            return None
+        return max(uppers) if uppers else None
+
+    def drop_partitions_before(self, table: str, cutoff: datetime) -> List[str]:
+        """
+        Retention helper: drop every partition of ``table`` entirely older than ``cutoff``.
+
+        Errors propagate so the caller can fall back to deleting the rows.
+        """
+        return self.detach_before(self.get_table(table), cutoff, drop=True)
+
+    def maintain(self, months_ahead: int = 3) -> Dict[str, List[str]]:
+        """Create upcoming partitions for every partitioned log table"""
+        if not self.is_supported():
+            return {}
+        return {spec.table: self.ensure_partitions(spec, months_ahead) for spec in PARTITIONED_TABLES}
+
+
+# Global instance
+partition_manager = LogPartitionManager()
@@ -0,0 +1,220 @@
+"""
+Audit Event Pipeline for ShareWise AI
+Takes audit writes off the request path: AuditLogger builds the AuditEvent in
+memory and hands it to a bounded per-process buffer, and a background thread
+writes the buffer to the database with ``bulk_create`` in batches. Event
+types that must never be lost (financial and compliance-required events) are
+written synchronously, and so is anything that arrives while the buffer is
+full, so a slow database pushes back on callers instead of dropping events.
+"""
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from .models import AuditEvent, AuditConfiguration
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNC_EVENT_TYPES = [
+    AuditEvent.EventType.TRADE_PLACED,
+    AuditEvent.EventType.TRADE_EXECUTED,
+    AuditEvent.EventType.TRADE_CANCELLED,
+    AuditEvent.EventType.SIGNAL_EXECUTED,
+    AuditEvent.EventType.PAYMENT_PROCESSED,
+    AuditEvent.EventType.REFUND_ISSUED,
+]
+
+
+@dataclass
+class AuditPipelineStats:
+    """Counters since process start"""
+    buffered: int = 0
+    written_sync: int = 0
+    flushed: int = 0
+    flush_batches: int = 0
+    overflows: int = 0
+    failed: int = 0
+
+
+class AuditConfigCache:
+    """
+    All AuditConfiguration rows held in memory, reloaded on change or after a TTL.
+
+    Changes bump a version key in the shared Django cache; every process
+    compares it on lookup, so web and Celery workers all reload on their next
+    event rather than after the TTL.
+    """
+
+    VERSION_KEY = 'audit_config:version'
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl or getattr(settings, 'AUDIT_CONFIG_CACHE_TTL', 60)
+        self._configs: Optional[Dict[str, AuditConfiguration]] = None
+        self._loaded_at = 0.0
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _shared_version(self):
+        try:
+            return cache.get(self.VERSION_KEY) or 0
+        except Exception:
+            return self._version  # Cache unreachable: fall back to the TTL
+
+    def get(self, event_type: str) -> AuditConfiguration:
+        configs = self._configs
+        version = self._shared_version()
+        if configs is None or version != self._version or time.monotonic() - self._loaded_at > self.ttl:
+            configs = self._load(version)
+        config = configs.get(event_type)
+        if config is None:
+            # Create default configuration
+            config, _ = AuditConfiguration.objects.get_or_create(
+                event_type=event_type,
+                defaults={'enabled': True, 'log_level': AuditConfiguration.LogLevel.STANDARD}
+            )
+            configs[event_type] = config
+        return config
+
+    def _load(self, version=None) -> Dict[str, AuditConfiguration]:
+        with self._lock:
+            configs = {config.event_type: config for config in AuditConfiguration.objects.all()}
+            self._configs = configs
+            self._loaded_at = time.monotonic()
+            self._version = version
+            return configs
+
+    def invalidate(self) -> None:
+        """Reload in this process and, through the shared version, in every other one"""
+        self._configs = None
+        try:
+            cache.incr(self.VERSION_KEY)
+        except ValueError:
+            cache.add(self.VERSION_KEY, 1, timeout=None)
+        except Exception as e:
+            logger.warning(f"Could not bump audit configuration version: {e}")
+
+
+class AuditEventBuffer:
+    """Bounded buffer of unsaved AuditEvents with a background bulk writer"""
+
+    def __init__(self, max_size: Optional[int] = None, batch_size: Optional[int] = None,
+                 flush_interval: Optional[float] = None):
+        self.max_size = max_size or getattr(settings, 'AUDIT_BUFFER_SIZE', 10000)
+        self.batch_size = batch_size or getattr(settings, 'AUDIT_FLUSH_BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or getattr(settings, 'AUDIT_FLUSH_INTERVAL', 1.0)
+        self.enabled = getattr(settings, 'AUDIT_ASYNC_WRITES', True)
+        self.sync_event_types = set(getattr(settings, 'AUDIT_SYNC_EVENT_TYPES', DEFAULT_SYNC_EVENT_TYPES))
+        self.stats = AuditPipelineStats()
+
+        self._events: deque = deque()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        atexit.register(self.flush)
+
+    def is_durable(self, event_type: str, config: Optional[AuditConfiguration] = None) -> bool:
+        """Whether ``event_type`` has to be written before log_event returns"""
+        if not self.enabled or event_type in self.sync_event_types:
+            return True
+        return bool(config is not None and config.required_for_compliance)
+
+    def write(self, event: AuditEvent, durable: bool = False) -> AuditEvent:
+        """Persist ``event`` now (durable) or queue it for the background writer"""
+        if durable:
+            return self._write_sync(event)
+
+        with self._lock:
+            if len(self._events) >= self.max_size:
+                overflow = True
+            else:
+                overflow = False
+                self._events.append(event)
+                self.stats.buffered += 1
+                pending = len(self._events)
+        if overflow:
+            # Backpressure: the caller pays for the write rather than losing the event
+            self.stats.overflows += 1
+            self._wakeup.set()
+            return self._write_sync(event)
+
+        self._ensure_worker()
+        if pending >= self.batch_size:
+            self._wakeup.set()
+        return event
+
+    def _write_sync(self, event: AuditEvent) -> AuditEvent:
+        event.save(force_insert=True)
+        self.stats.written_sync += 1
+        return event
+
+    def pending(self) -> int:
+        return len(self._events)
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns events written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._events.popleft() for _ in range(min(self.batch_size, len(self._events)))]
+                if not batch:
+                    return written
+                written += self._write_batch(batch)
+
+    def _write_batch(self, batch: List[AuditEvent]) -> int:
+        try:
+            AuditEvent.objects.bulk_create(batch, batch_size=self.batch_size)
+        except Exception as e:
+            # One bad row must not take the batch down with it
+            logger.error(f"Bulk audit write failed, retrying {len(batch)} events one by one: {e}")
+            written = 0
+            for event in batch:
+                try:
+                    event.save(force_insert=True)
+                    written += 1
+                except Exception as row_error:
+                    self.stats.failed += 1
+                    logger.error(f"Dropping audit event {event.event_type} ({event.id}): {row_error}")
+            self.stats.flushed += written
+            return written
+        self.stats.flushed += len(batch)
+        self.stats.flush_batches += 1
+        return len(batch)
+
+    def _ensure_worker(self) -> None:
+        # Checked per process: a worker thread does not survive a fork
+        pid = os.getpid()
+        if self._thread is not None and self._pid == pid and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == pid and self._thread.is_alive():
+                return
+            self._pid = pid
+            self._thread = threading.Thread(target=self._run, name='audit-event-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                close_old_connections()
+                self.flush()
+            except Exception as e:
+                logger.error(f"Audit event writer error: {e}")
+
+
+# Global instances
+audit_config_cache = AuditConfigCache()
+audit_event_buffer = AuditEventBuffer()
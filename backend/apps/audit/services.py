@@ -14,10 +14,11 @@ from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
 from django.conf import settings
-from django.db import transaction
 from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q, Count, Sum
 
 from .models import AuditEvent, DataAccessLog, SecurityEvent, ComplianceReport, AuditConfiguration
+from .pipeline import audit_config_cache, audit_event_buffer
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -44,10 +45,16 @@ class AuditLogger:
         amount: Optional[Decimal] = None,
         duration_ms: Optional[int] = None,
         regulatory_category: str = "",
-        compliance_status: str = ""
+        compliance_status: str = "",
+        durable: Optional[bool] = None
     ) -> AuditEvent:
         """
         Log an audit event
+        
+        Durable events (financial types, compliance-required configurations or
+        ``durable=True``) are saved before this returns; the rest are queued and
+        bulk-written in the background, so the returned event may not be in the
+        database yet.
         """
         try:
             # Check if this event type is enabled
@@ -79,11 +86,12 @@ class AuditLogger:
                 event_data['content_type'] = ContentType.objects.get_for_model(content_object)
                 event_data['object_id'] = str(content_object.pk)
             
-            # Create audit event
-            with transaction.atomic():
-                audit_event = AuditEvent.objects.create(**event_data)
-                self.logger.info(f"Audit event logged: {event_type} - {audit_event.id}")
-                return audit_event
+            # Write now or hand off to the background writer
+            if durable is None:
+                durable = audit_event_buffer.is_durable(event_type, config)
+            audit_event = audit_event_buffer.write(AuditEvent(**event_data), durable=durable)
+            self.logger.debug(f"Audit event logged: {event_type} - {audit_event.id}")
+            return audit_event
                 
         except Exception as e:
             self.logger.error(f"Failed to log audit event {event_type}: {e}")
@@ -114,7 +122,8 @@ class AuditLogger:
                 description=description,
                 severity=AuditEvent.Severity.HIGH if threat_level == 'HIGH' else AuditEvent.Severity.CRITICAL,
                 status=AuditEvent.Status.WARNING,
-                request=request
+                request=request,
+                durable=True  # SecurityEvent references it
             )
             
             if not audit_event:
@@ -274,15 +283,7 @@ class AuditLogger:
         """
         Get audit configuration for event type
         """
-        try:
-            return AuditConfiguration.objects.get(event_type=event_type)
-        except AuditConfiguration.DoesNotExist:
-            # Create default configuration
-            return AuditConfiguration.objects.create(
-                event_type=event_type,
-                enabled=True,
-                log_level=AuditConfiguration.LogLevel.STANDARD
-            )
+        return audit_config_cache.get(event_type)
     
     # Convenience methods for common events
     def log_user_login(self, user: User, request=None, success: bool = True):
@@ -402,38 +403,34 @@ class ComplianceService:
             self.logger.error(f"Failed to generate compliance report: {e}")
             raise
     
+    # Each report is a few grouped queries over one timestamp range, so the
+    # planner only scans the partitions covering the report period
+
+    @staticmethod
+    def _counts_by(queryset, field: str) -> Dict[str, int]:
+        return {
+            row[field]: row['count']
+            for row in queryset.values(field).annotate(count=Count('id')).order_by()
+        }
+    
     def _generate_gdpr_report(self, report: ComplianceReport):
         """Generate GDPR data access report"""
         data_accesses = DataAccessLog.objects.filter(
             timestamp__range=[report.period_start, report.period_end]
         )
         
+        totals = data_accesses.aggregate(
+            total_accesses=Count('id'),
+            unique_users=Count('user', distinct=True),
+        )
         summary = {
-            'total_accesses': data_accesses.count(),
-            'unique_users': data_accesses.values('user').distinct().count(),
-            'data_classifications': {},
-            'access_types': {},
-            'tables_accessed': set(),
+            'total_accesses': totals['total_accesses'],
+            'unique_users': totals['unique_users'],
+            'data_classifications': self._counts_by(data_accesses, 'data_classification'),
+            'access_types': self._counts_by(data_accesses, 'access_type'),
+            'tables_accessed': list(data_accesses.values_list('table_name', flat=True).distinct().order_by()),
         }
         
-        # Aggregate data
-        for access in data_accesses:
-            # Count by classification
-            classification = access.data_classification
-            summary['data_classifications'][classification] = \
-                summary['data_classifications'].get(classification, 0) + 1
-            
-            # Count by access type
-            access_type = access.access_type
-            summary['access_types'][access_type] = \
-                summary['access_types'].get(access_type, 0) + 1
-            
-            # Track tables
-            summary['tables_accessed'].add(access.table_name)
-        
-        # Convert set to list for JSON serialization
-        summary['tables_accessed'] = list(summary['tables_accessed'])
-        
         report.summary = summary
         report.regulatory_framework = 'GDPR'
         report.save()
@@ -444,32 +441,20 @@ class ComplianceService:
             timestamp__range=[report.period_start, report.period_end]
         )
         
+        totals = security_events.aggregate(
+            total_incidents=Count('id'),
+            blocked_attacks=Count('id', filter=Q(blocked=True)),
+        )
         summary = {
-            'total_incidents': security_events.count(),
-            'threat_levels': {},
-            'categories': {},
-            'blocked_attacks': security_events.filter(blocked=True).count(),
-            'unique_ips': set(),
+            'total_incidents': totals['total_incidents'],
+            'threat_levels': self._counts_by(security_events, 'threat_level'),
+            'categories': self._counts_by(security_events, 'category'),
+            'blocked_attacks': totals['blocked_attacks'],
+            'unique_ips': [
+                str(ip) for ip in security_events.values_list('ip_address', flat=True).distinct().order_by()
+            ],
         }
         
-        # Aggregate data
-        for event in security_events:
-            # Count by threat level
-            threat_level = event.threat_level
-            summary['threat_levels'][threat_level] = \
-                summary['threat_levels'].get(threat_level, 0) + 1
-            
-            # Count by category
-            category = event.category
-            summary['categories'][category] = \
-                summary['categories'].get(category, 0) + 1
-            
-            # Track IPs
-            summary['unique_ips'].add(str(event.ip_address))
-        
-        # Convert set to list
-        summary['unique_ips'] = list(summary['unique_ips'])
-        
         report.summary = summary
         report.save()
     
@@ -484,27 +469,18 @@ class ComplianceService:
             ]
         )
         
+        with_amount = financial_events.exclude(amount__isnull=True).exclude(amount=0)
+        currency_breakdown = {
+            row['currency']: float(row['total'])
+            for row in with_amount.values('currency').annotate(total=Sum('amount')).order_by()
+        }
         summary = {
             'total_transactions': financial_events.count(),
-            'total_amount': 0,
-            'transaction_types': {},
-            'currency_breakdown': {},
+            'total_amount': sum(currency_breakdown.values()),
+            'transaction_types': self._counts_by(financial_events, 'event_type'),
+            'currency_breakdown': currency_breakdown,
         }
         
-        # Aggregate financial data
-        for event in financial_events:
-            # Count by type
-            event_type = event.event_type
-            summary['transaction_types'][event_type] = \
-                summary['transaction_types'].get(event_type, 0) + 1
-            
-            # Sum amounts
-            if event.amount:
-                summary['total_amount'] += float(event.amount)
-                currency = event.currency
-                summary['currency_breakdown'][currency] = \
-                    summary['currency_breakdown'].get(currency, 0) + float(event.amount)
-        
         report.summary = summary
         report.regulatory_framework = 'FINANCIAL_REGULATIONS'
         report.save()
@@ -516,25 +492,16 @@ class ComplianceService:
             user__isnull=False
         )
         
+        most_active_users = {
+            str(user_id): count for user_id, count in self._counts_by(user_events, 'user').items()
+        }
         summary = {
-            'total_events': user_events.count(),
-            'unique_users': user_events.values('user').distinct().count(),
-            'event_types': {},
-            'most_active_users': {},
+            'total_events': sum(most_active_users.values()),
+            'unique_users': len(most_active_users),
+            'event_types': self._counts_by(user_events, 'event_type'),
+            'most_active_users': most_active_users,
         }
         
-        # Aggregate user activity
-        for event in user_events:
-            # Count by event type
-            event_type = event.event_type
-            summary['event_types'][event_type] = \
-                summary['event_types'].get(event_type, 0) + 1
-            
-            # Track most active users
-            user_id = str(event.user.id)
-            summary['most_active_users'][user_id] = \
-                summary['most_active_users'].get(user_id, 0) + 1
-        
         report.summary = summary
         report.save()
 
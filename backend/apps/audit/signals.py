@@ -0,0 +1,11 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import AuditConfiguration
+from .pipeline import audit_config_cache
+
+
+@receiver(post_save, sender=AuditConfiguration)
+@receiver(post_delete, sender=AuditConfiguration)
+def audit_configuration_changed(sender, instance, **kwargs):
+    """Reload audit configuration on next use in every process (shared version bump)"""
+    audit_config_cache.invalidate()
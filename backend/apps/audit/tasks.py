@@ -0,0 +1,24 @@
+"""
+Celery tasks for the audit app
+"""
+import logging
+
+from celery import shared_task
+
+from .partitioning import partition_manager
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def maintain_log_partitions(months_ahead: int = 3):
+    """Keep upcoming monthly partitions of the log tables created"""
+    try:
+        created = partition_manager.maintain(months_ahead)
+        total = sum(len(names) for names in created.values())
+        if total:
+            logger.info(f"Created {total} log table partitions")
+        return total
+    except Exception as e:
+        logger.error(f"Error maintaining log partitions: {e}")
+        return 0
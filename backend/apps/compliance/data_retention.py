@@ -11,10 +11,16 @@ from django.contrib.auth import get_user_model
 from django.db.models import Q, Count
 from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
 import hashlib
 import json
+import gzip
+import os
+import time
 from pathlib import Path
 
+from apps.audit.partitioning import partition_manager
+
 from .models import (
     AuditTrail, KYCDocument, InvestorProfile, 
     TradingAlert, RegulatoryReporting, InvestorGrievance
@@ -267,89 +273,162 @@ class DataRetentionManager:
                 'error': f'Anonymization failed: {str(e)}'
             }
     
-    def archive_old_records(self, archive_date: datetime, data_type: str) -> Dict[str, Any]:
-        """Archive old records before deletion"""
+    def _archive_source(self, archive_date: datetime, data_type: str):
+        """(queryset, projected fields, partition timestamp field) for an archivable data type"""
+        if data_type == 'audit_trails':
+            return (
+                AuditTrail.objects.filter(timestamp__lt=archive_date),
+                ['id', 'user_id', 'action_type', 'action_description', 'timestamp', 'ip_address', 'metadata'],
+                'timestamp',
+            )
+        if data_type == 'old_kyc_documents':
+            # Archive rejected/expired KYC documents older than retention period
+            return (
+                KYCDocument.objects.filter(
+                    created_at__lt=archive_date,
+                    verification_status__in=[
+                        KYCDocument.VerificationStatus.REJECTED,
+                        KYCDocument.VerificationStatus.EXPIRED
+                    ]
+                ),
+                ['id', 'user_id', 'document_type', 'verification_status', 'created_at'],
+                None,
+            )
+        raise ValueError(f"Unknown archive data type: {data_type}")
+    
+    @staticmethod
+    def _write_checkpoint(checkpoint_file: Path, checkpoint: Dict[str, Any]) -> None:
+        tmp_file = checkpoint_file.with_name(checkpoint_file.name + '.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, checkpoint_file)
+    
+    @staticmethod
+    def _delete_in_batches(queryset, batch_size: int) -> int:
+        deleted = 0
+        while True:
+            pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            queryset.model.objects.filter(pk__in=pks).delete()
+            deleted += len(pks)
+    
+    def archive_old_records(self, archive_date: datetime, data_type: str,
+                            chunk_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Archive old records before deletion
+        
+        Rows are streamed in primary-key order as gzip-compressed NDJSON, one
+        gzip member per chunk. A chunk is deleted only after it has been
+        fsynced and recorded in the checkpoint file next to the archive, so an
+        interrupted run resumes where it stopped without losing or
+        duplicating rows.
+        """
         try:
+            chunk_size = chunk_size or getattr(settings, 'DATA_ARCHIVE_CHUNK_SIZE', 5000)
+            queryset, fields, partition_field = self._archive_source(archive_date, data_type)
+            model = queryset.model
+            
             archive_path = Path(settings.MEDIA_ROOT) / 'archives' / data_type
             archive_path.mkdir(parents=True, exist_ok=True)
             
-            archive_file = archive_path / f"{data_type}_{archive_date.strftime('%Y%m%d')}.json"
+            archive_file = archive_path / f"{data_type}_{archive_date.strftime('%Y%m%d')}.ndjson.gz"
+            checkpoint_file = archive_path / f"{archive_file.name}.checkpoint.json"
             
-            archived_records = []
-            archive_count = 0
-            
-            if data_type == 'audit_trails':
-                old_records = AuditTrail.objects.filter(timestamp__lt=archive_date)
-                
-                for record in old_records:
-                    archived_record = {
-                        'id': str(record.id),
-                        'user_id': record.user.id,
-                        'action_type': record.action_type,
-                        'action_description': record.action_description,
-                        'timestamp': record.timestamp.isoformat(),
-                        'ip_address': str(record.ip_address),
-                        'metadata': record.metadata,
-                        'archived_at': timezone.now().isoformat()
-                    }
-                    archived_records.append(archived_record)
-                    archive_count += 1
+            checkpoint = {
+                'archive_type': data_type,
+                'archive_date': archive_date.isoformat(),
+                'last_pk': None,
+                'records_archived': 0,
+                'bytes_written': 0,
+                'completed': False,
+                'compliance_note': 'Archived as per SEBI data retention policy'
+            }
+            if checkpoint_file.exists():
+                with open(checkpoint_file) as f:
+                    checkpoint.update(json.load(f))
+                logger.info(f"Resuming {data_type} archival after {checkpoint['records_archived']} records")
+            # Drop anything written after the last checkpoint (interrupted chunk)
+            if archive_file.exists() and archive_file.stat().st_size > checkpoint['bytes_written']:
+                os.truncate(archive_file, checkpoint['bytes_written'])
+            
+            # Rows in partitions that end before the cutoff are removed by dropping the partition
+            drop_until = None
+            if partition_field:
+                drop_until = partition_manager.droppable_until(model._meta.db_table, archive_date)
+            
+            started = time.monotonic()
+            session_records = 0
+            while True:
+                chunk = queryset.order_by('pk')
+                if checkpoint['last_pk'] is not None:
+                    chunk = chunk.filter(pk__gt=checkpoint['last_pk'])
+                rows = list(chunk.values(*fields)[:chunk_size].iterator(chunk_size=chunk_size))
+                if not rows:
+                    break
                 
-                # Write to archive file
-                with open(archive_file, 'w') as f:
-                    json.dump({
-                        'archive_type': data_type,
-                        'archive_date': archive_date.isoformat(),
-                        'records_count': archive_count,
-                        'records': archived_records,
-                        'compliance_note': 'Archived as per SEBI data retention policy'
-                    }, f, indent=2)
+                archived_at = timezone.now().isoformat()
+                with open(archive_file, 'ab') as raw:
+                    with gzip.GzipFile(fileobj=raw, mode='ab') as archive:
+                        for row in rows:
+                            row['archived_at'] = archived_at
+                            archive.write(json.dumps(row, cls=DjangoJSONEncoder).encode())
+                            archive.write(b'\n')
+                    raw.flush()
+                    os.fsync(raw.fileno())
+                    bytes_written = raw.tell()
                 
-                # Delete records after successful archival
-                old_records.delete()
-            
-            elif data_type == 'old_kyc_documents':
-                # Archive rejected/expired KYC documents older than retention period
-                cutoff_date = archive_date
-                old_docs = KYCDocument.objects.filter(
-                    created_at__lt=cutoff_date,
-                    verification_status__in=[
-                        KYCDocument.VerificationStatus.REJECTED,
-                        KYCDocument.VerificationStatus.EXPIRED
-                    ]
+                pks = [row['id'] for row in rows]
+                checkpoint.update(
+                    last_pk=str(pks[-1]),
+                    records_archived=checkpoint['records_archived'] + len(rows),
+                    bytes_written=bytes_written,
                 )
+                self._write_checkpoint(checkpoint_file, checkpoint)
                 
-                for doc in old_docs:
-                    archived_record = {
-                        'id': str(doc.id),
-                        'user_id': doc.user.id,
-                        'document_type': doc.document_type,
-                        'verification_status': doc.verification_status,
-                        'created_at': doc.created_at.isoformat(),
-                        'archived_at': timezone.now().isoformat()
-                    }
-                    archived_records.append(archived_record)
-                    archive_count += 1
-                
-                # Write archive
-                with open(archive_file, 'w') as f:
-                    json.dump({
-                        'archive_type': data_type,
-                        'archive_date': archive_date.isoformat(),
-                        'records_count': archive_count,
-                        'records': archived_records
-                    }, f, indent=2)
+                # Delete after successful archival, one bounded primary-key batch per chunk
+                to_delete = model.objects.filter(pk__in=pks)
+                if drop_until is not None:
+                    to_delete = to_delete.filter(**{f'{partition_field}__gte': drop_until})
+                to_delete.delete()
                 
-                # Delete after archival
-                old_docs.delete()
+                session_records += len(rows)
+                elapsed = time.monotonic() - started
+                logger.info(
+                    f"Archived {checkpoint['records_archived']} {data_type} records "
+                    f"({session_records / elapsed if elapsed else 0:.0f} rows/s)"
+                )
+            
+            dropped, drop_error = [], None
+            if drop_until is not None:
+                try:
+                    dropped = partition_manager.drop_partitions_before(model._meta.db_table, archive_date)
+                except Exception as e:
+                    drop_error = str(e)
+                    logger.error(f"Error dropping {data_type} partitions, deleting rows instead: {e}")
+                # Archived rows the drop did not remove (failed or partial drop) are deleted row-wise
+                leftover = queryset.filter(**{f'{partition_field}__lt': drop_until})
+                if checkpoint['last_pk'] is not None:
+                    leftover = leftover.filter(pk__lte=checkpoint['last_pk'])
+                self._delete_in_batches(leftover, chunk_size)
+            
+            checkpoint['completed'] = True
+            self._write_checkpoint(checkpoint_file, checkpoint)
+            elapsed = time.monotonic() - started
             
             return {
                 'status': 'success',
                 'data_type': data_type,
                 'archive_file': str(archive_file),
-                'records_archived': archive_count,
+                'records_archived': checkpoint['records_archived'],
                 'archive_date': archive_date.isoformat(),
-                'file_size_mb': archive_file.stat().st_size / 1024 / 1024 if archive_file.exists() else 0
+                'file_size_mb': archive_file.stat().st_size / 1024 / 1024 if archive_file.exists() else 0,
+                'duration_seconds': round(elapsed, 2),
+                'rows_per_second': round(session_records / elapsed, 1) if elapsed else 0,
+                'partitions_dropped': dropped,
+                'partition_drop_error': drop_error,
             }
             
         except Exception as e:
@@ -367,11 +367,13 @@ class AMLMonitoring:
         now = timezone.now()
         time_threshold = now - timedelta(minutes=self.suspicious_thresholds['rapid_succession_minutes'])
         
+        # Bounded range (partition pruning) and stop counting at the threshold
         recent_trades = AuditTrail.objects.filter(
             user=user,
             action_type=AuditTrail.ActionType.TRADE_ORDER,
-            timestamp__gte=time_threshold
-        ).count()
+            timestamp__gte=time_threshold,
+            timestamp__lte=now
+        ).values('id')[:5].count()
         
         return recent_trades >= 5  # 5 trades in 5 minutes
     
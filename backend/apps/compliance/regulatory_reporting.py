@@ -5,7 +5,7 @@ Generates and manages various regulatory reports as per SEBI requirements
 import csv
 import json
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, Iterator, List, Any, Optional
 from datetime import datetime, timedelta, date
 from decimal import Decimal
 from io import StringIO, BytesIO
@@ -14,6 +14,7 @@ from django.contrib.auth import get_user_model
 from django.db.models import Q, Sum, Count, Avg
 from django.conf import settings
 from django.core.files.base import ContentFile
+from django.http import StreamingHttpResponse
 import pandas as pd
 
 from .models import (
@@ -35,8 +36,9 @@ class SEBIReportGenerator:
     def generate_daily_trading_report(self, report_date: date) -> Dict[str, Any]:
         """Generate daily trading activity report"""
         try:
-            start_datetime = datetime.combine(report_date, datetime.min.time())
-            end_datetime = datetime.combine(report_date, datetime.max.time())
+            # Aware, half-open day range so the planner can prune to one partition
+            start_datetime = timezone.make_aware(datetime.combine(report_date, datetime.min.time()))
+            end_datetime = timezone.make_aware(datetime.combine(report_date + timedelta(days=1), datetime.min.time()))
             
             # Get trading activities from audit trail
             trading_activities = AuditTrail.objects.filter(
@@ -45,7 +47,8 @@ class SEBIReportGenerator:
                     AuditTrail.ActionType.TRADE_EXECUTION,
                     AuditTrail.ActionType.TRADE_CANCELLATION
                 ],
-                timestamp__range=[start_datetime, end_datetime]
+                timestamp__gte=start_datetime,
+                timestamp__lt=end_datetime
             ).select_related('user')
             
             report_data = {
@@ -102,7 +105,8 @@ class SEBIReportGenerator:
             
             # Get alerts for the day
             daily_alerts = TradingAlert.objects.filter(
-                triggered_at__range=[start_datetime, end_datetime]
+                triggered_at__gte=start_datetime,
+                triggered_at__lt=end_datetime
             )
             
             report_data['alerts_triggered'] = daily_alerts.count()
@@ -592,23 +596,35 @@ class ReportManager:
                 'error': f'Report creation failed: {str(e)}'
             }
     
-    def export_report_csv(self, report_id: str) -> Optional[bytes]:
-        """Export report as CSV file"""
+    def export_report_csv(self, report_id: str) -> Optional[StreamingHttpResponse]:
+        """Export report as a CSV download, streamed row by row from iter_report_csv"""
+        chunks = self.iter_report_csv(report_id)
+        if chunks is None:
+            return None
+        response = StreamingHttpResponse(chunks, content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="regulatory_report_{report_id}.csv"'
+        response['X-Accel-Buffering'] = 'no'  # Let proxies pass the first bytes straight through
+        return response
+    
+    def iter_report_csv(self, report_id: str) -> Optional[Iterator[bytes]]:
+        """Report as CSV, encoded row by row (for StreamingHttpResponse)"""
         try:
             report = RegulatoryReporting.objects.get(id=report_id)
             report_data = report.report_data
             
             # Create CSV based on report type
             if report.report_type == RegulatoryReporting.ReportType.DAILY_TRADES:
-                return self._export_daily_trades_csv(report_data)
+                rows = self._daily_trades_csv_rows(report_data)
             elif report.report_type == RegulatoryReporting.ReportType.MONTHLY_CLIENT:
-                return self._export_monthly_client_csv(report_data)
+                rows = self._monthly_client_csv_rows(report_data)
             elif report.report_type == RegulatoryReporting.ReportType.AML_REPORT:
-                return self._export_str_csv(report_data)
+                rows = self._str_csv_rows(report_data)
             elif report.report_type == RegulatoryReporting.ReportType.QUARTERLY_COMPLIANCE:
-                return self._export_compliance_csv(report_data)
+                rows = self._compliance_csv_rows(report_data)
+            else:
+                return None
             
-            return None
+            return self._encode_csv(rows)
             
         except RegulatoryReporting.DoesNotExist:
             logger.error(f"Report {report_id} not found")
@@ -617,17 +633,24 @@ class ReportManager:
             logger.error(f"CSV export failed: {str(e)}")
             return None
     
-    def _export_daily_trades_csv(self, report_data: Dict) -> bytes:
-        """Export daily trades report as CSV"""
-        output = StringIO()
-        writer = csv.writer(output)
-        
+    @staticmethod
+    def _encode_csv(rows: Iterable[List[Any]]) -> Iterator[bytes]:
+        buffer = StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    
+    def _daily_trades_csv_rows(self, report_data: Dict) -> Iterator[List[Any]]:
+        """Export daily trades report as CSV rows"""
         # Header
-        writer.writerow(['Date', 'Total Trades', 'Total Users', 'Orders Placed', 
-                        'Orders Executed', 'Orders Cancelled', 'Alerts Triggered'])
+        yield ['Date', 'Total Trades', 'Total Users', 'Orders Placed', 
+               'Orders Executed', 'Orders Cancelled', 'Alerts Triggered']
         
         # Data
-        writer.writerow([
+        yield [
             report_data.get('report_date', ''),
             report_data.get('total_trades', 0),
             report_data.get('total_users', 0),
@@ -635,39 +658,34 @@ class ReportManager:
             report_data.get('trade_summary', {}).get('orders_executed', 0),
             report_data.get('trade_summary', {}).get('orders_cancelled', 0),
             report_data.get('alerts_triggered', 0)
-        ])
+        ]
         
         # User activities
-        writer.writerow([])  # Empty row
-        writer.writerow(['User Activities'])
-        writer.writerow(['User ID', 'User Name', 'Orders Placed', 'Orders Executed', 
-                        'Orders Cancelled', 'Total Value'])
+        yield []  # Empty row
+        yield ['User Activities']
+        yield ['User ID', 'User Name', 'Orders Placed', 'Orders Executed', 
+               'Orders Cancelled', 'Total Value']
         
         for user_activity in report_data.get('user_activities', []):
-            writer.writerow([
+            yield [
                 user_activity.get('user_id', ''),
                 user_activity.get('user_name', ''),
                 user_activity.get('orders_placed', 0),
                 user_activity.get('orders_executed', 0),
                 user_activity.get('orders_cancelled', 0),
                 user_activity.get('total_value', 0)
-            ])
-        
-        return output.getvalue().encode('utf-8')
+            ]
     
-    def _export_str_csv(self, report_data: Dict) -> bytes:
-        """Export STR report as CSV"""
-        output = StringIO()
-        writer = csv.writer(output)
-        
+    def _str_csv_rows(self, report_data: Dict) -> Iterator[List[Any]]:
+        """Export STR report as CSV rows"""
         # Header
-        writer.writerow(['Client ID', 'Client Name', 'PAN Number', 'Alert Type', 
-                        'Severity', 'Description', 'Trigger Value', 'Triggered At',
-                        'KYC Status', 'Risk Profile'])
+        yield ['Client ID', 'Client Name', 'PAN Number', 'Alert Type', 
+               'Severity', 'Description', 'Trigger Value', 'Triggered At',
+               'KYC Status', 'Risk Profile']
         
         # STR entries
         for entry in report_data.get('str_entries', []):
-            writer.writerow([
+            yield [
                 entry.get('client_id', ''),
                 entry.get('client_name', ''),
                 entry.get('pan_number', ''),
@@ -678,30 +696,25 @@ class ReportManager:
                 entry.get('triggered_at', ''),
                 entry.get('kyc_status', ''),
                 entry.get('risk_profile', '')
-            ])
-        
-        return output.getvalue().encode('utf-8')
+            ]
     
-    def _export_monthly_client_csv(self, report_data: Dict) -> bytes:
-        """Export monthly client report as CSV"""
-        output = StringIO()
-        writer = csv.writer(output)
-        
+    def _monthly_client_csv_rows(self, report_data: Dict) -> Iterator[List[Any]]:
+        """Export monthly client report as CSV rows"""
         # Summary
-        writer.writerow(['Monthly Client Report Summary'])
-        writer.writerow(['Period', report_data.get('period', '')])
-        writer.writerow(['Total Clients', report_data.get('client_summary', {}).get('total_clients', 0)])
-        writer.writerow(['Active Clients', report_data.get('client_summary', {}).get('active_clients', 0)])
-        writer.writerow(['New Registrations', report_data.get('client_summary', {}).get('new_registrations', 0)])
-        writer.writerow([])
+        yield ['Monthly Client Report Summary']
+        yield ['Period', report_data.get('period', '')]
+        yield ['Total Clients', report_data.get('client_summary', {}).get('total_clients', 0)]
+        yield ['Active Clients', report_data.get('client_summary', {}).get('active_clients', 0)]
+        yield ['New Registrations', report_data.get('client_summary', {}).get('new_registrations', 0)]
+        yield []
         
         # Client details
-        writer.writerow(['Client Details'])
-        writer.writerow(['Client ID', 'Client Name', 'PAN Number', 'KYC Status', 
-                        'Risk Profile', 'Trades Count', 'Alerts Count', 'Registration Date'])
+        yield ['Client Details']
+        yield ['Client ID', 'Client Name', 'PAN Number', 'KYC Status', 
+               'Risk Profile', 'Trades Count', 'Alerts Count', 'Registration Date']
         
         for client in report_data.get('client_details', []):
-            writer.writerow([
+            yield [
                 client.get('client_id', ''),
                 client.get('client_name', ''),
                 client.get('pan_number', ''),
@@ -710,31 +723,25 @@ class ReportManager:
                 client.get('trades_count', 0),
                 client.get('alerts_count', 0),
                 client.get('registration_date', '')
-            ])
-        
-        return output.getvalue().encode('utf-8')
+            ]
     
-    def _export_compliance_csv(self, report_data: Dict) -> bytes:
-        """Export quarterly compliance report as CSV"""
-        output = StringIO()
-        writer = csv.writer(output)
-        
+    def _compliance_csv_rows(self, report_data: Dict) -> Iterator[List[Any]]:
+        """Export quarterly compliance report as CSV rows"""
         # Compliance metrics
-        writer.writerow(['Quarterly Compliance Report'])
-        writer.writerow(['Period', report_data.get('period', '')])
-        writer.writerow([])
+        yield ['Quarterly Compliance Report']
+        yield ['Period', report_data.get('period', '')]
+        yield []
         
-        writer.writerow(['Compliance Metrics'])
+        yield ['Compliance Metrics']
         metrics = report_data.get('compliance_metrics', {})
         for key, value in metrics.items():
-            writer.writerow([key.replace('_', ' ').title(), value])
+            yield [key.replace('_', ' ').title(), value]
         
-        writer.writerow([])
-        writer.writerow(['Recommendations'])
+        yield []
+        yield ['Recommendations']
         for recommendation in report_data.get('recommendations', []):
-            writer.writerow([recommendation])
-        
-        return output.getvalue().encode('utf-8')
+            yield [recommendation]
+
     
     def schedule_periodic_reports(self):
         """Schedule automatic generation of periodic reports"""
@@ -0,0 +1,187 @@
+"""
+Local OHLCV Bar Store
+Read-through cache in front of yfinance: bars are persisted per
+(symbol, interval, timestamp) and only the ranges not yet stored are downloaded.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+import pandas as pd
+import yfinance as yf
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import HistoricalBar, HistoricalBarCoverage
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Bar length per interval; also bounds how often the open tail is re-downloaded
+INTERVAL_DURATIONS = {
+    '1m': timedelta(minutes=1),
+    '2m': timedelta(minutes=2),
+    '5m': timedelta(minutes=5),
+    '15m': timedelta(minutes=15),
+    '30m': timedelta(minutes=30),
+    '60m': timedelta(hours=1),
+    '90m': timedelta(minutes=90),
+    '1h': timedelta(hours=1),
+    '1d': timedelta(days=1),
+    '5d': timedelta(days=5),
+    '1wk': timedelta(weeks=1),
+    '1mo': timedelta(days=30),
+}
+
+PERIOD_UNITS = {
+    'd': timedelta(days=1),
+    'wk': timedelta(weeks=1),
+    'mo': timedelta(days=30),
+    'y': timedelta(days=365),
+}
+
+
+def period_to_start(period: str, now: Optional[datetime] = None) -> datetime:
+    """Convert a yfinance period string ('60d', '3mo', '1y', 'ytd', 'max') to a start time"""
+    now = now or timezone.now()
+    period = period.strip().lower()
+    if period == 'ytd':
+        return now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    if period == 'max':
+        return datetime(1970, 1, 1, tzinfo=now.tzinfo)
+    for unit in sorted(PERIOD_UNITS, key=len, reverse=True):
+        if period.endswith(unit) and period[:-len(unit)].isdigit():
+            return now - int(period[:-len(unit)]) * PERIOD_UNITS[unit]
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def download_yfinance_bars(symbol: str, start: datetime, end: datetime, interval: str) -> pd.DataFrame:
+    """Download bars for [start, end] from Yahoo Finance"""
+    ticker = yf.Ticker(symbol)
+    # yfinance treats ``end`` as exclusive
+    df = ticker.history(start=start, end=end + INTERVAL_DURATIONS.get(interval, timedelta(days=1)),
+                        interval=interval, auto_adjust=True)
+    if df.empty:
+        return df
+    return df[OHLCV_COLUMNS]
+
+
+class BarStore:
+    """Read-through OHLCV store backed by HistoricalBar"""
+
+    def __init__(self, downloader: Callable[[str, datetime, datetime, str], pd.DataFrame] = download_yfinance_bars,
+                 source: str = 'YFINANCE'):
+        self.downloader = downloader
+        self.source = source
+
+    def get_history(self, symbol: str, period: str = "60d", interval: str = "1d") -> pd.DataFrame:
+        """Bars for a yfinance-style period ending now"""
+        return self.get_bars(symbol, period_to_start(period), interval=interval)
+
+    def get_bars(self, symbol: str, start: datetime, end: Optional[datetime] = None,
+                 interval: str = "1d") -> pd.DataFrame:
+        """Bars in [start, end], downloading only what is not stored yet"""
+        symbol = symbol.upper()
+        end = end or timezone.now()
+
+        for gap_start, gap_end, extends_tail in self.missing_ranges(symbol, interval, start, end):
+            try:
+                self._fill(symbol, interval, gap_start, gap_end, extends_tail)
+            except Exception as e:
+                # Serve whatever is stored; the gap is retried on the next read
+                logger.error(f"Error filling bars for {symbol} {interval} {gap_start} - {gap_end}: {e}")
+
+        return self._read(symbol, interval, start, end)
+
+    def missing_ranges(self, symbol: str, interval: str, start: datetime,
+                       end: datetime) -> List[Tuple[datetime, datetime, bool]]:
+        """
+        Ranges to download as (start, end, extends_tail) tuples.
+
+        Coverage is kept as one contiguous range per (symbol, interval), so a
+        request is missing at most a head range and a tail range. The tail is
+        re-downloaded from the last stored bar (which may still have been
+        forming) once it is older than one bar length.
+        """
+        coverage = HistoricalBarCoverage.objects.filter(symbol=symbol, interval=interval).first()
+        if coverage is None:
+            return [(start, end, True)]
+
+        ranges = []
+        if start < coverage.covered_from:
+            ranges.append((start, coverage.covered_from, False))
+
+        freshness = INTERVAL_DURATIONS.get(interval, timedelta(days=1))
+        if interval == '1d':
+            freshness = timedelta(minutes=15)  # Today's daily bar keeps changing during the session
+        if end > coverage.covered_to and timezone.now() - coverage.last_fetched_at >= freshness:
+            last_bar = HistoricalBar.objects.filter(
+                symbol=symbol, interval=interval, timestamp__lte=coverage.covered_to
+            ).order_by('-timestamp').values_list('timestamp', flat=True).first()
+            ranges.append((last_bar or coverage.covered_to, end, True))
+
+        return ranges
+
+    def _fill(self, symbol: str, interval: str, start: datetime, end: datetime, extends_tail: bool) -> int:
+        df = self.downloader(symbol, start, end, interval)
+        stored = self.upsert_bars(symbol, interval, df) if df is not None and not df.empty else 0
+
+        now = timezone.now()
+        coverage, created = HistoricalBarCoverage.objects.get_or_create(
+            symbol=symbol, interval=interval,
+            defaults={'covered_from': start, 'covered_to': min(end, now), 'last_fetched_at': now}
+        )
+        if not created:
+            coverage.covered_from = min(coverage.covered_from, start)
+            if extends_tail:
+                coverage.covered_to = max(coverage.covered_to, min(end, now))
+                coverage.last_fetched_at = now
+            coverage.save(update_fields=['covered_from', 'covered_to', 'last_fetched_at'])
+
+        logger.info(f"Stored {stored} {interval} bars for {symbol} ({start:%Y-%m-%d} - {end:%Y-%m-%d})")
+        return stored
+
+    def upsert_bars(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """Insert or overwrite bars from an OHLCV DataFrame indexed by bar time"""
+        df = df[OHLCV_COLUMNS].dropna(subset=['Open', 'High', 'Low', 'Close'])
+        index = df.index if df.index.tz is not None else df.index.tz_localize(settings.TIME_ZONE)
+        bars = [
+            HistoricalBar(
+                symbol=symbol, interval=interval, timestamp=timestamp.to_pydatetime(),
+                open=float(o), high=float(h), low=float(l), close=float(c), volume=0 if pd.isna(v) else int(v),
+                data_source=self.source,
+            )
+            for timestamp, (o, h, l, c, v) in zip(index, df.itertuples(index=False, name=None))
+        ]
+        HistoricalBar.objects.bulk_create(
+            bars,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['symbol', 'interval', 'timestamp'],
+            update_fields=['open', 'high', 'low', 'close', 'volume', 'data_source', 'updated_at'],
+        )
+        return len(bars)
+
+    def _read(self, symbol: str, interval: str, start: datetime, end: datetime) -> pd.DataFrame:
+        rows = HistoricalBar.objects.filter(
+            symbol=symbol, interval=interval, timestamp__gte=start, timestamp__lte=end
+        ).order_by('timestamp').values_list('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+        df = pd.DataFrame.from_records(list(rows), columns=['Date'] + OHLCV_COLUMNS)
+        index = pd.DatetimeIndex(pd.to_datetime(df.pop('Date'), utc=True)).tz_convert(settings.TIME_ZONE)
+        df.index = index.rename('Date')
+        return df
+
+    def invalidate(self, symbol: str, interval: Optional[str] = None) -> None:
+        """Drop stored bars and coverage so the next read downloads afresh"""
+        filters = {'symbol': symbol.upper()}
+        if interval:
+            filters['interval'] = interval
+        HistoricalBar.objects.filter(**filters).delete()
+        HistoricalBarCoverage.objects.filter(**filters).delete()
+
+
+# Global instance
+bar_store = BarStore()
@@ -0,0 +1,172 @@
+"""
+Conflated Websocket Streams for ShareWise AI
+Per-connection sender that keeps only the latest update per key and flushes
+at a client-chosen interval, optionally sends only the fields that changed
+since the previous frame (plus a ``removed`` list of fields that are gone),
+and encodes frames as JSON text or msgpack binary.
+
+Clients opt in with a message such as::
+
+    {"type": "stream_options", "format": "msgpack", "interval_ms": 250, "delta": true}
+"""
+import json
+import asyncio
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+FORMAT_JSON = 'json'
+FORMAT_MSGPACK = 'msgpack'
+
+MIN_INTERVAL_MS = 50
+MAX_INTERVAL_MS = 10000
+
+
+@dataclass
+class StreamOptions:
+    """Client-selected delivery options for one connection"""
+    format: str = FORMAT_JSON
+    interval_ms: int = 0  # 0 sends every update immediately
+    delta: bool = False
+
+    @classmethod
+    def from_request(cls, data: Dict[str, Any]) -> 'StreamOptions':
+        fmt = data.get('format', FORMAT_JSON)
+        if fmt not in (FORMAT_JSON, FORMAT_MSGPACK):
+            raise ValueError(f"Unsupported format: {fmt}")
+        if fmt == FORMAT_MSGPACK and not MSGPACK_AVAILABLE:
+            raise ValueError("msgpack format is not available")
+
+        interval_ms = int(data.get('interval_ms') or 0)
+        if interval_ms:
+            interval_ms = min(max(interval_ms, MIN_INTERVAL_MS), MAX_INTERVAL_MS)
+
+        return cls(format=fmt, interval_ms=interval_ms, delta=bool(data.get('delta', False)))
+
+
+def encode_frame(message: Dict[str, Any], fmt: str = FORMAT_JSON) -> Tuple[Optional[str], Optional[bytes]]:
+    """(text_data, bytes_data) for ``message`` in the requested format"""
+    if fmt == FORMAT_MSGPACK:
+        return None, msgpack.packb(message, default=str, use_bin_type=True)
+    return json.dumps(message), None
+
+
+def diff_fields(previous: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Any]:
+    """Top-level fields of ``current`` that differ from ``previous``"""
+    return {name: value for name, value in current.items()
+            if name not in previous or previous[name] != value}
+
+
+def removed_fields(previous: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """Top-level fields of ``previous`` that ``current`` no longer has"""
+    return [name for name in previous if name not in current]
+
+
+class ConflatingSender:
+    """Outbound frame writer for one websocket connection"""
+
+    def __init__(self, send: Callable[..., Awaitable[None]]):
+        self._send = send
+        self.options = StreamOptions()
+        self._pending: Dict[Tuple[str, str], Tuple[Any, str, Dict[str, Any]]] = {}
+        self._last_sent: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self.conflated = 0
+
+    def configure(self, data: Dict[str, Any]) -> StreamOptions:
+        """Apply a client's stream_options request (raises ValueError when invalid)"""
+        self.options = StreamOptions.from_request(data)
+        # Start the new stream from full frames
+        self._last_sent.clear()
+        self._pending.clear()
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        return self.options
+
+    def options_dict(self) -> Dict[str, Any]:
+        return asdict(self.options)
+
+    async def send(self, message: Dict[str, Any]) -> None:
+        """Send a frame immediately in the connection's format"""
+        text_data, bytes_data = encode_frame(message, self.options.format)
+        await self._send(text_data=text_data, bytes_data=bytes_data)
+
+    async def push(self, message_type: str, key: Optional[str], data: Any, data_field: str = 'data',
+                   **fields) -> None:
+        """
+        Queue an update that may be conflated with later updates for the same key.
+
+        ``data`` is sent under ``data_field`` (and delta-encoded when enabled);
+        ``fields`` are sent alongside it unchanged (e.g. symbol, timestamp).
+        A ``key`` of None marks an update that cannot be matched to others:
+        it is sent immediately as a full frame.
+        """
+        if key is None:
+            await self.send({'type': message_type, **fields, data_field: data})
+            return
+
+        if not self.options.interval_ms:
+            await self._emit(message_type, key, data, data_field, fields)
+            return
+
+        if (message_type, key) in self._pending:
+            self.conflated += 1
+        self._pending[(message_type, key)] = (data, data_field, fields)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self._flush_loop())
+
+    def reset(self, key: Optional[str] = None) -> None:
+        """Forget what was last sent so the next frame for ``key`` (or every key) is complete"""
+        if key is None:
+            self._last_sent.clear()
+            return
+        for sent_key in [k for k in self._last_sent if k[1] == key]:
+            del self._last_sent[sent_key]
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        for (message_type, key), (data, data_field, fields) in pending.items():
+            await self._emit(message_type, key, data, data_field, fields)
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        self._pending.clear()
+
+    async def _emit(self, message_type: str, key: str, data: Any, data_field: str,
+                    fields: Dict[str, Any]) -> None:
+        message = {'type': message_type, **fields}
+        if self.options.delta and isinstance(data, dict):
+            previous = self._last_sent.get((message_type, key))
+            self._last_sent[(message_type, key)] = data
+            if previous is not None:
+                removed = removed_fields(previous, data)
+                data = diff_fields(previous, data)
+                if not data and not removed:
+                    return
+                message['delta'] = True
+                if removed:
+                    message['removed'] = removed
+            else:
+                message['delta'] = False
+        message[data_field] = data
+        await self.send(message)
+
+    async def _flush_loop(self) -> None:
+        interval = self.options.interval_ms / 1000
+        while self.options.interval_ms:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing conflated stream: {e}")
@@ -4,6 +4,8 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth.models import AnonymousUser
 from .services import get_market_data_service
+from .fanout import market_data_fanout
+from .conflation import ConflatingSender
 from .models import WebSocketConnection, DataSubscription
 from django.utils import timezone
 
@@ -19,6 +21,7 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
         self.connection_id = None
         self.subscribed_symbols = set()
         self.market_service = None
+        self.stream = ConflatingSender(self.send)
     
     async def connect(self):
         """Handle WebSocket connection"""
@@ -70,6 +73,12 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
                     self.channel_name
                 )
             
+            await self.stream.close()
+            
+            # Leave every per-symbol group
+            await market_data_fanout.unsubscribe_all(self.channel_name, self.subscribed_symbols)
+            self.subscribed_symbols.clear()
+            
             # Update connection record
             await self.update_connection_status('DISCONNECTED')
             
@@ -90,6 +99,8 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
                 await self.handle_unsubscribe(data)
             elif message_type == 'ping':
                 await self.handle_ping()
+            elif message_type == 'stream_options':
+                await self.handle_stream_options(data)
             else:
                 await self.send_error("Unknown message type")
                 
@@ -119,6 +130,7 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
                 
                 if success:
                     self.subscribed_symbols.add(symbol)
+                    await market_data_fanout.subscribe(self.channel_name, symbol)
                     results.append({'symbol': symbol, 'status': 'subscribed'})
                     
                     # Send initial quote
@@ -128,10 +140,10 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
                 else:
                     results.append({'symbol': symbol, 'status': 'error', 'message': message})
             
-            await self.send(text_data=json.dumps({
+            await self.stream.send({
                 'type': 'subscription_response',
                 'results': results
-            }))
+            })
             
         except Exception as e:
             logger.error(f"Error handling subscribe: {e}")
@@ -148,6 +160,7 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
             for symbol in symbols:
                 if symbol in self.subscribed_symbols:
                     self.subscribed_symbols.remove(symbol)
+                    await market_data_fanout.unsubscribe(self.channel_name, symbol)
                     results.append({'symbol': symbol, 'status': 'unsubscribed'})
                 else:
                     results.append({'symbol': symbol, 'status': 'not_subscribed'})
@@ -155,22 +168,35 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
             # Update WebSocket connection record
             await self.update_subscribed_symbols()
             
-            await self.send(text_data=json.dumps({
+            await self.stream.send({
                 'type': 'unsubscription_response',
                 'results': results
-            }))
+            })
             
         except Exception as e:
             logger.error(f"Error handling unsubscribe: {e}")
             await self.send_error("Unsubscription failed")
     
+    async def handle_stream_options(self, data):
+        """Handle conflation/delta/format preferences for this connection"""
+        try:
+            self.stream.configure(data)
+        except ValueError as e:
+            await self.send_error(str(e))
+            return
+        
+        await self.stream.send({
+            'type': 'stream_options_response',
+            'options': self.stream.options_dict()
+        })
+    
     async def handle_ping(self):
         """Handle ping message"""
         await self.update_last_ping()
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'pong',
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     async def market_data_update(self, event):
         """Handle market data update from channel layer"""
@@ -179,11 +205,7 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
             data = event['data']
             
             if symbol in self.subscribed_symbols:
-                await self.send(text_data=json.dumps({
-                    'type': 'quote_update',
-                    'symbol': symbol,
-                    'data': data
-                }))
+                await self.stream.push('quote_update', symbol, data, symbol=symbol)
         except Exception as e:
             logger.error(f"Error sending market data update: {e}")
     
@@ -193,40 +215,32 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
             underlying = event['underlying']
             data = event['data']
             
-            # Check if user is interested in this underlying
-            for symbol in self.subscribed_symbols:
-                if underlying in symbol:  # Simple check, can be improved
-                    await self.send(text_data=json.dumps({
-                        'type': 'option_chain_update',
-                        'underlying': underlying,
-                        'data': data
-                    }))
-                    break
+            # Delivered through the underlying's symbol group, so only subscribers get here
+            if underlying in self.subscribed_symbols:
+                await self.stream.push('option_chain_update', underlying, data, underlying=underlying)
         except Exception as e:
             logger.error(f"Error sending option chain update: {e}")
     
     async def send_quote_update(self, symbol, quote_data):
         """Send quote update to client"""
-        await self.send(text_data=json.dumps({
-            'type': 'quote_update',
+        # Initial quotes are always complete frames, even on delta streams
+        self.stream.reset(symbol)
+        await self.stream.push('quote_update', symbol, {
             'symbol': symbol,
-            'data': {
-                'symbol': symbol,
-                'last_price': float(quote_data['last_price']),
-                'change': float(quote_data['change']),
-                'change_percent': float(quote_data['change_percent']),
-                'volume': quote_data['volume'],
-                'timestamp': quote_data['timestamp'].isoformat()
-            }
-        }))
+            'last_price': float(quote_data['last_price']),
+            'change': float(quote_data['change']),
+            'change_percent': float(quote_data['change_percent']),
+            'volume': quote_data['volume'],
+            'timestamp': quote_data['timestamp'].isoformat()
+        }, symbol=symbol)
     
     async def send_error(self, message):
         """Send error message to client"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'error',
             'message': message,
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     @database_sync_to_async
     def get_user_subscription(self):
@@ -286,6 +300,10 @@ class MarketDataConsumer(AsyncWebsocketConsumer):
 class OptionChainConsumer(AsyncWebsocketConsumer):
     """WebSocket consumer specifically for options chain data"""
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stream = ConflatingSender(self.send)
+    
     async def connect(self):
         """Handle connection for options chain"""
         self.user = self.scope.get("user")
@@ -302,17 +320,31 @@ class OptionChainConsumer(AsyncWebsocketConsumer):
         
         await self.accept()
         
-        # Add to options group
-        await self.channel_layer.group_add("options_data", self.channel_name)
+        # Chain groups are joined per underlying as the client requests them
+        self.underlyings = set()
     
     async def disconnect(self, close_code):
         """Handle disconnection"""
-        await self.channel_layer.group_discard("options_data", self.channel_name)
+        await self.stream.close()
+        for underlying in getattr(self, 'underlyings', ()):
+            await market_data_fanout.unsubscribe_option_chain(self.channel_name, underlying)
     
     async def receive(self, text_data):
         """Handle options chain requests"""
         try:
             data = json.loads(text_data)
+            if data.get('type') == 'stream_options':
+                try:
+                    self.stream.configure(data)
+                except ValueError as e:
+                    await self.send_error(str(e))
+                    return
+                await self.stream.send({
+                    'type': 'stream_options_response',
+                    'options': self.stream.options_dict()
+                })
+                return
+            
             underlying = data.get('underlying')
             expiry = data.get('expiry')
             
@@ -325,12 +357,16 @@ class OptionChainConsumer(AsyncWebsocketConsumer):
             option_data = await market_service.get_option_chain(underlying, expiry)
             
             if option_data:
-                await self.send(text_data=json.dumps({
+                if underlying not in self.underlyings:
+                    self.underlyings.add(underlying)
+                    await market_data_fanout.subscribe_option_chain(self.channel_name, underlying)
+                
+                await self.stream.send({
                     'type': 'option_chain_data',
                     'underlying': underlying,
                     'expiry': expiry,
                     'data': option_data
-                }))
+                })
             else:
                 await self.send_error("Failed to fetch options chain")
                 
@@ -340,18 +376,16 @@ class OptionChainConsumer(AsyncWebsocketConsumer):
     
     async def option_chain_update(self, event):
         """Handle options chain updates from channel layer"""
-        await self.send(text_data=json.dumps({
-            'type': 'option_chain_update',
-            'underlying': event['underlying'],
-            'data': event['data']
-        }))
+        await self.stream.push(
+            'option_chain_update', event['underlying'], event['data'], underlying=event['underlying']
+        )
     
     async def send_error(self, message):
         """Send error message"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'error',
             'message': message
-        }))
+        })
     
     @database_sync_to_async
     def get_user_subscription(self):
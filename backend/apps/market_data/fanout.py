@@ -0,0 +1,191 @@
+"""
+Market Data Fan-out for ShareWise AI
+Every websocket joins one channel group per subscribed symbol, so a quote or
+option chain update is published once per symbol with ``group_send`` instead
+of once per connection. A symbol -> subscriber index (Redis sets when the
+cache is Redis-backed, process memory otherwise) tracks which symbols have
+live subscribers.
+"""
+import re
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+QUOTE_GROUP_PREFIX = 'md_quote.'
+OPTION_CHAIN_GROUP_PREFIX = 'md_chain.'
+
+# Channels group names are limited to ASCII alphanumerics, hyphens, underscores and periods
+_UNSAFE_GROUP_CHARS = re.compile(r'[^A-Za-z0-9_.]')
+
+
+def _group_name(prefix: str, symbol: str) -> str:
+    safe = _UNSAFE_GROUP_CHARS.sub(lambda m: f"-{ord(m.group()):x}", symbol.upper())
+    return f"{prefix}{safe}"[:99]
+
+
+def symbol_group(symbol: str) -> str:
+    """Channel group receiving quote updates for ``symbol``"""
+    return _group_name(QUOTE_GROUP_PREFIX, symbol)
+
+
+def option_chain_group(underlying: str) -> str:
+    """Channel group receiving option chain updates for ``underlying``"""
+    return _group_name(OPTION_CHAIN_GROUP_PREFIX, underlying)
+
+
+class SubscriberIndex:
+    """Symbol -> subscriber channel names"""
+
+    KEY_PREFIX = 'market_data:subscribers'
+    ACTIVE_KEY = 'market_data:active_symbols'
+
+    def __init__(self, expiry: Optional[int] = None):
+        # Mirrors the channel layer's group_expiry so entries of crashed workers age out
+        self.expiry = expiry or getattr(settings, 'MARKET_DATA_SUBSCRIBER_EXPIRY', 86400)
+        self._local: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self._redis = None
+        self._redis_checked = False
+
+    def _get_redis(self):
+        if not self._redis_checked:
+            self._redis_checked = True
+            try:
+                from django_redis import get_redis_connection
+                self._redis = get_redis_connection("default")
+            except Exception:
+                logger.info("Redis not available for subscriber index, using process memory")
+                self._redis = None
+        return self._redis
+
+    def _key(self, symbol: str) -> str:
+        return f"{self.KEY_PREFIX}:{symbol}"
+
+    def add(self, symbol: str, channel_name: str) -> None:
+        redis_conn = self._get_redis()
+        if redis_conn is None:
+            with self._lock:
+                self._local[symbol].add(channel_name)
+            return
+        pipe = redis_conn.pipeline()
+        pipe.sadd(self._key(symbol), channel_name)
+        pipe.expire(self._key(symbol), self.expiry)
+        pipe.sadd(self.ACTIVE_KEY, symbol)
+        pipe.execute()
+
+    def remove(self, symbol: str, channel_name: str) -> None:
+        redis_conn = self._get_redis()
+        if redis_conn is None:
+            with self._lock:
+                channels = self._local.get(symbol)
+                if channels is not None:
+                    channels.discard(channel_name)
+                    if not channels:
+                        del self._local[symbol]
+            return
+        pipe = redis_conn.pipeline()
+        pipe.srem(self._key(symbol), channel_name)
+        pipe.scard(self._key(symbol))
+        _, remaining = pipe.execute()
+        if not remaining:
+            redis_conn.srem(self.ACTIVE_KEY, symbol)
+
+    def subscriber_count(self, symbol: str) -> int:
+        redis_conn = self._get_redis()
+        if redis_conn is None:
+            with self._lock:
+                return len(self._local.get(symbol, ()))
+        return int(redis_conn.scard(self._key(symbol)))
+
+    def symbols(self) -> Set[str]:
+        """Symbols with at least one live subscriber"""
+        redis_conn = self._get_redis()
+        if redis_conn is None:
+            with self._lock:
+                return set(self._local)
+
+        symbols = [s.decode() if isinstance(s, bytes) else s for s in redis_conn.smembers(self.ACTIVE_KEY)]
+        if not symbols:
+            return set()
+        pipe = redis_conn.pipeline()
+        for symbol in symbols:
+            pipe.exists(self._key(symbol))
+        alive = pipe.execute()
+        expired = [symbol for symbol, exists in zip(symbols, alive) if not exists]
+        if expired:
+            redis_conn.srem(self.ACTIVE_KEY, *expired)
+        return {symbol for symbol, exists in zip(symbols, alive) if exists}
+
+
+class MarketDataFanout:
+    """Group membership and publishing for market data websockets"""
+
+    def __init__(self, index: Optional[SubscriberIndex] = None):
+        self.index = index or SubscriberIndex()
+        self._channel_layer = None
+
+    @property
+    def channel_layer(self):
+        if self._channel_layer is None:
+            self._channel_layer = get_channel_layer()
+        return self._channel_layer
+
+    async def subscribe(self, channel_name: str, symbol: str) -> None:
+        """Join the quote group for ``symbol``"""
+        await self.channel_layer.group_add(symbol_group(symbol), channel_name)
+        await sync_to_async(self.index.add)(symbol, channel_name)
+
+    async def unsubscribe(self, channel_name: str, symbol: str) -> None:
+        """Leave the quote group for ``symbol``"""
+        await self.channel_layer.group_discard(symbol_group(symbol), channel_name)
+        await sync_to_async(self.index.remove)(symbol, channel_name)
+
+    async def unsubscribe_all(self, channel_name: str, symbols: Iterable[str]) -> None:
+        for symbol in list(symbols):
+            try:
+                await self.unsubscribe(channel_name, symbol)
+            except Exception as e:
+                logger.error(f"Error unsubscribing {channel_name} from {symbol}: {e}")
+
+    async def subscribe_option_chain(self, channel_name: str, underlying: str) -> None:
+        await self.channel_layer.group_add(option_chain_group(underlying), channel_name)
+
+    async def unsubscribe_option_chain(self, channel_name: str, underlying: str) -> None:
+        await self.channel_layer.group_discard(option_chain_group(underlying), channel_name)
+
+    async def publish_quote(self, symbol: str, data: Dict) -> None:
+        """Send one quote update to every subscriber of ``symbol``"""
+        if not self.channel_layer:
+            return
+        await self.channel_layer.group_send(symbol_group(symbol), {
+            'type': 'market_data_update',
+            'symbol': symbol,
+            'data': data,
+        })
+
+    async def publish_option_chain(self, underlying: str, data: Dict) -> None:
+        """Send one option chain update to the chain group and the underlying's quote subscribers"""
+        if not self.channel_layer:
+            return
+        event = {
+            'type': 'option_chain_update',
+            'underlying': underlying,
+            'data': data,
+        }
+        await self.channel_layer.group_send(option_chain_group(underlying), event)
+        await self.channel_layer.group_send(symbol_group(underlying), event)
+
+    def active_symbols(self) -> Set[str]:
+        """Symbols that currently have websocket subscribers"""
+        return self.index.symbols()
+
+
+# Global instance
+market_data_fanout = MarketDataFanout()
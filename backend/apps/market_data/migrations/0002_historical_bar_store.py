@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-16 19:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('market_data', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoricalBar',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('symbol', models.CharField(max_length=50)),
+                ('interval', models.CharField(default='1d', max_length=10)),
+                ('timestamp', models.DateTimeField(help_text='Bar open time')),
+                ('open', models.FloatField()),
+                ('high', models.FloatField()),
+                ('low', models.FloatField()),
+                ('close', models.FloatField()),
+                ('volume', models.BigIntegerField(default=0)),
+                ('data_source', models.CharField(default='YFINANCE', max_length=50)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Historical Bar',
+                'verbose_name_plural': 'Historical Bars',
+                'db_table': 'historical_bar',
+                'ordering': ['symbol', 'interval', 'timestamp'],
+                'constraints': [models.UniqueConstraint(fields=('symbol', 'interval', 'timestamp'), name='unique_historical_bar')],
+            },
+        ),
+        migrations.CreateModel(
+            name='HistoricalBarCoverage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=50)),
+                ('interval', models.CharField(default='1d', max_length=10)),
+                ('covered_from', models.DateTimeField()),
+                ('covered_to', models.DateTimeField()),
+                ('last_fetched_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Historical Bar Coverage',
+                'verbose_name_plural': 'Historical Bar Coverage',
+                'db_table': 'historical_bar_coverage',
+                'unique_together': {('symbol', 'interval')},
+            },
+        ),
+    ]
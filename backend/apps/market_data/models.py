@@ -355,4 +355,54 @@ class WebSocketConnection(models.Model):
     def is_active(self):
         """Check if connection is active"""
         return self.status == self.Status.CONNECTED and self.last_ping and \
-               (timezone.now() - self.last_ping).seconds < 60  # 60 seconds timeout
\ No newline at end of file
+               (timezone.now() - self.last_ping).seconds < 60  # 60 seconds timeout
+
+class HistoricalBar(models.Model):
+    """Persistent OHLCV bar store, keyed by (symbol, interval, timestamp)"""
+    
+    id = models.BigAutoField(primary_key=True)
+    symbol = models.CharField(max_length=50)
+    interval = models.CharField(max_length=10, default='1d')
+    timestamp = models.DateTimeField(help_text="Bar open time")
+    
+    # OHLCV (floats: read back as NumPy columns for analytics)
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    volume = models.BigIntegerField(default=0)
+    
+    # Source tracking
+    data_source = models.CharField(max_length=50, default='YFINANCE')
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'historical_bar'
+        verbose_name = 'Historical Bar'
+        verbose_name_plural = 'Historical Bars'
+        ordering = ['symbol', 'interval', 'timestamp']
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'interval', 'timestamp'], name='unique_historical_bar'),
+        ]
+    
+    def __str__(self):
+        return f"{self.symbol} {self.interval} {self.timestamp:%Y-%m-%d %H:%M}"
+
+
+class HistoricalBarCoverage(models.Model):
+    """Contiguous time range already fetched into HistoricalBar per (symbol, interval)"""
+    
+    symbol = models.CharField(max_length=50)
+    interval = models.CharField(max_length=10, default='1d')
+    covered_from = models.DateTimeField()
+    covered_to = models.DateTimeField()
+    last_fetched_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'historical_bar_coverage'
+        verbose_name = 'Historical Bar Coverage'
+        verbose_name_plural = 'Historical Bar Coverage'
+        unique_together = ['symbol', 'interval']
+    
+    def __str__(self):
+        return f"{self.symbol} {self.interval}: {self.covered_from:%Y-%m-%d} - {self.covered_to:%Y-%m-%d}"
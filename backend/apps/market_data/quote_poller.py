@@ -0,0 +1,183 @@
+"""
+Real-time Quote Poller for ShareWise AI
+Polls every subscribed symbol once per cycle: quotes are fetched concurrently
+(bulk endpoints where the provider has them), cached with one ``set_many``,
+persisted with one bulk upsert and published per symbol group. The cycle
+interval stretches to fit the provider's rate limit and the cycle's own
+duration.
+"""
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import LiveMarketData
+from .fanout import market_data_fanout
+from apps.trading.streaming_indicators import streaming_indicator_store
+from apps.trading.option_chain_snapshots import option_chain_snapshots
+
+logger = logging.getLogger(__name__)
+
+LIVE_DATA_FIELDS = [
+    'last_price', 'change', 'change_percent', 'open_price', 'high_price', 'low_price',
+    'previous_close', 'volume', 'value', 'timestamp', 'data_source',
+]
+
+
+@dataclass
+class PollCycleStats:
+    """Outcome of one polling cycle"""
+    symbols: int = 0
+    quotes: int = 0
+    persisted: int = 0
+    provider_calls: int = 0
+    seconds: float = 0.0
+
+
+class QuotePoller:
+    """Batched polling loop behind MarketDataService.start_real_time_updates"""
+
+    def __init__(self, service, interval: Optional[float] = None, concurrency: Optional[int] = None):
+        self.service = service
+        self.interval = interval or getattr(settings, 'MARKET_DATA_POLL_INTERVAL', 1.0)
+        self.concurrency = concurrency or getattr(settings, 'MARKET_DATA_POLL_CONCURRENCY', 20)
+        self.max_interval = getattr(settings, 'MARKET_DATA_POLL_MAX_INTERVAL', 30.0)
+        # Last persisted (price, volume) per symbol, so unchanged quotes are not rewritten
+        self._last_persisted: Dict[str, tuple] = {}
+
+    async def fetch_quotes(self, provider, symbols: List[str], stats: PollCycleStats) -> Dict[str, Dict]:
+        """Quotes for ``symbols`` from one provider"""
+        get_quotes = getattr(provider, 'get_quotes', None)
+        if get_quotes is not None:
+            stats.provider_calls += 1
+            quotes = await get_quotes(symbols)
+            return {symbol: quote for symbol, quote in (quotes or {}).items() if quote}
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(symbol):
+            async with semaphore:
+                return await provider.get_quote(symbol)
+
+        stats.provider_calls += len(symbols)
+        results = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+        quotes = {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error polling quote for {symbol}: {result}")
+            elif result:
+                quotes[symbol] = result
+        return quotes
+
+    def persist(self, quotes: Dict[str, Dict]) -> int:
+        """Upsert changed quotes into LiveMarketData with one read and two bulk writes"""
+        changed = {
+            symbol: quote for symbol, quote in quotes.items()
+            if self._last_persisted.get(symbol) != (quote['last_price'], quote['volume'])
+        }
+        if not changed:
+            return 0
+
+        now = timezone.now()
+        with transaction.atomic():
+            existing = {
+                row.symbol: row
+                for row in LiveMarketData.objects.select_for_update().filter(symbol__in=list(changed))
+            }
+            to_update, to_create = [], []
+            for symbol, quote in changed.items():
+                row = existing.get(symbol)
+                if row is None:
+                    row = LiveMarketData(symbol=symbol, instrument_type=LiveMarketData.InstrumentType.EQUITY)
+                    to_create.append(row)
+                else:
+                    row.updated_at = now  # bulk_update skips auto_now
+                    to_update.append(row)
+                for name in LIVE_DATA_FIELDS:
+                    setattr(row, name, quote[name])
+            if to_update:
+                LiveMarketData.objects.bulk_update(to_update, LIVE_DATA_FIELDS + ['updated_at'], batch_size=500)
+            if to_create:
+                LiveMarketData.objects.bulk_create(to_create, batch_size=500)
+
+        for symbol, quote in changed.items():
+            self._last_persisted[symbol] = (quote['last_price'], quote['volume'])
+        return len(changed)
+
+    @staticmethod
+    def update_caches(quotes: Dict[str, Dict]) -> None:
+        cache.set_many({f"quote_{symbol}": quote for symbol, quote in quotes.items()}, timeout=1)
+        for symbol, quote in quotes.items():
+            try:
+                streaming_indicator_store.apply_quote(symbol, quote)
+            except Exception as e:
+                logger.error(f"Error updating streaming indicators for {symbol}: {e}")
+        try:
+            option_chain_snapshots.apply_quotes(quotes)
+        except Exception as e:
+            logger.error(f"Error re-pricing option chain snapshots: {e}")
+
+    async def poll_once(self, symbols: Iterable[str]) -> PollCycleStats:
+        """Fetch, store and publish one round of quotes"""
+        started = time.perf_counter()
+        symbols = sorted(symbols)
+        stats = PollCycleStats(symbols=len(symbols))
+        if not symbols:
+            return stats
+
+        provider = await self.service.get_primary_provider()
+        if provider is None:
+            return stats
+
+        quotes = await self.fetch_quotes(provider, symbols, stats)
+        stats.quotes = len(quotes)
+        if quotes:
+            for symbol, quote in quotes.items():
+                # Providers may leave the symbol blank; rows are keyed by the requested one
+                quote['symbol'] = quote.get('symbol') or symbol
+            await sync_to_async(self.update_caches)(quotes)
+            try:
+                stats.persisted = await sync_to_async(self.persist)(quotes)
+            except Exception as e:
+                logger.error(f"Error persisting live quotes: {e}")
+            await asyncio.gather(*(
+                self.service._broadcast_quote_update(symbol, quote) for symbol, quote in quotes.items()
+            ))
+
+        stats.seconds = time.perf_counter() - started
+        return stats
+
+    def next_delay(self, stats: PollCycleStats, rate_limit_per_minute: Optional[int]) -> float:
+        """Seconds to wait before the next cycle"""
+        interval = self.interval
+        if rate_limit_per_minute:
+            # Spread the provider budget evenly instead of bursting into 429s
+            interval = max(interval, stats.provider_calls * 60.0 / rate_limit_per_minute)
+        interval = min(interval, self.max_interval)
+        return max(0.0, interval - stats.seconds)
+
+    async def run(self):
+        """Poll forever"""
+        while True:
+            try:
+                symbols = await sync_to_async(market_data_fanout.active_symbols)()
+                stats = await self.poll_once(symbols)
+                config = await self.service.get_primary_config()
+                delay = self.next_delay(stats, config.rate_limit_per_minute if config else None)
+                if stats.symbols and stats.seconds > self.interval:
+                    logger.warning(
+                        f"Quote poll cycle took {stats.seconds:.2f}s for {stats.symbols} symbols "
+                        f"(target {self.interval:.2f}s)"
+                    )
+                await asyncio.sleep(delay)
+
+            except Exception as e:
+                logger.error(f"Error in real-time updates: {e}")
+                await asyncio.sleep(5)  # Wait longer on error
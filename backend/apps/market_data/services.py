@@ -1,3 +1,4 @@
+import time
 import asyncio
 import aiohttp
 import websockets
@@ -17,9 +18,15 @@ from urllib3.util.retry import Retry
 
 from .models import (NSEAPIConfiguration, MarketDataCache, LiveMarketData, 
                      MarketDataLog, WebSocketConnection, DataSubscription)
+from .fanout import market_data_fanout
+from apps.trading.streaming_indicators import streaming_indicator_store
+from apps.trading.option_chain_snapshots import option_chain_snapshots
 
 logger = logging.getLogger(__name__)
 
+# Seconds the primary NSEAPIConfiguration is cached for by MarketDataService
+PRIMARY_CONFIG_TTL = 60
+
 
 class NSEDataProvider:
     """NSE Official API Data Provider"""
@@ -44,7 +51,7 @@ class NSEDataProvider:
                 backoff_factor=0.5,
                 status_forcelist=[429, 500, 502, 503, 504],
             )
-            adapter = HTTPAdapter(max_retries=retry_strategy)
+            adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=20)
             self.session.mount("http://", adapter)
             self.session.mount("https://", adapter)
             self.session.headers.update(self.headers)
@@ -58,7 +65,7 @@ class NSEDataProvider:
             url = f"{self.base_url}/quote-equity"
             params = {'symbol': symbol}
             
-            response = self.session.get(url, params=params, timeout=10)
+            response = await asyncio.to_thread(self.session.get, url, params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -79,7 +86,7 @@ class NSEDataProvider:
             url = f"{self.base_url}/option-chain-indices"
             params = {'symbol': underlying}
             
-            response = self.session.get(url, params=params, timeout=15)
+            response = await asyncio.to_thread(self.session.get, url, params=params, timeout=15)
             
             if response.status_code == 200:
                 data = response.json()
@@ -198,6 +205,8 @@ class MarketDataService:
         self.providers = {}
         self.websocket_connections = {}
         self.channel_layer = get_channel_layer()
+        self._primary_config = None
+        self._primary_config_expires = 0.0
         
     @classmethod
     async def initialize(cls):
@@ -230,6 +239,21 @@ class MarketDataService:
         except Exception as e:
             logger.error(f"Error loading providers: {e}")
     
+    async def get_primary_config(self):
+        """Primary API configuration, re-read at most every PRIMARY_CONFIG_TTL seconds"""
+        now = time.monotonic()
+        if now >= self._primary_config_expires:
+            self._primary_config = await sync_to_async(NSEAPIConfiguration.get_primary_config)()
+            self._primary_config_expires = now + PRIMARY_CONFIG_TTL
+        return self._primary_config
+    
+    async def get_primary_provider(self):
+        """Data provider for the primary configuration"""
+        primary_config = await self.get_primary_config()
+        if not primary_config:
+            return None
+        return self.providers.get(primary_config.id)
+    
     async def get_live_quote(self, symbol: str, use_cache: bool = True) -> Optional[Dict]:
         """Get live quote with caching"""
         cache_key = f"quote_{symbol}"
@@ -241,11 +265,7 @@ class MarketDataService:
                 return cached_data
         
         # Get from primary provider
-        primary_config = await sync_to_async(NSEAPIConfiguration.get_primary_config)()
-        if not primary_config:
-            return None
-            
-        provider = self.providers.get(primary_config.id)
+        provider = await self.get_primary_provider()
         if not provider:
             return None
         
@@ -259,6 +279,9 @@ class MarketDataService:
             # Save to database
             await self._save_live_data(quote_data)
             
+            # Keep streaming indicator state current for live signal re-evaluation
+            await self._update_streaming_indicators(symbol, quote_data)
+            
             # Broadcast to WebSocket subscribers
             await self._broadcast_quote_update(symbol, quote_data)
         
@@ -269,15 +292,16 @@ class MarketDataService:
         cache_key = f"option_chain_{underlying}_{expiry or 'current'}"
         
         if use_cache:
+            # Precomputed chain (instruments, prices and Greeks) when we track this underlying
+            snapshot = await self._get_option_chain_snapshot(underlying, expiry)
+            if snapshot:
+                return snapshot
+            
             cached_data = await sync_to_async(cache.get)(cache_key)
             if cached_data:
                 return cached_data
         
-        primary_config = await sync_to_async(NSEAPIConfiguration.get_primary_config)()
-        if not primary_config:
-            return None
-            
-        provider = self.providers.get(primary_config.id)
+        provider = await self.get_primary_provider()
         if not provider:
             return None
         
@@ -292,6 +316,16 @@ class MarketDataService:
         
         return option_data
     
+    async def _get_option_chain_snapshot(self, underlying: str, expiry: str = None) -> Optional[Dict]:
+        """Option chain snapshot, or None for unknown underlyings and provider-format expiries"""
+        try:
+            return await sync_to_async(option_chain_snapshots.get)(underlying, expiry)
+        except ValueError:
+            return None
+        except Exception as e:
+            logger.error(f"Error reading option chain snapshot for {underlying}: {e}")
+            return None
+    
     async def subscribe_to_symbol(self, user_id: int, symbol: str, connection_id: str):
         """Subscribe user to real-time updates for a symbol"""
         try:
@@ -353,37 +387,33 @@ class MarketDataService:
         except Exception as e:
             logger.error(f"Error saving live data: {e}")
     
+    async def _update_streaming_indicators(self, symbol: str, quote_data: Dict):
+        """Fold the quote into the symbol's streaming indicator state, if one exists"""
+        try:
+            await sync_to_async(streaming_indicator_store.apply_quote)(symbol, quote_data)
+        except Exception as e:
+            logger.error(f"Error updating streaming indicators for {symbol}: {e}")
+        
+        try:
+            await sync_to_async(option_chain_snapshots.apply_quotes)({symbol: quote_data})
+        except Exception as e:
+            logger.error(f"Error re-pricing option chain snapshots for {symbol}: {e}")
+    
     async def _broadcast_quote_update(self, symbol: str, quote_data: Dict):
         """Broadcast quote update to WebSocket subscribers"""
         if not self.channel_layer:
             return
             
         try:
-            # Find all connections subscribed to this symbol
-            connections = await sync_to_async(list)(
-                WebSocketConnection.objects.filter(
-                    subscribed_symbols__contains=[symbol],
-                    status=WebSocketConnection.Status.CONNECTED
-                )
-            )
-            
-            # Broadcast to each connection
-            for conn in connections:
-                await self.channel_layer.send(
-                    f"market_data_{conn.connection_id}",
-                    {
-                        'type': 'market_data_update',
-                        'symbol': symbol,
-                        'data': {
-                            'symbol': symbol,
-                            'last_price': float(quote_data['last_price']),
-                            'change': float(quote_data['change']),
-                            'change_percent': float(quote_data['change_percent']),
-                            'volume': quote_data['volume'],
-                            'timestamp': quote_data['timestamp'].isoformat()
-                        }
-                    }
-                )
+            # One group_send per symbol; the channel layer fans out to subscribed sockets
+            await market_data_fanout.publish_quote(symbol, {
+                'symbol': symbol,
+                'last_price': float(quote_data['last_price']),
+                'change': float(quote_data['change']),
+                'change_percent': float(quote_data['change_percent']),
+                'volume': quote_data['volume'],
+                'timestamp': quote_data['timestamp'].isoformat()
+            })
                 
         except Exception as e:
             logger.error(f"Error broadcasting quote update: {e}")
@@ -394,52 +424,16 @@ class MarketDataService:
             return
             
         try:
-            # Broadcast to all connections interested in this underlying
-            connections = await sync_to_async(list)(
-                WebSocketConnection.objects.filter(
-                    status=WebSocketConnection.Status.CONNECTED
-                )
-            )
-            
-            for conn in connections:
-                await self.channel_layer.send(
-                    f"market_data_{conn.connection_id}",
-                    {
-                        'type': 'option_chain_update',
-                        'underlying': underlying,
-                        'data': option_data
-                    }
-                )
+            # Only sockets following this underlying receive the chain
+            await market_data_fanout.publish_option_chain(underlying, option_data)
                 
         except Exception as e:
             logger.error(f"Error broadcasting option chain update: {e}")
     
     async def start_real_time_updates(self):
         """Start periodic real-time updates"""
-        while True:
-            try:
-                # Get all actively subscribed symbols
-                connections = await sync_to_async(list)(
-                    WebSocketConnection.objects.filter(
-                        status=WebSocketConnection.Status.CONNECTED
-                    ).values_list('subscribed_symbols', flat=True)
-                )
-                
-                # Flatten the list of symbols
-                all_symbols = set()
-                for symbols_list in connections:
-                    all_symbols.update(symbols_list)
-                
-                # Update quotes for all symbols
-                for symbol in all_symbols:
-                    await self.get_live_quote(symbol, use_cache=False)
-                
-                # Wait before next update (1 second for real-time)
-                await asyncio.sleep(1)
-                
-            except Exception as e:
-                logger.error(f"Error in real-time updates: {e}")
-                await asyncio.sleep(5)  # Wait longer on error
+        from .quote_poller import QuotePoller
+        await QuotePoller(self).run()
 
 
 # Singleton instance
@@ -529,7 +523,7 @@ class FinnhubDataProvider:
         try:
             self._setup_session()
             params = {'symbol': symbol, 'token': self.api_key}
-            response = self.session.get(f"{self.base_url}/quote", params=params, timeout=10)
+            response = await asyncio.to_thread(self.session.get, f"{self.base_url}/quote", params=params, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
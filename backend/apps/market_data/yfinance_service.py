@@ -6,6 +6,9 @@ import asyncio
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 import logging
+from asgiref.sync import sync_to_async
+
+from .bar_store import bar_store
 
 logger = logging.getLogger(__name__)
 
@@ -65,8 +68,7 @@ class YFinanceService:
     async def get_historical_data(symbol: str, period: str = "1mo", interval: str = "1d") -> Optional[Dict]:
         """Get historical price data"""
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=period, interval=interval)
+            hist = await sync_to_async(bar_store.get_history)(symbol, period=period, interval=interval)
             
             if hist.empty:
                 return None
@@ -20,6 +20,7 @@ from django.core.exceptions import PermissionDenied, SuspiciousOperation
 from django.utils import timezone
 
 from apps.audit.models import AuditEvent
+from .rate_limiter import rate_limiter, RateLimitResult
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -171,12 +172,16 @@ class RateLimitMiddleware(MiddlewareMixin):
         if not limits:
             return None
         
-        # Check rate limit
-        if self._is_rate_limited(rate_limit_key, limits):
-            return self._rate_limit_response(request, limits)
+        # Check and record in one atomic call
+        result = rate_limiter.hit(rate_limit_key, limits['requests'], limits['window'])
+        if not result.allowed:
+            return self._rate_limit_response(request, limits, result)
         
-        # Record the request
-        self._record_request(rate_limit_key, limits)
+        request._rate_limit_info = {
+            'limit': result.limit,
+            'remaining': result.remaining,
+            'reset_time': result.reset_time,
+        }
         
         return None
     
@@ -280,44 +285,8 @@ class RateLimitMiddleware(MiddlewareMixin):
             ip = request.META.get('REMOTE_ADDR', '127.0.0.1')
         return ip
     
-    def _is_rate_limited(self, key: str, limits: Dict[str, int]) -> bool:
-        """Check if request should be rate limited using Redis sliding window"""
-        
-        current_time = int(time.time())
-        window_start = current_time - limits['window']
-        
-        # Get current request count from Redis cache
-        request_times = cache.get(key, [])
-        
-        # Remove old requests outside the window
-        request_times = [req_time for req_time in request_times if req_time > window_start]
-        
-        # Store updated list back to cache
-        if request_times:
-            cache.set(key, request_times, timeout=limits['window'])
-        else:
-            cache.delete(key)
-        
-        # Check if limit exceeded
-        return len(request_times) >= limits['requests']
-    
-    def _record_request(self, key: str, limits: Dict[str, int]) -> None:
-        """Record the current request"""
-        
-        current_time = int(time.time())
-        window_start = current_time - limits['window']
-        
-        # Get current request times
-        request_times = cache.get(key, [])
-        
-        # Remove old requests and add current request
-        request_times = [req_time for req_time in request_times if req_time > window_start]
-        request_times.append(current_time)
-        
-        # Store back in cache
-        cache.set(key, request_times, limits['window'] + 60)  # Extra 60 seconds buffer
-    
-    def _rate_limit_response(self, request: HttpRequest, limits: Dict[str, int]) -> HttpResponse:
+    def _rate_limit_response(self, request: HttpRequest, limits: Dict[str, int],
+                             result: RateLimitResult) -> HttpResponse:
         """Return rate limit exceeded response"""
         
         # Log rate limit violation
@@ -347,14 +316,14 @@ class RateLimitMiddleware(MiddlewareMixin):
         response_data = {
             'error': 'Rate limit exceeded',
             'message': f"Too many requests. Limit: {limits['requests']} per {limits['window']} seconds",
-            'retry_after': limits['window']
+            'retry_after': result.retry_after
         }
         
         response = JsonResponse(response_data, status=429)
-        response['Retry-After'] = str(limits['window'])
+        response['Retry-After'] = str(result.retry_after)
         response['X-RateLimit-Limit'] = str(limits['requests'])
         response['X-RateLimit-Remaining'] = '0'
-        response['X-RateLimit-Reset'] = str(int(time.time()) + limits['window'])
+        response['X-RateLimit-Reset'] = str(result.reset_time)
         
         return response
 
@@ -0,0 +1,140 @@
+"""
+Rate Limiter for ShareWise AI
+Shared rate-limiting engine behind RateLimitMiddleware and the audit
+SecurityMiddleware. With Redis each request is one atomic GCRA (generic cell
+rate algorithm) script call: the key holds a single theoretical arrival time,
+so memory per key is constant and every worker and node sees the same state.
+Without Redis it falls back to fixed-window counters in the Django cache.
+"""
+import math
+import time
+import logging
+import threading
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# KEYS: limiter key
+# ARGV: emission interval (ms), window (ms)
+# Returns {allowed, remaining, reset after (ms), retry after (ms)}
+GCRA = """
+local now_parts = redis.call('TIME')
+local now = now_parts[1] * 1000 + math.floor(now_parts[2] / 1000)
+local interval = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval
+local allow_at = new_tat - window
+if allow_at > now then
+    return {0, 0, math.ceil(tat - now), math.ceil(allow_at - now)}
+end
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil(new_tat - now))
+local remaining = math.floor((window - (new_tat - now)) / interval)
+return {1, remaining, math.ceil(new_tat - now), 0}
+"""
+
+
+@dataclass
+class RateLimitResult:
+    """Outcome of one rate-limit check"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: int  # seconds until the full limit is available again
+    retry_after: int  # seconds until the next request is allowed (0 when allowed)
+
+    @property
+    def reset_time(self) -> int:
+        return int(time.time()) + self.reset_after
+
+
+class RateLimiter:
+    """Check-and-record in one call: ``hit(key, limit, window)``"""
+
+    KEY_PREFIX = 'rl'
+
+    def __init__(self):
+        self._redis = None
+        self._redis_checked = False
+        self._script = None
+        self._lock = threading.Lock()
+
+    def _get_redis(self):
+        if not self._redis_checked:
+            with self._lock:
+                if not self._redis_checked:
+                    try:
+                        from django_redis import get_redis_connection
+                        self._redis = get_redis_connection("default")
+                        self._script = self._redis.register_script(GCRA)
+                    except Exception:
+                        logger.info("Redis not available for rate limiting, using cache counters")
+                        self._redis = None
+                    self._redis_checked = True
+        return self._redis
+
+    def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        """
+        Count one request against ``limit`` requests per ``window`` seconds.
+
+        Requests are allowed in bursts of up to ``limit`` and then at the
+        steady rate of ``limit / window``.
+        """
+        if limit <= 0:
+            return RateLimitResult(False, limit, 0, window, window)
+
+        redis_conn = self._get_redis()
+        if redis_conn is not None:
+            try:
+                return self._hit_redis(key, limit, window)
+            except Exception as e:
+                logger.error(f"Redis rate limit check failed for {key}: {e}")
+        return self._hit_cache(key, limit, window)
+
+    def _hit_redis(self, key: str, limit: int, window: int) -> RateLimitResult:
+        window_ms = window * 1000
+        interval_ms = window_ms / limit
+        allowed, remaining, reset_ms, retry_ms = self._script(
+            keys=[f"{self.KEY_PREFIX}:{key}"], args=[interval_ms, window_ms]
+        )
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=limit,
+            remaining=max(int(remaining), 0),
+            reset_after=math.ceil(int(reset_ms) / 1000),
+            retry_after=math.ceil(int(retry_ms) / 1000),
+        )
+
+    def _hit_cache(self, key: str, limit: int, window: int) -> RateLimitResult:
+        """Fixed window counter; add + incr keeps it atomic on backends that support it"""
+        now = time.time()
+        window_start = int(now // window) * window
+        reset_after = max(math.ceil(window_start + window - now), 1)
+        cache_key = f"{self.KEY_PREFIX}:{key}:{window_start}"
+        if cache.add(cache_key, 1, timeout=window + 1):
+            count = 1
+        else:
+            try:
+                count = cache.incr(cache_key)
+            except ValueError:
+                # Expired between add and incr
+                cache.add(cache_key, 1, timeout=window + 1)
+                count = 1
+
+        if count > limit:
+            return RateLimitResult(False, limit, 0, reset_after, reset_after)
+        return RateLimitResult(True, limit, limit - count, reset_after, 0)
+
+    def reset(self, key: str, window: int) -> None:
+        redis_conn = self._get_redis()
+        if redis_conn is not None:
+            redis_conn.delete(f"{self.KEY_PREFIX}:{key}")
+        window_start = int(time.time() // window) * window
+        cache.delete(f"{self.KEY_PREFIX}:{key}:{window_start}")
+
+
+# Global instance
+rate_limiter = RateLimiter()
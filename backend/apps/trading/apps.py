@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class TradingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.trading'
-    verbose_name = 'Trading'
\ No newline at end of file
+    verbose_name = 'Trading'
+
+    def ready(self):
+        import apps.trading.signals
@@ -0,0 +1,180 @@
+"""
+Vectorized Backtest Engine for ShareWise AI
+Computes every indicator series once over the full history, evaluates the
+rule-based scoring on all bars as array operations and simulates ATR-based
+target/stop exits in a single pass per symbol.
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Any, Optional
+from dataclasses import dataclass, field
+import logging
+
+from .market_analysis import RuleBasedAnalyzer, market_analysis_engine
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BacktestTrade:
+    """A single simulated round trip"""
+    entry_index: int
+    exit_index: int
+    direction: str
+    entry_price: float
+    exit_price: float
+    target_price: float
+    stop_loss: float
+    confidence: float
+    exit_reason: str
+    return_pct: float
+
+
+@dataclass
+class SymbolBacktestResult:
+    """Backtest outcome for one symbol"""
+    symbol: str
+    trades: List[BacktestTrade] = field(default_factory=list)
+    bars_evaluated: int = 0
+    error: Optional[str] = None
+
+    @property
+    def trade_returns(self) -> np.ndarray:
+        return np.array([trade.return_pct for trade in self.trades], dtype=float)
+
+    def summary(self) -> Dict[str, Any]:
+        returns = self.trade_returns
+        trades = len(returns)
+        wins = int((returns > 0).sum())
+        result = {
+            'symbol': self.symbol,
+            'trades': trades,
+            'winning_trades': wins,
+            'win_rate': round(wins / trades * 100, 1) if trades else 0,
+            'avg_return_pct': round(float(returns.mean()) * 100, 2) if trades else 0,
+            'total_return_pct': round(float(returns.sum()) * 100, 2),
+            'bars_evaluated': self.bars_evaluated,
+        }
+        if self.error:
+            result['error'] = self.error
+        return result
+
+
+class VectorizedBacktester:
+    """Walk-forward backtester for the rule-based signal engine"""
+
+    def __init__(self, min_confidence: float = 0.6, warmup_bars: int = 20,
+                 max_holding_bars: int = 10, target_atr_multiple: float = 2.0,
+                 stop_atr_multiple: float = 1.0):
+        self.min_confidence = min_confidence
+        self.warmup_bars = warmup_bars
+        self.max_holding_bars = max_holding_bars
+        self.target_atr_multiple = target_atr_multiple
+        self.stop_atr_multiple = stop_atr_multiple
+        self.rule_analyzer = RuleBasedAnalyzer()
+
+    def run(self, df: pd.DataFrame, symbol: str = '',
+            indicators: Optional[pd.DataFrame] = None) -> SymbolBacktestResult:
+        """Backtest a single OHLCV frame"""
+        result = SymbolBacktestResult(symbol=symbol)
+        n = len(df)
+        if n <= self.warmup_bars + 1:
+            return result
+
+        if indicators is None:
+            indicators = market_analysis_engine.technical_analyzer.calculate_indicator_series(df)
+        scores = self.rule_analyzer.generate_signal_arrays(indicators)
+
+        signal = scores['signal']
+        confidence = scores['confidence']
+        eligible = (signal != 0) & (confidence > self.min_confidence)
+        eligible[:self.warmup_bars] = False
+        eligible[-1] = False  # No bars left to exit into
+        result.bars_evaluated = n - self.warmup_bars
+
+        entries = np.flatnonzero(eligible)
+        if len(entries) == 0:
+            return result
+
+        close = indicators['close'].to_numpy()
+        atr = indicators['atr'].to_numpy()
+        high = df['High'].to_numpy(dtype=float)
+        low = df['Low'].to_numpy(dtype=float)
+
+        direction = signal[entries].astype(float)
+        entry_price = close[entries]
+        target = entry_price + direction * atr[entries] * self.target_atr_multiple
+        stop = entry_price - direction * atr[entries] * self.stop_atr_multiple
+
+        # Forward windows of the next ``max_holding_bars`` highs/lows for every entry
+        horizon = self.max_holding_bars
+        pad = np.full(horizon, np.nan)
+        high_windows = np.lib.stride_tricks.sliding_window_view(np.concatenate((high, pad)), horizon)
+        low_windows = np.lib.stride_tricks.sliding_window_view(np.concatenate((low, pad)), horizon)
+        fwd_high = high_windows[entries + 1]
+        fwd_low = low_windows[entries + 1]
+
+        is_long = (direction > 0)[:, None]
+        with np.errstate(invalid='ignore'):
+            stop_hit = np.where(is_long, fwd_low <= stop[:, None], fwd_high >= stop[:, None])
+            target_hit = np.where(is_long, fwd_high >= target[:, None], fwd_low <= target[:, None])
+
+        no_hit = horizon
+        first_stop = np.where(stop_hit.any(axis=1), stop_hit.argmax(axis=1), no_hit)
+        first_target = np.where(target_hit.any(axis=1), target_hit.argmax(axis=1), no_hit)
+        timeout_offset = np.minimum(horizon, n - 1 - entries) - 1
+
+        # Stop wins ties: when both levels fall inside one bar we assume the worse fill
+        exit_offset = np.minimum(np.minimum(first_stop, first_target), timeout_offset)
+        exit_index = entries + 1 + exit_offset
+        exit_reason = np.select(
+            [first_stop <= np.minimum(first_target, timeout_offset), first_target <= timeout_offset],
+            ['STOP_LOSS', 'TARGET'],
+            'TIME_EXIT',
+        )
+        exit_price = np.select(
+            [exit_reason == 'STOP_LOSS', exit_reason == 'TARGET'],
+            [stop, target],
+            close[exit_index],
+        )
+        with np.errstate(invalid='ignore', divide='ignore'):
+            trade_return = direction * (exit_price - entry_price) / entry_price
+
+        # One open position per symbol: skip entries while a trade is still running
+        busy_until = -1
+        for k, entry in enumerate(entries):
+            if entry <= busy_until:
+                continue
+            busy_until = exit_index[k]
+            result.trades.append(BacktestTrade(
+                entry_index=int(entry),
+                exit_index=int(exit_index[k]),
+                direction='BUY' if direction[k] > 0 else 'SELL',
+                entry_price=float(entry_price[k]),
+                exit_price=float(exit_price[k]),
+                target_price=float(target[k]),
+                stop_loss=float(stop[k]),
+                confidence=float(confidence[entry]),
+                exit_reason=str(exit_reason[k]),
+                return_pct=float(trade_return[k]),
+            ))
+
+        return result
+
+    def run_symbols(self, symbols: List[str], period_days: int) -> List[SymbolBacktestResult]:
+        """Fetch history and backtest each symbol"""
+        results = []
+        for symbol in symbols:
+            try:
+                df, indicators = market_analysis_engine.get_indicator_series(
+                    symbol, period=f"{period_days + 30}d"
+                )
+                results.append(self.run(df, symbol=symbol, indicators=indicators))
+            except Exception as e:
+                logger.warning(f"Error backtesting {symbol}: {e}")
+                results.append(SymbolBacktestResult(symbol=symbol, error=str(e)))
+        return results
+
+
+# Global instance
+vectorized_backtester = VectorizedBacktester()
@@ -6,7 +6,7 @@ import json
 import logging
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
@@ -15,6 +15,7 @@ from django.utils import timezone
 
 from .models import TradingSignal, TradingOrder, AutomatedTradeExecution, PortfolioPosition
 from .usage_limits import SubscriptionLimitService
+from apps.market_data.conflation import ConflatingSender
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,10 @@ logger = logging.getLogger(__name__)
 class AuthenticatedConsumer(AsyncWebsocketConsumer):
     """Base consumer with authentication and user management"""
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stream = ConflatingSender(self.send)
+    
     async def connect(self):
         """Handle WebSocket connection with authentication"""
         self.user = self.scope["user"]
@@ -36,16 +41,40 @@ class AuthenticatedConsumer(AsyncWebsocketConsumer):
     
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
+        await self.stream.close()
         logger.info(f"WebSocket disconnected: {self.__class__.__name__} for user {self.user.email if hasattr(self, 'user') else 'unknown'}")
     
     async def send_error(self, error_message: str, error_code: str = None):
         """Send error message to client"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'error',
             'error': error_message,
             'error_code': error_code,
             'timestamp': timezone.now().isoformat()
-        }))
+        })
+    
+    async def receive(self, text_data):
+        """Handle incoming messages from client"""
+        try:
+            data = json.loads(text_data)
+            if data.get('type') == 'stream_options':
+                await self.handle_stream_options(data)
+        except json.JSONDecodeError:
+            await self.send_error("Invalid JSON format")
+    
+    async def handle_stream_options(self, data: Dict[str, Any]):
+        """Handle conflation/delta/format preferences for this connection"""
+        try:
+            self.stream.configure(data)
+        except ValueError as e:
+            await self.send_error(str(e), 'INVALID_STREAM_OPTIONS')
+            return
+        
+        await self.stream.send({
+            'type': 'stream_options_response',
+            'options': self.stream.options_dict(),
+            'timestamp': timezone.now().isoformat()
+        })
 
 
 class TradingSignalsConsumer(AuthenticatedConsumer):
@@ -82,6 +111,8 @@ class TradingSignalsConsumer(AuthenticatedConsumer):
                     await self.unsubscribe_from_symbol(symbol)
             elif message_type == 'request_signals':
                 await self.send_recent_signals()
+            elif message_type == 'stream_options':
+                await self.handle_stream_options(data)
             
         except json.JSONDecodeError:
             await self.send_error("Invalid JSON format")
@@ -93,24 +124,24 @@ class TradingSignalsConsumer(AuthenticatedConsumer):
         symbol_group = f"signals_symbol_{symbol}"
         await self.channel_layer.group_add(symbol_group, self.channel_name)
         
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'subscription_confirmed',
             'symbol': symbol,
             'message': f'Subscribed to signals for {symbol}',
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     async def unsubscribe_from_symbol(self, symbol: str):
         """Unsubscribe from signals for specific symbol"""
         symbol_group = f"signals_symbol_{symbol}"
         await self.channel_layer.group_discard(symbol_group, self.channel_name)
         
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'subscription_cancelled',
             'symbol': symbol,
             'message': f'Unsubscribed from signals for {symbol}',
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     @database_sync_to_async
     def get_recent_signals(self):
@@ -135,29 +166,29 @@ class TradingSignalsConsumer(AuthenticatedConsumer):
             signal['stop_loss'] = float(signal['stop_loss']) if signal['stop_loss'] else None
             signal['created_at'] = signal['created_at'].isoformat()
         
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'recent_signals',
             'signals': signals,
             'count': len(signals),
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     # WebSocket event handlers
     async def new_signal(self, event):
         """Handle new trading signal event"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'new_signal',
             'signal': event['signal'],
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     async def signal_update(self, event):
         """Handle signal update event"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'signal_update',
             'signal': event['signal'],
             'timestamp': timezone.now().isoformat()
-        }))
+        })
 
 
 class PortfolioUpdatesConsumer(AuthenticatedConsumer):
@@ -205,11 +236,11 @@ class PortfolioUpdatesConsumer(AuthenticatedConsumer):
         """Send current portfolio summary"""
         portfolio = await self.get_portfolio_summary()
         
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'portfolio_summary',
             'portfolio': portfolio,
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     async def receive(self, text_data):
         """Handle incoming messages"""
@@ -219,6 +250,8 @@ class PortfolioUpdatesConsumer(AuthenticatedConsumer):
             
             if message_type == 'request_portfolio':
                 await self.send_portfolio_summary()
+            elif message_type == 'stream_options':
+                await self.handle_stream_options(data)
             
         except json.JSONDecodeError:
             await self.send_error("Invalid JSON format")
@@ -226,19 +259,19 @@ class PortfolioUpdatesConsumer(AuthenticatedConsumer):
     # WebSocket event handlers
     async def portfolio_update(self, event):
         """Handle portfolio update event"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'portfolio_update',
             'update': event['update'],
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     async def position_update(self, event):
         """Handle position update event"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'position_update',
             'position': event['position'],
             'timestamp': timezone.now().isoformat()
-        }))
+        })
 
 
 class TradeExecutionConsumer(AuthenticatedConsumer):
@@ -258,20 +291,20 @@ class TradeExecutionConsumer(AuthenticatedConsumer):
     # WebSocket event handlers
     async def trade_executed(self, event):
         """Handle trade execution event"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'trade_executed',
             'execution': event['execution'],
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     async def trade_failed(self, event):
         """Handle trade execution failure"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'trade_failed',
             'execution': event['execution'],
             'error': event['error'],
             'timestamp': timezone.now().isoformat()
-        }))
+        })
 
 
 class MarketSentimentConsumer(AuthenticatedConsumer):
@@ -291,11 +324,11 @@ class MarketSentimentConsumer(AuthenticatedConsumer):
     # WebSocket event handlers
     async def sentiment_update(self, event):
         """Handle market sentiment update"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'sentiment_update',
             'sentiment': event['sentiment'],
             'timestamp': timezone.now().isoformat()
-        }))
+        })
 
 
 class RiskAlertsConsumer(AuthenticatedConsumer):
@@ -315,12 +348,12 @@ class RiskAlertsConsumer(AuthenticatedConsumer):
     # WebSocket event handlers
     async def risk_alert(self, event):
         """Handle risk alert event"""
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'risk_alert',
             'alert': event['alert'],
             'severity': event['severity'],
             'timestamp': timezone.now().isoformat()
-        }))
+        })
 
 
 class LivePnLConsumer(AuthenticatedConsumer):
@@ -358,11 +391,11 @@ class LivePnLConsumer(AuthenticatedConsumer):
         """Send current P&L data"""
         pnl = await self.get_current_pnl()
         
-        await self.send(text_data=json.dumps({
+        await self.stream.send({
             'type': 'current_pnl',
             'pnl': pnl,
             'timestamp': timezone.now().isoformat()
-        }))
+        })
     
     async def receive(self, text_data):
         """Handle incoming messages"""
@@ -372,6 +405,8 @@ class LivePnLConsumer(AuthenticatedConsumer):
             
             if message_type == 'request_pnl':
                 await self.send_current_pnl()
+            elif message_type == 'stream_options':
+                await self.handle_stream_options(data)
                 
         except json.JSONDecodeError:
             await self.send_error("Invalid JSON format")
@@ -379,11 +414,10 @@ class LivePnLConsumer(AuthenticatedConsumer):
     # WebSocket event handlers
     async def pnl_update(self, event):
         """Handle P&L update event"""
-        await self.send(text_data=json.dumps({
-            'type': 'pnl_update',
-            'pnl': event['pnl'],
-            'timestamp': timezone.now().isoformat()
-        }))
+        await self.stream.push(
+            'pnl_update', 'pnl', event['pnl'], data_field='pnl',
+            timestamp=timezone.now().isoformat()
+        )
 
 
 class FnOUpdatesConsumer(AuthenticatedConsumer):
@@ -400,27 +434,33 @@ class FnOUpdatesConsumer(AuthenticatedConsumer):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
         await super().disconnect(close_code)
     
+    @staticmethod
+    def _update_key(data) -> Optional[str]:
+        """Conflation key: updates for the same instrument replace each other (None: send as is)"""
+        if isinstance(data, dict):
+            instrument = data.get('symbol') or data.get('underlying')
+            if instrument:
+                return str(instrument)
+        return None
+    
     # WebSocket event handlers
     async def greeks_update(self, event):
         """Handle Greeks update event"""
-        await self.send(text_data=json.dumps({
-            'type': 'greeks_update',
-            'data': event['data'],
-            'timestamp': timezone.now().isoformat()
-        }))
+        await self.stream.push(
+            'greeks_update', self._update_key(event['data']), event['data'],
+            timestamp=timezone.now().isoformat()
+        )
     
     async def volatility_update(self, event):
         """Handle volatility update event"""
-        await self.send(text_data=json.dumps({
-            'type': 'volatility_update',
-            'data': event['data'],
-            'timestamp': timezone.now().isoformat()
-        }))
+        await self.stream.push(
+            'volatility_update', self._update_key(event['data']), event['data'],
+            timestamp=timezone.now().isoformat()
+        )
     
     async def option_chain_update(self, event):
         """Handle option chain update event"""
-        await self.send(text_data=json.dumps({
-            'type': 'option_chain_update',
-            'data': event['data'],
-            'timestamp': timezone.now().isoformat()
-        }))
\ No newline at end of file
+        await self.stream.push(
+            'option_chain_update', self._update_key(event['data']), event['data'],
+            timestamp=timezone.now().isoformat()
+        )
\ No newline at end of file
@@ -0,0 +1,43 @@
+"""
+Management command to rebuild performance rollups from trade executions
+"""
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+
+from apps.trading.models import AutomatedTradeExecution
+from apps.trading.performance_rollups import performance_rollups
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily and monthly performance rollups (backfill or repair after bulk edits)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            default=[],
+            help='User id or email to rebuild (repeatable; default: every user with executions)'
+        )
+
+    def handle(self, *args, **options):
+        if options['user']:
+            user_ids = []
+            for value in options['user']:
+                user = User.objects.filter(email=value).first() if '@' in value else User.objects.filter(pk=value).first()
+                if user is None:
+                    self.stdout.write(self.style.WARNING(f'User not found: {value}'))
+                    continue
+                user_ids.append(user.pk)
+        else:
+            user_ids = AutomatedTradeExecution.objects.values_list('strategy__user_id', flat=True).distinct()
+
+        total_days = 0
+        for user_id in user_ids:
+            days = performance_rollups.rebuild(user_id)
+            total_days += days
+            self.stdout.write(f'User {user_id}: {days} days rolled up')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt performance rollups ({total_days} days)'))
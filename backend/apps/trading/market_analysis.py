@@ -4,10 +4,11 @@ Generates trading signals using hybrid rule-based/ML models with explainable AI
 """
 import numpy as np
 import pandas as pd
-import yfinance as yf
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 import logging
+import threading
+from collections import OrderedDict
 from decimal import Decimal
 import talib
 from dataclasses import dataclass
@@ -17,10 +18,14 @@ from django.conf import settings
 
 from .models import TradingSignal
 from .ai_explainer import signal_explainer, explain_trading_signal
+from .streaming_indicators import streaming_indicator_store
 from apps.users.models import CustomUser
+from apps.market_data.bar_store import bar_store
 
 logger = logging.getLogger(__name__)
 
+MAX_SENTIMENT_SYMBOLS = 50
+
 
 @dataclass
 class MarketData:
@@ -47,14 +52,67 @@ class SignalComponents:
     confidence_factors: Dict[str, float]
 
 
+class IndicatorSeriesCache:
+    """
+    In-process LRU of full indicator frames keyed by the exact bars they were computed from.
+
+    Signal generation, sentiment analysis and backtesting share one frame per
+    (symbol, interval, first bar, last bar, last bar's OHLCV), so indicators
+    are computed once per distinct history. The forming bar of the session
+    changes its close/high/low/volume under the same index, which changes the
+    key. Frames are only reused for the same first bar: EMA/RSI warm-up makes
+    a slice of a longer history differ from a recompute.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._frames: "OrderedDict[Tuple, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(symbol: str, interval: str, df: pd.DataFrame) -> Tuple:
+        # Bytes rather than floats so NaN volumes still compare equal
+        last_bar = df[['Open', 'High', 'Low', 'Close', 'Volume']].iloc[-1].to_numpy(dtype=np.float64).tobytes()
+        return symbol.upper(), interval, df.index[0], df.index[-1], len(df), last_bar
+
+    def get(self, symbol: str, interval: str, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        key = self.key(symbol, interval, df)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+        return frame
+
+    def set(self, symbol: str, interval: str, df: pd.DataFrame, frame: pd.DataFrame) -> None:
+        """Cache ``frame``, the indicators computed from bars ``df``"""
+        key = self.key(symbol, interval, df)
+        with self._lock:
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.max_entries:
+                self._frames.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+
+
 class TechnicalAnalyzer:
     """Technical analysis indicators and calculations"""
     
     def __init__(self):
         self.lookback_period = 50  # Default lookback for calculations
     
-    def calculate_indicators(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Calculate comprehensive technical indicators"""
+    def calculate_indicators(self, df: pd.DataFrame, full_series: bool = False) -> Any:
+        """
+        Calculate comprehensive technical indicators.
+
+        Returns the latest value of each indicator as a dict, or with
+        ``full_series=True`` a DataFrame holding every indicator for every bar.
+        """
+        if full_series:
+            return self.calculate_indicator_series(df)
+
         try:
             # Ensure we have OHLCV columns
             required_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
@@ -135,6 +193,77 @@ class TechnicalAnalyzer:
                 'distance_from_resistance': 5, 'distance_from_support': 5
             }
 
+    def calculate_indicator_series(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Calculate every indicator for every bar of ``df`` in one pass.
+
+        Row ``i`` of the result matches what ``calculate_indicators(df.iloc[:i + 1])``
+        returns (plus a ``close`` column), including its short-history fallbacks,
+        so callers that need history can slice instead of recomputing.
+        """
+        required_columns = ['Open', 'High', 'Low', 'Close', 'Volume']
+        if not all(col in df.columns for col in required_columns):
+            raise ValueError(f"DataFrame must contain columns: {required_columns}")
+
+        high = df['High'].to_numpy(dtype=float)
+        low = df['Low'].to_numpy(dtype=float)
+        close = df['Close'].to_numpy(dtype=float)
+        volume = df['Volume'].to_numpy(dtype=float)
+        bars = np.arange(1, len(close) + 1)
+
+        def with_fallback(series, min_bars, fallback):
+            return np.where(bars >= min_bars, series, fallback)
+
+        def nan_fallback(series, fallback):
+            return np.where(np.isnan(series), fallback, series)
+
+        frame = {'close': close}
+        frame['sma_20'] = with_fallback(talib.SMA(close, timeperiod=20), 20, close)
+        frame['sma_50'] = with_fallback(talib.SMA(close, timeperiod=50), 50, close)
+        frame['ema_12'] = with_fallback(talib.EMA(close, timeperiod=12), 12, close)
+        frame['ema_26'] = with_fallback(talib.EMA(close, timeperiod=26), 26, close)
+
+        macd, macd_signal, macd_hist = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
+        frame['macd'] = nan_fallback(macd, 0.0)
+        frame['macd_signal'] = nan_fallback(macd_signal, 0.0)
+        frame['macd_histogram'] = nan_fallback(macd_hist, 0.0)
+
+        frame['rsi'] = with_fallback(talib.RSI(close, timeperiod=14), 14, 50.0)
+
+        bb_upper, bb_middle, bb_lower = talib.BBANDS(close, timeperiod=20, nbdevup=2, nbdevdn=2, matype=0)
+        frame['bb_upper'] = nan_fallback(bb_upper, close * 1.02)
+        frame['bb_middle'] = nan_fallback(bb_middle, close)
+        frame['bb_lower'] = nan_fallback(bb_lower, close * 0.98)
+
+        frame['atr'] = with_fallback(talib.ATR(high, low, close, timeperiod=14), 14, high - low)
+        frame['williams_r'] = with_fallback(talib.WILLR(high, low, close, timeperiod=14), 14, -50.0)
+
+        slowk, slowd = talib.STOCH(high, low, close, fastk_period=5, slowk_period=3, slowk_matype=0,
+                                   slowd_period=3, slowd_matype=0)
+        frame['stoch_k'] = nan_fallback(slowk, 50.0)
+        frame['stoch_d'] = nan_fallback(slowd, 50.0)
+
+        close_s = pd.Series(close)
+        volume_sma = with_fallback(pd.Series(volume).rolling(20).mean().to_numpy(), 20, volume)
+        frame['volume_sma'] = volume_sma
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frame['volume_ratio'] = np.where(volume_sma > 0, volume / volume_sma, 1.0)
+
+            prev_close = np.concatenate(([np.nan], close[:-1]))
+            frame['price_change'] = np.where(bars >= 2, (close - prev_close) / prev_close * 100, 0.0)
+            rolling_std = close_s.rolling(20).std(ddof=0).to_numpy()
+            rolling_mean = close_s.rolling(20).mean().to_numpy()
+            frame['volatility'] = with_fallback(rolling_std / rolling_mean * 100, 20, 0.0)
+
+            resistance = pd.Series(high).rolling(20, min_periods=1).max().to_numpy()
+            support = pd.Series(low).rolling(20, min_periods=1).min().to_numpy()
+            frame['resistance'] = resistance
+            frame['support'] = support
+            frame['distance_from_resistance'] = (resistance - close) / close * 100
+            frame['distance_from_support'] = (close - support) / close * 100
+
+        return pd.DataFrame(frame, index=df.index)
+
 
 class RuleBasedAnalyzer:
     """Rule-based signal generation using technical analysis"""
@@ -350,6 +479,104 @@ class RuleBasedAnalyzer:
         
         return signal_type, confidence, signal_components
 
+    def generate_signal_arrays(self, indicators: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """
+        Vectorized equivalent of generate_signal over a frame of indicator series.
+
+        Each row of ``indicators`` holds the same keys that generate_signal reads
+        from its dict. Returns per-bar arrays: ``signal`` (1 BUY, -1 SELL, 0 HOLD),
+        ``confidence``, ``trend_strength``, ``trend_direction`` (1/-1/0),
+        ``momentum_score``, ``volume_score`` and ``volatility_score``.
+        """
+        def col(name):
+            return indicators[name].to_numpy(dtype=float)
+
+        sma_20, sma_50 = col('sma_20'), col('sma_50')
+        ema_12, ema_26 = col('ema_12'), col('ema_26')
+        macd, macd_signal, macd_hist = col('macd'), col('macd_signal'), col('macd_histogram')
+        close = col('close') if 'close' in indicators else sma_20
+        volume_ratio = col('volume_ratio')
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Trend (analyze_trend)
+            trend = (
+                0.3 * ((sma_20 > sma_50).astype(float) - (sma_20 < sma_50))
+                + 0.2 * ((ema_12 > ema_26).astype(float) - (ema_12 < ema_26))
+                + 0.3 * (((macd > macd_signal) & (macd_hist > 0)).astype(float)
+                         - ((macd < macd_signal) & (macd_hist < 0)))
+                + 0.2 * (((close > sma_20) & (sma_20 > sma_50)).astype(float)
+                         - ((close < sma_20) & (sma_20 < sma_50)))
+            )
+            trend = np.clip(trend, -1, 1)
+            trend_direction = np.select([trend > 0.3, trend < -0.3], [1, -1], 0)
+            trend_strength = np.abs(trend)
+
+            # Momentum (analyze_momentum)
+            rsi, williams, stoch_k = col('rsi'), col('williams_r'), col('stoch_k')
+            momentum = (
+                np.select([(rsi > 30) & (rsi < 70), rsi > 70, rsi < 30], [0.1, -0.2, 0.3], 0.0)
+                + np.select([(williams > -80) & (williams < -20), williams > -20, williams < -80], [0.1, -0.2, 0.2], 0.0)
+                + np.select([(stoch_k > 20) & (stoch_k < 80), stoch_k > 80, stoch_k < 20], [0.1, -0.1, 0.2], 0.0)
+                + np.where(macd_hist > 0, 0.1, 0.0)
+            )
+            momentum = np.clip(momentum, 0, 1)
+
+            # Volume (analyze_volume)
+            volume_score = np.select(
+                [volume_ratio > 1.5, volume_ratio > 1.2, volume_ratio > 0.8], [0.3, 0.2, 0.1], -0.1
+            )
+
+            # Volatility (analyze_volatility)
+            volatility = col('volatility')
+            atr = col('atr')
+            atr_pct = atr / close * 100
+            volatility_score = np.select(
+                [
+                    (volatility > 1) & (volatility < 3) & (atr_pct > 1) & (atr_pct < 4),
+                    (volatility > 5) | (atr_pct > 6),
+                ],
+                [0.2, -0.2],
+                0.1,
+            )
+
+            # Support / resistance (check_support_resistance)
+            dist_support = col('distance_from_support')
+            dist_resistance = col('distance_from_resistance')
+            near_support = np.select([dist_support < 2, dist_support < 5], [0.3, 0.1], 0.0)
+            near_resistance = np.select([dist_resistance < 2, dist_resistance < 5], [-0.2, -0.1], 0.0)
+            breakout = np.where((dist_resistance < 1) & (volume_ratio > 1.3), 0.4, 0.0)
+            support_resistance = np.maximum(np.maximum(near_support, near_resistance), breakout)
+
+        technical_score = (
+            trend_strength * 0.3 +
+            momentum * 0.25 +
+            np.abs(volume_score) * 0.2 +
+            np.abs(volatility_score) * 0.15 +
+            support_resistance * 0.1
+        )
+
+        # Signal selection mirrors the if/elif chain in generate_signal
+        conditions = [
+            (trend_direction == 1) & (momentum > 0.2) & (volume_score > 0),
+            (trend_direction == -1) & (momentum < 0.1) & (volume_score > 0),
+            (near_support > 0.2) & (trend_direction != -1),
+            (near_resistance < -0.1) & (trend_direction != 1),
+            breakout > 0.3,
+        ]
+        signal = np.select(conditions, [1, -1, 1, -1, 1], 0).astype(np.int8)
+        confidence = technical_score + np.select(conditions, [0.1, 0.1, 0.0, 0.0, 0.15], 0.0)
+        confidence = np.clip(confidence, 0.5, 0.95)
+
+        return {
+            'signal': signal,
+            'confidence': confidence,
+            'trend_strength': trend_strength,
+            'trend_direction': trend_direction,
+            'momentum_score': momentum,
+            'volume_score': volume_score,
+            'volatility_score': volatility_score,
+        }
+
 
 class MarketAnalysisEngine:
     """Main market analysis engine that generates trading signals"""
@@ -357,23 +584,20 @@ class MarketAnalysisEngine:
     def __init__(self):
         self.technical_analyzer = TechnicalAnalyzer()
         self.rule_analyzer = RuleBasedAnalyzer()
+        self.indicator_cache = IndicatorSeriesCache()
     
-    def fetch_market_data(self, symbol: str, period: str = "60d") -> pd.DataFrame:
+    def fetch_market_data(self, symbol: str, period: str = "60d", interval: str = "1d") -> pd.DataFrame:
         """Fetch market data for analysis"""
         try:
             # Convert NSE symbols to Yahoo Finance format
             yf_symbol = self._convert_to_yf_symbol(symbol)
             
-            # Fetch data
-            ticker = yf.Ticker(yf_symbol)
-            df = ticker.history(period=period)
+            # Read through the local bar store; only missing ranges hit Yahoo
+            df = bar_store.get_history(yf_symbol, period=period, interval=interval)
             
             if df.empty:
                 raise ValueError(f"No data found for symbol: {symbol}")
             
-            # Ensure consistent column names
-            df.columns = ['Open', 'High', 'Low', 'Close', 'Volume']
-            
             return df
             
         except Exception as e:
@@ -437,105 +661,56 @@ class MarketAnalysisEngine:
     
 # Mock data generation method removed - use real market data only
     
+    def get_indicator_series(self, symbol: str, period: str = "60d", interval: str = "1d",
+                             df: Optional[pd.DataFrame] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """Return (bars, indicator frame), computing indicators once per distinct history"""
+        if df is None:
+            df = self.fetch_market_data(symbol, period=period, interval=interval)
+        
+        series = self.indicator_cache.get(symbol, interval, df)
+        if series is None:
+            series = self.technical_analyzer.calculate_indicator_series(df)
+            self.indicator_cache.set(symbol, interval, df, series)
+        return df, series
+    
+    @staticmethod
+    def latest_indicators(series: pd.DataFrame) -> Dict[str, float]:
+        """Latest-bar indicator dict in the shape RuleBasedAnalyzer consumes"""
+        return {name: float(value) for name, value in series.iloc[-1].items()}
+    
+    def live_indicators(self, symbol: str, interval: str = "1d") -> Dict[str, float]:
+        """
+        Latest indicators for ``symbol`` from its streaming state.
+
+        Quotes keep the state current, so while they flow this is an O(1) read
+        instead of a fetch and recompute. A missing or stale state is rebuilt
+        from history, whose full indicator frame is used for this call.
+        """
+        state = streaming_indicator_store.load(symbol, interval)
+        if state is not None:
+            return state.indicators()
+        df, series = self.get_indicator_series(symbol, interval=interval)
+        try:
+            streaming_indicator_store.bootstrap(symbol, df, interval)
+        except Exception as e:
+            logger.warning(f"Could not bootstrap streaming indicators for {symbol}: {e}")
+        return self.latest_indicators(series)
+    
     def generate_signal(self, symbol: str, user: CustomUser, strategy_name: str = "Market Analysis Engine") -> Optional[TradingSignal]:
         """Generate a trading signal for the given symbol"""
         try:
-            # Fetch market data
-            df = self.fetch_market_data(symbol)
-            
-            # Calculate technical indicators
-            indicators = self.technical_analyzer.calculate_indicators(df)
-            indicators['close'] = df['Close'].iloc[-1]  # Add current price
+            # Technical indicators (includes current price as 'close'), live from quotes when available
+            indicators = self.live_indicators(symbol)
             
             # Generate signal using rule-based analysis
             signal_type, confidence, signal_components = self.rule_analyzer.generate_signal(indicators)
             
-            # Skip generating signal if confidence is too low or signal is HOLD
-            if confidence < 0.6 or signal_type == "HOLD":
-                logger.info(f"Skipping signal for {symbol}: confidence={confidence:.2f}, type={signal_type}")
+            trading_signal = self.build_signal(symbol, user, strategy_name, indicators,
+                                               signal_type, confidence, signal_components)
+            if trading_signal is None:
                 return None
             
-            # Calculate prices
-            current_price = df['Close'].iloc[-1]
-            atr = indicators['atr']
-            
-            if signal_type == "BUY":
-                entry_price = current_price
-                target_price = current_price + (atr * 2)
-                stop_loss = current_price - atr
-            elif signal_type == "SELL":
-                entry_price = current_price
-                target_price = current_price - (atr * 2)
-                stop_loss = current_price + atr
-            else:
-                return None
-            
-            # Generate explainable AI justification
-            try:
-                explanation = signal_explainer.generate_signal_explanation(
-                    features=indicators,
-                    signal_type=signal_type,
-                    confidence_score=confidence
-                ) if signal_explainer.explainer else {
-                    'ai_justification': f"Rule-based {signal_type} signal with {confidence:.1%} confidence",
-                    'feature_importance': signal_components.confidence_factors,
-                    'shap_values': {},
-                    'risk_reward_analysis': {
-                        'risk_factors': {'volatility': indicators['volatility']},
-                        'reward_factors': {'trend_strength': signal_components.trend_score}
-                    }
-                }
-            except Exception as e:
-                logger.warning(f"Error generating AI explanation: {e}")
-                explanation = {
-                    'ai_justification': f"Rule-based {signal_type} signal with {confidence:.1%} confidence",
-                    'feature_importance': signal_components.confidence_factors,
-                    'shap_values': {},
-                    'risk_reward_analysis': {'risk_factors': {}, 'reward_factors': {}}
-                }
-            
-            # Create trading signal
-            trading_signal = TradingSignal.objects.create(
-                user=user,
-                instrument_type=TradingSignal.InstrumentType.EQUITY,
-                symbol=symbol.upper(),
-                strategy_name=strategy_name,
-                signal_type=signal_type,
-                confidence_score=Decimal(str(round(confidence, 3))),
-                entry_price=Decimal(str(round(entry_price, 2))),
-                target_price=Decimal(str(round(target_price, 2))),
-                stop_loss=Decimal(str(round(stop_loss, 2))),
-                valid_until=timezone.now() + timedelta(hours=4),  # Signal valid for 4 hours
-                
-                # Explainable AI fields
-                ai_justification=explanation['ai_justification'],
-                feature_importance=explanation['feature_importance'],
-                shap_values=explanation['shap_values'],
-                risk_reward_ratio=Decimal(str(round(signal_components.risk_reward_ratio, 2))),
-                probability_explanation=explanation.get('risk_reward_analysis', {}),
-                
-                # Market data
-                market_data={
-                    'current_price': float(current_price),
-                    'technical_indicators': indicators,
-                    'signal_components': {
-                        'technical_score': signal_components.technical_score,
-                        'momentum_score': signal_components.momentum_score,
-                        'trend_score': signal_components.trend_score,
-                        'volume_score': signal_components.volume_score,
-                        'volatility_score': signal_components.volatility_score
-                    }
-                },
-                
-                # Backtest placeholder (would be calculated from historical performance)
-                backtest_result={
-                    'win_rate': 0.65,
-                    'avg_return': 0.08,
-                    'max_drawdown': 0.15,
-                    'sharpe_ratio': 1.2
-                }
-            )
-            
+            trading_signal.save()
             logger.info(f"Generated {signal_type} signal for {symbol} with {confidence:.1%} confidence")
             return trading_signal
             
@@ -543,38 +718,121 @@ class MarketAnalysisEngine:
             logger.error(f"Error generating signal for {symbol}: {e}")
             return None
     
-    def generate_signals_batch(self, symbols: List[str], user: CustomUser, strategy_name: str = "Market Analysis Engine") -> List[TradingSignal]:
-        """Generate signals for multiple symbols"""
-        signals = []
+    def build_signal(self, symbol: str, user: CustomUser, strategy_name: str, indicators: Dict[str, float],
+                     signal_type: str, confidence: float, signal_components: SignalComponents) -> Optional[TradingSignal]:
+        """Build an unsaved TradingSignal from a rule-based analysis, or None if it should be skipped"""
+        # Skip generating signal if confidence is too low or signal is HOLD
+        if confidence < 0.6 or signal_type == "HOLD":
+            logger.info(f"Skipping signal for {symbol}: confidence={confidence:.2f}, type={signal_type}")
+            return None
         
-        for symbol in symbols:
-            try:
-                signal = self.generate_signal(symbol, user, strategy_name)
-                if signal:
-                    signals.append(signal)
-            except Exception as e:
-                logger.error(f"Error generating signal for {symbol}: {e}")
-                continue
+        # Calculate prices
+        current_price = indicators['close']
+        atr = indicators['atr']
         
+        if signal_type == "BUY":
+            entry_price = current_price
+            target_price = current_price + (atr * 2)
+            stop_loss = current_price - atr
+        elif signal_type == "SELL":
+            entry_price = current_price
+            target_price = current_price - (atr * 2)
+            stop_loss = current_price + atr
+        else:
+            return None
+        
+        # Generate explainable AI justification
+        try:
+            explanation = signal_explainer.generate_signal_explanation(
+                features=indicators,
+                signal_type=signal_type,
+                confidence_score=confidence
+            ) if signal_explainer.explainer else {
+                'ai_justification': f"Rule-based {signal_type} signal with {confidence:.1%} confidence",
+                'feature_importance': signal_components.confidence_factors,
+                'shap_values': {},
+                'risk_reward_analysis': {
+                    'risk_factors': {'volatility': indicators['volatility']},
+                    'reward_factors': {'trend_strength': signal_components.trend_score}
+                }
+            }
+        except Exception as e:
+            logger.warning(f"Error generating AI explanation: {e}")
+            explanation = {
+                'ai_justification': f"Rule-based {signal_type} signal with {confidence:.1%} confidence",
+                'feature_importance': signal_components.confidence_factors,
+                'shap_values': {},
+                'risk_reward_analysis': {'risk_factors': {}, 'reward_factors': {}}
+            }
+        
+        # Create trading signal
+        return TradingSignal(
+            user=user,
+            instrument_type=TradingSignal.InstrumentType.EQUITY,
+            symbol=symbol.upper(),
+            strategy_name=strategy_name,
+            signal_type=signal_type,
+            confidence_score=Decimal(str(round(confidence, 3))),
+            entry_price=Decimal(str(round(entry_price, 2))),
+            target_price=Decimal(str(round(target_price, 2))),
+            stop_loss=Decimal(str(round(stop_loss, 2))),
+            valid_until=timezone.now() + timedelta(hours=4),  # Signal valid for 4 hours
+            
+            # Explainable AI fields
+            ai_justification=explanation['ai_justification'],
+            feature_importance=explanation['feature_importance'],
+            shap_values=explanation['shap_values'],
+            # risk_reward_ratio is derived by the model from entry/target/stop
+            probability_explanation=explanation.get('risk_reward_analysis', {}),
+            
+            # Market data
+            market_data={
+                'current_price': float(current_price),
+                'technical_indicators': indicators,
+                'signal_components': {
+                    'technical_score': signal_components.technical_score,
+                    'momentum_score': signal_components.momentum_score,
+                    'trend_score': signal_components.trend_score,
+                    'volume_score': signal_components.volume_score,
+                    'volatility_score': signal_components.volatility_score
+                }
+            },
+            
+            # Backtest placeholder (would be calculated from historical performance)
+            backtest_result={
+                'win_rate': 0.65,
+                'avg_return': 0.08,
+                'max_drawdown': 0.15,
+                'sharpe_ratio': 1.2
+            }
+        )
+    
+    def generate_signals_batch(self, symbols: List[str], user: CustomUser, strategy_name: str = "Market Analysis Engine") -> List[TradingSignal]:
+        """Generate signals for multiple symbols (concurrent fetch, pooled compute, one bulk write)"""
+        from .signal_pipeline import BatchSignalPipeline
+        
+        signals, _ = BatchSignalPipeline(engine=self).generate_signals(symbols, user, strategy_name)
         return signals
     
     def analyze_market_sentiment(self, symbols: List[str]) -> Dict[str, str]:
         """Analyze overall market sentiment"""
+        from .signal_pipeline import BatchSignalPipeline
+        
         sentiment_counts = {"BULLISH": 0, "BEARISH": 0, "NEUTRAL": 0}
+        symbols = symbols[:MAX_SENTIMENT_SYMBOLS]
+        analyses, _ = BatchSignalPipeline(engine=self).analyze(symbols, period="30d")
         
-        for symbol in symbols[:10]:  # Limit to top 10 symbols for performance
-            try:
-                df = self.fetch_market_data(symbol, period="30d")
-                indicators = self.technical_analyzer.calculate_indicators(df)
-                
-                trend_strength, trend_direction = self.rule_analyzer.analyze_trend(indicators)
-                if trend_strength > 0.4:
-                    sentiment_counts[trend_direction] += 1
-                else:
-                    sentiment_counts["NEUTRAL"] += 1
-                    
-            except Exception as e:
-                logger.warning(f"Could not analyze sentiment for {symbol}: {e}")
+        for symbol in symbols:
+            analysis = analyses.get(symbol)
+            if analysis is None:
+                logger.warning(f"Could not analyze sentiment for {symbol}")
+                sentiment_counts["NEUTRAL"] += 1
+                continue
+            
+            trend_strength, trend_direction = self.rule_analyzer.analyze_trend(analysis['indicators'])
+            if trend_strength > 0.4:
+                sentiment_counts[trend_direction] += 1
+            else:
                 sentiment_counts["NEUTRAL"] += 1
         
         # Determine overall sentiment
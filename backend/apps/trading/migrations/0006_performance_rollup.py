@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-16 20:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0005_add_usage_tracker'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerformanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('DAY', 'Daily'), ('MONTH', 'Monthly')], max_length=5)),
+                ('period_start', models.DateField(help_text='Local trading date, or first day of the month')),
+                ('trades_count', models.PositiveIntegerField(default=0)),
+                ('winning_trades', models.PositiveIntegerField(default=0)),
+                ('losing_trades', models.PositiveIntegerField(default=0)),
+                ('total_pnl', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('gross_profit', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('gross_loss', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('fees_paid', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('pnl_sum_squares', models.FloatField(default=0.0, help_text='Sum of squared trade P&L, for volatility')),
+                ('best_trade', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('worst_trade', models.DecimalField(blank=True, decimal_places=2, max_digits=15, null=True)),
+                ('closed_trades', models.PositiveIntegerField(default=0, help_text='Trades with an exit time')),
+                ('holding_seconds', models.FloatField(default=0.0, help_text='Total holding time of closed trades')),
+                ('executions_count', models.PositiveIntegerField(default=0)),
+                ('completed_executions', models.PositiveIntegerField(default=0)),
+                ('cumulative_pnl', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('equity_peak', models.DecimalField(decimal_places=2, default=0.0, max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('strategy', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='performance_rollups', to='trading.tradingstrategy')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='performance_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'trading_performance_rollup',
+                'ordering': ['period_start'],
+                'indexes': [models.Index(fields=['user', 'period', 'period_start'], name='trading_per_user_id_d4f7ea_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('strategy__isnull', True)), fields=('user', 'period', 'period_start'), name='unique_user_performance_rollup'), models.UniqueConstraint(condition=models.Q(('strategy__isnull', False)), fields=('user', 'strategy', 'period', 'period_start'), name='unique_strategy_performance_rollup')],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated migration to build performance rollups for existing trade executions
+
+from django.db import migrations
+
+
+def backfill_performance_rollups(apps, schema_editor):
+    """
+    Rebuild the rollups of every user that already has trade executions.
+
+    Rollups are otherwise only written when an execution changes, so without
+    this the analytics of existing users would read as empty. The rebuild runs
+    through the live rollup service, which is the only place the aggregation
+    is defined.
+    """
+    from apps.trading.performance_rollups import performance_rollups
+
+    AutomatedTradeExecution = apps.get_model('trading', 'AutomatedTradeExecution')
+    user_ids = list(
+        AutomatedTradeExecution.objects.order_by('strategy__user_id')
+        .values_list('strategy__user_id', flat=True).distinct()
+    )
+
+    days = 0
+    for user_id in user_ids:
+        days += performance_rollups.rebuild(user_id)
+
+    print(f"Built performance rollups for {len(user_ids)} users ({days} trading days)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0006_performance_rollup'),
+    ]
+
+    operations = [
+        # Reversing 0006 drops the table, so there is nothing to undo here
+        migrations.RunPython(backfill_performance_rollups, migrations.RunPython.noop),
+    ]
@@ -622,6 +622,66 @@ class PortfolioPosition(models.Model):
         return 0
 
 
+class PerformanceRollup(models.Model):
+    """Daily and monthly trade aggregates per user (strategy empty) and per strategy"""
+    
+    class Period(models.TextChoices):
+        DAY = 'DAY', 'Daily'
+        MONTH = 'MONTH', 'Monthly'
+    
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='performance_rollups')
+    strategy = models.ForeignKey(TradingStrategy, on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='performance_rollups')
+    period = models.CharField(max_length=5, choices=Period.choices)
+    period_start = models.DateField(help_text="Local trading date, or first day of the month")
+    
+    # Completed trades, bucketed by entry date
+    trades_count = models.PositiveIntegerField(default=0)
+    winning_trades = models.PositiveIntegerField(default=0)
+    losing_trades = models.PositiveIntegerField(default=0)
+    total_pnl = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    gross_profit = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    gross_loss = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    fees_paid = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    pnl_sum_squares = models.FloatField(default=0.0, help_text="Sum of squared trade P&L, for volatility")
+    best_trade = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    worst_trade = models.DecimalField(max_digits=15, decimal_places=2, null=True, blank=True)
+    closed_trades = models.PositiveIntegerField(default=0, help_text="Trades with an exit time")
+    holding_seconds = models.FloatField(default=0.0, help_text="Total holding time of closed trades")
+    
+    # Executions created in the period, whatever their outcome
+    executions_count = models.PositiveIntegerField(default=0)
+    completed_executions = models.PositiveIntegerField(default=0)
+    
+    # Running equity (cumulative P&L since the first trade) at the end of the period
+    cumulative_pnl = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    equity_peak = models.DecimalField(max_digits=15, decimal_places=2, default=0.00)
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'trading_performance_rollup'
+        ordering = ['period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'period', 'period_start'],
+                condition=models.Q(strategy__isnull=True),
+                name='unique_user_performance_rollup',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'strategy', 'period', 'period_start'],
+                condition=models.Q(strategy__isnull=False),
+                name='unique_strategy_performance_rollup',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'period', 'period_start']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} {self.period} {self.period_start}: {self.total_pnl}"
+
+
 class LimitType(models.TextChoices):
     """Types of usage limits"""
     DAILY_SIGNALS = 'DAILY_SIGNALS', 'Daily Signal Generation'
@@ -0,0 +1,268 @@
+"""
+Option Chain Snapshots for ShareWise AI
+Materializes the grouped chain, underlying price and Greeks per
+(underlying, expiry) as a pre-serialized JSON blob in the cache. Instrument
+changes drop the affected snapshot; quote updates re-price only the
+snapshots that contain the quoted contract or underlying, and push the new
+Greeks to users holding contracts of a re-priced chain.
+"""
+import json
+import logging
+from datetime import date
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import FuturesOptionsData, PortfolioPosition
+from .serializers import FuturesOptionsDataSerializer
+from .option_pricing import contract_greeks
+from apps.market_data.models import LiveMarketData
+
+logger = logging.getLogger(__name__)
+
+
+def parse_expiry(expiry: Any) -> date:
+    """Expiry as a date (accepts date objects and ISO strings; raises ValueError otherwise)"""
+    if isinstance(expiry, date):
+        return expiry
+    return date.fromisoformat(str(expiry))
+
+
+class OptionChainSnapshotStore:
+    """Cache-backed option chain snapshots keyed by (underlying, expiry)"""
+
+    KEY_PREFIX = 'option_chain_snapshot'
+
+    def __init__(self, timeout: Optional[int] = None):
+        # Bounded so days_to_expiry and time decay in the Greeks never go stale for long
+        self.timeout = timeout or getattr(settings, 'OPTION_CHAIN_SNAPSHOT_TTL', 300)
+
+    # Keys
+
+    def _blob_key(self, underlying: str, expiry: date) -> str:
+        return f"{self.KEY_PREFIX}:blob:{underlying.upper()}:{expiry.isoformat()}"
+
+    def _state_key(self, underlying: str, expiry: date) -> str:
+        return f"{self.KEY_PREFIX}:state:{underlying.upper()}:{expiry.isoformat()}"
+
+    def _contract_key(self, symbol: str) -> str:
+        return f"{self.KEY_PREFIX}:contract:{symbol}"
+
+    def _underlying_key(self, underlying: str) -> str:
+        return f"{self.KEY_PREFIX}:underlying:{underlying.upper()}"
+
+    # Reads
+
+    def nearest_expiry(self, underlying: str) -> Optional[date]:
+        return FuturesOptionsData.objects.filter(
+            underlying_symbol=underlying,
+            instrument_type=FuturesOptionsData.InstrumentType.OPTIONS,
+            expiry_date__gte=timezone.localdate(),
+            is_active=True,
+        ).order_by('expiry_date').values_list('expiry_date', flat=True).first()
+
+    def get_blob(self, underlying: str, expiry: Any = None) -> Optional[str]:
+        """Serialized chain for (underlying, expiry), building it on a miss; None if no contracts"""
+        expiry = parse_expiry(expiry) if expiry else self.nearest_expiry(underlying)
+        if expiry is None:
+            return None
+        blob = cache.get(self._blob_key(underlying, expiry))
+        if blob is None:
+            blob = self.refresh(underlying, expiry)
+        return blob
+
+    def get(self, underlying: str, expiry: Any = None) -> Optional[Dict[str, Any]]:
+        """Chain for (underlying, expiry) as a dict"""
+        blob = self.get_blob(underlying, expiry)
+        return json.loads(blob) if blob is not None else None
+
+    # Writes
+
+    def build_state(self, underlying: str, expiry: date) -> Optional[Dict[str, Any]]:
+        """Instrument rows and latest prices for one chain (one query each)"""
+        options = list(FuturesOptionsData.objects.filter(
+            underlying_symbol=underlying,
+            instrument_type=FuturesOptionsData.InstrumentType.OPTIONS,
+            expiry_date=expiry,
+            is_active=True,
+        ).order_by('strike_price', 'option_type'))
+        if not options:
+            return None
+
+        live_prices = {
+            row['symbol']: row for row in LiveMarketData.objects.filter(
+                symbol__in=[option.symbol for option in options] + [underlying]
+            ).order_by('timestamp').values('symbol', 'last_price', 'implied_volatility')
+        }
+        underlying_quote = live_prices.get(underlying)
+
+        contracts = []
+        for option, data in zip(options, FuturesOptionsDataSerializer(options, many=True).data):
+            quote = live_prices.get(option.symbol, {})
+            contracts.append({
+                'symbol': option.symbol,
+                'strike_price': float(option.strike_price),
+                'expiry_date': option.expiry_date,
+                'option_type': option.option_type,
+                'last_price': float(quote['last_price']) if quote.get('last_price') is not None else None,
+                'implied_volatility': (float(quote['implied_volatility'])
+                                       if quote.get('implied_volatility') is not None else None),
+                'data': dict(data),
+            })
+
+        return {
+            'underlying_symbol': underlying,
+            'underlying_price': float(underlying_quote['last_price']) if underlying_quote else 0,
+            'expiry_date': expiry,
+            'contracts': contracts,
+        }
+
+    @staticmethod
+    def render(state: Dict[str, Any]) -> str:
+        """Price every contract and serialize the grouped chain"""
+        greeks = contract_greeks(state['underlying_price'], state['contracts'])
+
+        strikes = {}
+        for contract, contract_greeks_row in zip(state['contracts'], greeks):
+            row = strikes.setdefault(contract['strike_price'], {'call': None, 'put': None})
+            option_data = dict(contract['data'])
+            option_data['last_price'] = contract['last_price']
+            option_data['greeks'] = contract_greeks_row
+            row['call' if contract['option_type'] == 'CALL' else 'put'] = option_data
+
+        return json.dumps({
+            'underlying_symbol': state['underlying_symbol'],
+            'underlying_price': state['underlying_price'],
+            'expiry_date': state['expiry_date'].isoformat(),
+            'strikes': strikes,
+            'strike_prices': sorted(strikes),
+            'as_of': timezone.now().isoformat(),
+        }, cls=DjangoJSONEncoder)
+
+    def _store(self, state: Dict[str, Any]) -> str:
+        underlying, expiry = state['underlying_symbol'], state['expiry_date']
+        blob = self.render(state)
+        cache.set_many({
+            self._blob_key(underlying, expiry): blob,
+            self._state_key(underlying, expiry): state,
+        }, timeout=self.timeout)
+        return blob
+
+    def refresh(self, underlying: str, expiry: Any) -> Optional[str]:
+        """Rebuild one snapshot from the database"""
+        expiry = parse_expiry(expiry)
+        state = self.build_state(underlying, expiry)
+        if state is None:
+            self.invalidate(underlying, expiry)
+            return None
+
+        blob = self._store(state)
+
+        # Reverse index so quotes find the snapshots they affect
+        expiries = set(cache.get(self._underlying_key(underlying)) or ())
+        expiries.add(expiry.isoformat())
+        index = {self._contract_key(c['symbol']): (underlying, expiry.isoformat()) for c in state['contracts']}
+        index[self._underlying_key(underlying)] = sorted(expiries)
+        cache.set_many(index, timeout=None)
+        return blob
+
+    def invalidate(self, underlying: str, expiry: Any) -> None:
+        expiry = parse_expiry(expiry)
+        cache.delete_many([self._blob_key(underlying, expiry), self._state_key(underlying, expiry)])
+
+    def apply_quotes(self, quotes: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Re-price the snapshots touched by ``quotes`` (symbol -> quote dict).
+
+        Only snapshots that are currently cached are updated; the rest are
+        built with fresh prices on their next read. Users holding contracts of
+        an updated snapshot get its Greeks over their F&O channel. Returns
+        snapshots updated.
+        """
+        if not quotes:
+            return 0
+
+        symbols = list(quotes)
+        index = cache.get_many(
+            [self._contract_key(symbol) for symbol in symbols] +
+            [self._underlying_key(symbol) for symbol in symbols]
+        )
+
+        touched: Dict[tuple, Dict[str, Dict[str, Any]]] = {}
+        for symbol in symbols:
+            target = index.get(self._contract_key(symbol))
+            if target:
+                touched.setdefault(tuple(target), {})[symbol] = quotes[symbol]
+            for expiry in index.get(self._underlying_key(symbol), ()):
+                touched.setdefault((symbol.upper(), expiry), {})[symbol] = quotes[symbol]
+
+        updated = 0
+        for (underlying, expiry), chain_quotes in touched.items():
+            state = cache.get(self._state_key(underlying, parse_expiry(expiry)))
+            if state is None:
+                continue
+            if self._apply_to_state(state, chain_quotes):
+                self._store(state)
+                self._notify_holders(state)
+                updated += 1
+        return updated
+
+    @staticmethod
+    def _notify_holders(state: Dict[str, Any]) -> None:
+        """Send the re-priced Greeks of held contracts to each holder (one query per chain)"""
+        from .websocket_utils import notifier
+
+        contracts = {contract['symbol']: contract for contract in state['contracts']}
+        holdings: Dict[Any, list] = {}
+        try:
+            for user_id, symbol in PortfolioPosition.objects.filter(
+                symbol__in=list(contracts)
+            ).exclude(total_quantity=0).values_list('user_id', 'symbol'):
+                holdings.setdefault(user_id, []).append(symbol)
+        except Exception as e:
+            logger.error(f"Could not load holders of {state['underlying_symbol']} options: {e}")
+            return
+
+        for user_id, symbols in holdings.items():
+            notifier.send_fno_chain_greeks_update(
+                str(user_id), state['underlying_symbol'], state['underlying_price'],
+                [
+                    {
+                        'symbol': symbol,
+                        'strike_price': contracts[symbol]['strike_price'],
+                        'expiry_date': contracts[symbol]['expiry_date'].isoformat(),
+                        'option_type': contracts[symbol]['option_type'],
+                        'last_price': contracts[symbol]['last_price'],
+                        'implied_volatility': contracts[symbol]['implied_volatility'],
+                    }
+                    for symbol in sorted(set(symbols))
+                ],
+            )
+
+    @staticmethod
+    def _apply_to_state(state: Dict[str, Any], quotes: Dict[str, Dict[str, Any]]) -> bool:
+        changed = False
+        underlying_quote = quotes.get(state['underlying_symbol'])
+        if underlying_quote is not None:
+            price = float(underlying_quote['last_price'])
+            changed = changed or price != state['underlying_price']
+            state['underlying_price'] = price
+
+        for contract in state['contracts']:
+            quote = quotes.get(contract['symbol'])
+            if quote is None:
+                continue
+            price = float(quote['last_price'])
+            if price != contract['last_price']:
+                contract['last_price'] = price
+                changed = True
+            if quote.get('implied_volatility') is not None:
+                contract['implied_volatility'] = float(quote['implied_volatility'])
+        return changed
+
+
+# Global instance
+option_chain_snapshots = OptionChainSnapshotStore()
@@ -0,0 +1,234 @@
+"""
+Vectorized Option Pricing for ShareWise AI
+Black-Scholes prices, Greeks and implied volatility over NumPy arrays, so a
+whole option chain (every strike and expiry) is priced in one call.
+
+Conventions match FnOBacktester.calculate_option_greeks: time in years,
+volatility and rates as decimals, theta per calendar day, vega and rho per
+1% change.
+"""
+import numpy as np
+from datetime import date, datetime, time
+from typing import Any, Dict, Iterable, List, Optional
+
+from scipy.special import ndtr
+from django.conf import settings
+from django.utils import timezone
+
+DAYS_PER_YEAR = 365.0
+MIN_VOLATILITY = 1e-4
+MAX_VOLATILITY = 5.0
+
+# NSE derivatives expire at the close of the expiry day
+EXPIRY_CLOSE_TIME = time(15, 30)
+
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+_CALL_TYPES = {'CALL', 'CE', 'C'}
+
+
+def _norm_pdf(x: np.ndarray) -> np.ndarray:
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
+
+def is_call_array(option_type: Any) -> np.ndarray:
+    """Boolean call mask from 'call'/'put', 'CE'/'PE', 'CALL'/'PUT' labels or booleans"""
+    values = np.asarray(option_type)
+    if values.dtype == bool:
+        return values
+    return np.isin(np.char.upper(values.astype(str)), list(_CALL_TYPES))
+
+
+def black_scholes(spot, strike, time_to_expiry, volatility, risk_free_rate=0.05,
+                  option_type='call', dividend_yield=0.0) -> Dict[str, np.ndarray]:
+    """
+    Price and Greeks for every option in the broadcast of the inputs.
+
+    Expired options (``time_to_expiry <= 0``) and zero volatility are priced at
+    discounted intrinsic value with step deltas and zero gamma/vega.
+    """
+    S, K, T, sigma, r, q = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (spot, strike, time_to_expiry, volatility,
+                                                 risk_free_rate, dividend_yield))
+    )
+    call = np.broadcast_to(is_call_array(option_type), S.shape)
+    sign = np.where(call, 1.0, -1.0)
+
+    live = (T > 0) & (sigma > 0)
+    T_safe = np.where(live, T, 1.0)
+    sigma_safe = np.where(live, sigma, 1.0)
+    sqrt_T = np.sqrt(T_safe)
+    vol_sqrt_T = sigma_safe * sqrt_T
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(S / K) + (r - q + 0.5 * sigma_safe ** 2) * T_safe) / vol_sqrt_T
+    d2 = d1 - vol_sqrt_T
+
+    T_pos = np.maximum(T, 0.0)
+    disc_r = np.exp(-r * T_pos)
+    disc_q = np.exp(-q * T_pos)
+    pdf_d1 = _norm_pdf(d1)
+    cdf_sd1 = ndtr(sign * d1)
+    cdf_sd2 = ndtr(sign * d2)
+
+    price = sign * (S * disc_q * cdf_sd1 - K * disc_r * cdf_sd2)
+    delta = sign * disc_q * cdf_sd1
+    gamma = disc_q * pdf_d1 / (S * vol_sqrt_T)
+    theta = (-(S * disc_q * pdf_d1 * sigma_safe) / (2 * sqrt_T)
+             - sign * r * K * disc_r * cdf_sd2
+             + sign * q * S * disc_q * cdf_sd1)
+    vega = S * disc_q * pdf_d1 * sqrt_T
+    rho = sign * K * T_safe * disc_r * cdf_sd2
+
+    intrinsic = np.maximum(sign * (S * disc_q - K * disc_r), 0.0)
+    in_the_money = sign * (S * disc_q - K * disc_r) > 0
+    zero = np.zeros_like(S)
+
+    return {
+        'price': np.where(live, price, intrinsic),
+        'delta': np.where(live, delta, np.where(in_the_money, sign * disc_q, zero)),
+        'gamma': np.where(live, gamma, zero),
+        'theta': np.where(live, theta, zero) / DAYS_PER_YEAR,  # Per day
+        'vega': np.where(live, vega, zero) / 100,               # Per 1% volatility change
+        'rho': np.where(live, rho, zero) / 100,                 # Per 1% interest rate change
+    }
+
+
+def implied_volatility(price, spot, strike, time_to_expiry, risk_free_rate=0.05,
+                       option_type='call', dividend_yield=0.0, initial=0.2,
+                       tol: float = 1e-6, max_iter: int = 100) -> np.ndarray:
+    """
+    Implied volatility for every option, solved together.
+
+    Safeguarded Newton: each option keeps a [low, high] bracket and falls back
+    to bisection whenever a Newton step leaves it or vega vanishes. Prices
+    outside the no-arbitrage bounds (or expired options) return NaN.
+    """
+    P, S, K, T, r, q = np.broadcast_arrays(
+        *(np.asarray(x, dtype=float) for x in (price, spot, strike, time_to_expiry,
+                                                 risk_free_rate, dividend_yield))
+    )
+    shape = P.shape
+    P, S, K, T, r, q = (x.ravel() for x in (P, S, K, T, r, q))
+    call = np.broadcast_to(is_call_array(option_type), shape).ravel()
+
+    T_pos = np.maximum(T, 0.0)
+    forward_spot = S * np.exp(-q * T_pos)
+    discounted_strike = K * np.exp(-r * T_pos)
+    lower = np.where(call, np.maximum(forward_spot - discounted_strike, 0.0),
+                     np.maximum(discounted_strike - forward_spot, 0.0))
+    upper = np.where(call, forward_spot, discounted_strike)
+    solvable = (T > 0) & np.isfinite(P) & (P > lower) & (P < upper)
+
+    sigma = np.full(P.size, np.nan)
+    idx = np.flatnonzero(solvable)
+    if idx.size == 0:
+        return sigma.reshape(shape)
+
+    lo = np.full(idx.size, MIN_VOLATILITY)
+    hi = np.full(idx.size, MAX_VOLATILITY)
+    vol = np.clip(np.broadcast_to(np.asarray(initial, dtype=float), P.shape).ravel()[idx],
+                  MIN_VOLATILITY, MAX_VOLATILITY)
+    active = np.ones(idx.size, dtype=bool)
+    option_call = call[idx]
+
+    for _ in range(max_iter):
+        a = np.flatnonzero(active)
+        if a.size == 0:
+            break
+        j = idx[a]
+        result = black_scholes(S[j], K[j], T[j], vol[a], r[j], option_call[a], q[j])
+        diff = result['price'] - P[j]
+        vega = result['vega'] * 100
+
+        converged = np.abs(diff) < tol
+        # Price is increasing in volatility, so the sign of the error moves the bracket
+        hi[a] = np.where(diff > 0, vol[a], hi[a])
+        lo[a] = np.where(diff < 0, vol[a], lo[a])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton = vol[a] - diff / vega
+        use_newton = np.isfinite(newton) & (newton > lo[a]) & (newton < hi[a]) & (vega > 1e-12)
+        step = np.where(use_newton, newton, 0.5 * (lo[a] + hi[a]))
+
+        vol[a] = np.where(converged, vol[a], step)
+        active[a] = ~converged & ((hi[a] - lo[a]) > tol * 1e-2)
+
+    sigma[idx] = vol
+    return sigma.reshape(shape)
+
+
+def chain_greeks(spot, strike, time_to_expiry, option_type, market_price=None,
+                 volatility=None, risk_free_rate=0.05, dividend_yield=0.0) -> Dict[str, np.ndarray]:
+    """
+    Greeks for a chain, solving implied volatility from ``market_price`` where given.
+
+    Options whose IV cannot be solved fall back to ``volatility`` (if supplied).
+    """
+    iv = None
+    if market_price is not None:
+        iv = implied_volatility(market_price, spot, strike, time_to_expiry, risk_free_rate,
+                                option_type, dividend_yield)
+    if volatility is not None:
+        fallback = np.asarray(volatility, dtype=float)
+        iv = fallback if iv is None else np.where(np.isnan(iv), fallback, iv)
+    if iv is None:
+        raise ValueError("Either market_price or volatility is required")
+
+    result = black_scholes(spot, strike, time_to_expiry, np.nan_to_num(iv, nan=0.0),
+                           risk_free_rate, option_type, dividend_yield)
+    iv = np.broadcast_to(iv, result['price'].shape)
+    missing = np.isnan(iv)
+    for name in result:
+        result[name] = np.where(missing, np.nan, result[name])
+    result['implied_volatility'] = iv
+    return result
+
+
+def years_to_expiry(expiry_dates, now: Optional[datetime] = None) -> np.ndarray:
+    """Year fractions from ``now`` to the 15:30 close of each expiry date"""
+    now = now or timezone.now()
+    tz = timezone.get_current_timezone()
+    seconds = [
+        (timezone.make_aware(datetime.combine(expiry, EXPIRY_CLOSE_TIME), tz) - now).total_seconds()
+        for expiry in expiry_dates
+    ]
+    return np.asarray(seconds, dtype=float) / (DAYS_PER_YEAR * 86400)
+
+
+def contract_greeks(spot: float, contracts: Iterable[Dict[str, Any]], risk_free_rate: Optional[float] = None,
+                    now: Optional[datetime] = None) -> List[Dict[str, Optional[float]]]:
+    """
+    Greeks for a list of option contracts on one underlying.
+
+    Each contract needs ``strike_price``, ``expiry_date`` and ``option_type`` and may
+    carry ``last_price`` (used to solve IV) and ``implied_volatility`` in percent
+    (used when IV cannot be solved). Values that cannot be computed are None.
+    """
+    contracts = list(contracts)
+    if not contracts or not spot:
+        return [{} for _ in contracts]
+    if risk_free_rate is None:
+        risk_free_rate = getattr(settings, 'OPTION_RISK_FREE_RATE', 0.06)
+
+    def column(name, scale=1.0):
+        return np.array([
+            float(c[name]) * scale if c.get(name) not in (None, '', 0) else np.nan for c in contracts
+        ])
+
+    expiries = [
+        c['expiry_date'] if isinstance(c['expiry_date'], date) else date.fromisoformat(str(c['expiry_date']))
+        for c in contracts
+    ]
+    result = chain_greeks(
+        float(spot), column('strike_price'), years_to_expiry(expiries, now),
+        [c['option_type'] for c in contracts],
+        market_price=column('last_price'),
+        volatility=column('implied_volatility', 0.01),
+        risk_free_rate=risk_free_rate,
+    )
+    result['implied_volatility'] = result['implied_volatility'] * 100  # Percent, as quoted by NSE
+    names = list(result)
+    return [
+        {name: (None if np.isnan(result[name][i]) else round(float(result[name][i]), 6)) for name in names}
+        for i in range(len(contracts))
+    ]
@@ -0,0 +1,403 @@
+"""
+Performance Rollups for ShareWise AI
+Daily and monthly trade aggregates per user and per strategy, kept current
+from execution and order completion signals. Analytics read closed periods
+from the rollup table and aggregate only today's executions live, so their
+cost depends on the length of the reporting window rather than on the size
+of the account's trade history.
+
+Periods are local (settings.TIME_ZONE) calendar days and months. Refreshes of
+one user's rollups are serialized by locking the user row, so concurrent
+refreshes of the same period rewrite the rows one after the other instead of
+both inserting them.
+"""
+import math
+import logging
+from dataclasses import dataclass, fields
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import (
+    Q, F, Sum, Count, Max, Min, FloatField, DurationField, ExpressionWrapper,
+)
+from django.utils import timezone
+
+from .models import AutomatedTradeExecution, TradingOrder, TradingStrategy, PerformanceRollup
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+# A refresh that still loses an insert race (e.g. no row lock support) is recomputed
+REFRESH_ATTEMPTS = 3
+
+# Additive rollup columns (best/worst trade and equity are handled separately)
+SUM_FIELDS = [
+    'trades_count', 'winning_trades', 'losing_trades', 'total_pnl', 'gross_profit', 'gross_loss',
+    'fees_paid', 'pnl_sum_squares', 'closed_trades', 'holding_seconds', 'executions_count',
+    'completed_executions',
+]
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def local_day_bounds(day: date) -> Tuple[datetime, datetime]:
+    """Aware [start, end) datetimes of a local calendar day"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+@dataclass
+class RollupStats:
+    """Additive trade statistics for one period"""
+    trades_count: int = 0
+    winning_trades: int = 0
+    losing_trades: int = 0
+    total_pnl: Decimal = ZERO
+    gross_profit: Decimal = ZERO
+    gross_loss: Decimal = ZERO
+    fees_paid: Decimal = ZERO
+    pnl_sum_squares: float = 0.0
+    best_trade: Optional[Decimal] = None
+    worst_trade: Optional[Decimal] = None
+    closed_trades: int = 0
+    holding_seconds: float = 0.0
+    executions_count: int = 0
+    completed_executions: int = 0
+
+    @classmethod
+    def from_row(cls, row) -> 'RollupStats':
+        """From a PerformanceRollup instance or a values() dict"""
+        get = row.get if isinstance(row, dict) else (lambda name: getattr(row, name))
+        return cls(**{f.name: get(f.name) if get(f.name) is not None else f.default for f in fields(cls)})
+
+    def merge(self, other: 'RollupStats') -> 'RollupStats':
+        for name in SUM_FIELDS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        if other.best_trade is not None:
+            self.best_trade = other.best_trade if self.best_trade is None else max(self.best_trade, other.best_trade)
+        if other.worst_trade is not None:
+            self.worst_trade = other.worst_trade if self.worst_trade is None else min(self.worst_trade, other.worst_trade)
+        return self
+
+    def as_fields(self) -> Dict:
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @property
+    def win_rate(self) -> float:
+        return self.winning_trades / self.trades_count * 100 if self.trades_count else 0.0
+
+    @property
+    def average_win(self) -> Decimal:
+        return self.gross_profit / self.winning_trades if self.winning_trades else ZERO
+
+    @property
+    def average_loss(self) -> Decimal:
+        return abs(self.gross_loss) / self.losing_trades if self.losing_trades else ZERO
+
+    @property
+    def profit_factor(self) -> float:
+        return float(self.gross_profit / abs(self.gross_loss)) if self.gross_loss else 0.0
+
+    @property
+    def pnl_std(self) -> float:
+        """Population standard deviation of trade P&L"""
+        if not self.trades_count:
+            return 0.0
+        mean = float(self.total_pnl) / self.trades_count
+        return math.sqrt(max(self.pnl_sum_squares / self.trades_count - mean * mean, 0.0))
+
+    @property
+    def avg_holding_days(self) -> float:
+        return self.holding_seconds / self.closed_trades / 86400 if self.closed_trades else 0.0
+
+
+class PerformanceRollupService:
+    """Maintains and reads PerformanceRollup rows"""
+
+    # Aggregation of one day's data
+
+    def _trade_buckets(self, user_id, day: date) -> Dict[Optional[str], RollupStats]:
+        start, end = local_day_bounds(day)
+        pnl = F('total_pnl')
+        rows = AutomatedTradeExecution.objects.filter(
+            strategy__user_id=user_id,
+            status=AutomatedTradeExecution.ExecutionStatus.COMPLETED,
+            entry_order__status=TradingOrder.OrderStatus.COMPLETE,
+            entry_order__filled_quantity=F('entry_order__quantity'),
+            entry_executed_at__gte=start,
+            entry_executed_at__lt=end,
+        ).values('strategy').annotate(
+            trades_count=Count('id'),
+            winning_trades=Count('id', filter=Q(total_pnl__gt=0)),
+            losing_trades=Count('id', filter=Q(total_pnl__lte=0)),
+            sum_pnl=Sum(pnl),
+            gross_profit=Sum(pnl, filter=Q(total_pnl__gt=0)),
+            gross_loss=Sum(pnl, filter=Q(total_pnl__lt=0)),
+            sum_fees=Sum('fees_paid'),
+            pnl_sum_squares=Sum(ExpressionWrapper(pnl * pnl, output_field=FloatField())),
+            best_trade=Max(pnl),
+            worst_trade=Min(pnl),
+            closed_trades=Count('id', filter=Q(exit_executed_at__isnull=False)),
+            holding=Sum(ExpressionWrapper(F('exit_executed_at') - F('entry_executed_at'),
+                                          output_field=DurationField())),
+        ).order_by()
+
+        buckets = {}
+        for row in rows:
+            row['total_pnl'] = row.pop('sum_pnl')
+            row['fees_paid'] = row.pop('sum_fees')
+            holding = row.pop('holding')
+            row['holding_seconds'] = holding.total_seconds() if holding else 0.0
+            row['pnl_sum_squares'] = float(row['pnl_sum_squares'] or 0)
+            buckets[str(row.pop('strategy'))] = RollupStats.from_row(row)
+        return buckets
+
+    def _execution_buckets(self, user_id, day: date) -> Dict[Optional[str], Tuple[int, int]]:
+        start, end = local_day_bounds(day)
+        rows = AutomatedTradeExecution.objects.filter(
+            strategy__user_id=user_id, created_at__gte=start, created_at__lt=end,
+        ).values('strategy').annotate(
+            executions=Count('id'),
+            completed=Count('id', filter=Q(status=AutomatedTradeExecution.ExecutionStatus.COMPLETED)),
+        ).order_by()
+        return {str(row['strategy']): (row['executions'], row['completed']) for row in rows}
+
+    def day_stats(self, user_id, day: date) -> Dict[Optional[str], RollupStats]:
+        """Live statistics for one local day, per strategy id and overall (key None)"""
+        stats = self._trade_buckets(user_id, day)
+        for strategy_id, (executions, completed) in self._execution_buckets(user_id, day).items():
+            bucket = stats.setdefault(strategy_id, RollupStats())
+            bucket.executions_count = executions
+            bucket.completed_executions = completed
+
+        if stats:
+            overall = RollupStats()
+            for bucket in stats.values():
+                overall.merge(bucket)
+            stats[None] = overall
+        return stats
+
+    # Writes
+
+    def _write_period(self, user_id, period: str, period_start: date,
+                      stats: Dict[Optional[str], RollupStats]) -> None:
+        """Replace the rows of one period with ``stats``"""
+        existing = {
+            (str(row.strategy_id) if row.strategy_id else None): row
+            for row in PerformanceRollup.objects.filter(user_id=user_id, period=period, period_start=period_start)
+        }
+        stale = [row.pk for key, row in existing.items() if key not in stats]
+        if stale:
+            PerformanceRollup.objects.filter(pk__in=stale).delete()
+
+        to_create, to_update = [], []
+        for strategy_id, bucket in stats.items():
+            row = existing.get(strategy_id)
+            if row is None:
+                row = PerformanceRollup(user_id=user_id, strategy_id=strategy_id, period=period,
+                                        period_start=period_start)
+                to_create.append(row)
+            else:
+                row.updated_at = timezone.now()  # bulk_update skips auto_now
+                to_update.append(row)
+            for name, value in bucket.as_fields().items():
+                setattr(row, name, value)
+
+        if to_update:
+            PerformanceRollup.objects.bulk_update(to_update, [f.name for f in fields(RollupStats)] + ['updated_at'])
+        if to_create:
+            PerformanceRollup.objects.bulk_create(to_create)
+
+    def _refresh_month(self, user_id, month: date) -> None:
+        """Re-derive one month's rows from its daily rows"""
+        rows = PerformanceRollup.objects.filter(
+            user_id=user_id, period=PerformanceRollup.Period.DAY,
+            period_start__gte=month, period_start__lt=next_month(month),
+        ).values('strategy').annotate(
+            **{name: Sum(name) for name in SUM_FIELDS},
+            best_trade=Max('best_trade'),
+            worst_trade=Min('worst_trade'),
+        ).order_by()
+        stats = {}
+        for row in rows:
+            strategy_id = row.pop('strategy')
+            stats[str(strategy_id) if strategy_id else None] = RollupStats.from_row(row)
+        self._write_period(user_id, PerformanceRollup.Period.MONTH, month, stats)
+
+    def _propagate_equity(self, user_id, since: date) -> None:
+        """Recompute running cumulative P&L and equity peak from the month of ``since`` onwards"""
+        since = month_start(since)
+        rows = list(PerformanceRollup.objects.filter(
+            user_id=user_id, period_start__gte=since,
+        ).order_by('period_start', 'period'))
+
+        baselines = {}
+        for strategy_id in {row.strategy_id for row in rows}:
+            previous = PerformanceRollup.objects.filter(
+                user_id=user_id, strategy_id=strategy_id, period=PerformanceRollup.Period.DAY,
+                period_start__lt=since,
+            ).order_by('-period_start').values_list('cumulative_pnl', 'equity_peak').first()
+            baselines[strategy_id] = previous or (ZERO, ZERO)
+
+        # Days first, then each month takes the equity of its last day
+        equity = dict(baselines)
+        month_end_equity = {}
+        for row in rows:
+            if row.period != PerformanceRollup.Period.DAY:
+                continue
+            cumulative, peak = equity[row.strategy_id]
+            cumulative += row.total_pnl
+            peak = max(peak, cumulative)
+            equity[row.strategy_id] = (cumulative, peak)
+            row.cumulative_pnl, row.equity_peak = cumulative, peak
+            month_end_equity[(row.strategy_id, month_start(row.period_start))] = (cumulative, peak)
+
+        for row in rows:
+            if row.period == PerformanceRollup.Period.MONTH:
+                row.cumulative_pnl, row.equity_peak = month_end_equity.get(
+                    (row.strategy_id, row.period_start), baselines[row.strategy_id])
+
+        PerformanceRollup.objects.bulk_update(rows, ['cumulative_pnl', 'equity_peak'], batch_size=500)
+
+    def refresh_days(self, user_id, days: Iterable[date]) -> None:
+        """Recompute the rollups of ``days`` (and their months and later equity) from executions"""
+        days = sorted(set(days))
+        if not days:
+            return
+        for attempt in range(1, REFRESH_ATTEMPTS + 1):
+            try:
+                with transaction.atomic():
+                    # Waits for any other refresh of this user; the rows it wrote are then read as existing
+                    list(get_user_model().objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+                    for day in days:
+                        self._write_period(user_id, PerformanceRollup.Period.DAY, day, self.day_stats(user_id, day))
+                    for month in sorted({month_start(day) for day in days}):
+                        self._refresh_month(user_id, month)
+                    self._propagate_equity(user_id, days[0])
+                return
+            except IntegrityError:
+                if attempt == REFRESH_ATTEMPTS:
+                    raise
+                logger.warning(f"Performance rollup refresh for user {user_id} conflicted, retrying ({attempt})")
+
+    def refresh_execution(self, execution: AutomatedTradeExecution) -> None:
+        """Bring the rollups touched by one execution up to date"""
+        # Looked up rather than followed: the strategy may be going away in a cascade delete
+        user_id = TradingStrategy.objects.filter(pk=execution.strategy_id).values_list('user_id', flat=True).first()
+        if user_id is None:
+            return
+        # Includes the day an entry was moved away from (set by the pre_save receiver)
+        values = [execution.entry_executed_at, execution.created_at,
+                  *getattr(execution, '_previous_entry_times', ())]
+        days = [timezone.localtime(value).date() for value in values if value]
+        self.refresh_days(user_id, days)
+
+    def rebuild(self, user_id) -> int:
+        """Recreate every rollup row of one user from scratch; returns days written"""
+        executions = AutomatedTradeExecution.objects.filter(strategy__user_id=user_id)
+        days = {
+            timezone.localtime(value).date()
+            for pair in executions.values_list('entry_executed_at', 'created_at')
+            for value in pair if value
+        }
+        with transaction.atomic():
+            PerformanceRollup.objects.filter(user_id=user_id).delete()
+            self.refresh_days(user_id, days)
+        return len(days)
+
+    # Reads
+
+    def _closed_rows(self, user_id, strategy_id, start: Optional[date], end: date):
+        """
+        Rollup rows covering [start, end] without overlap: monthly rows for
+        months entirely inside the range, daily rows for the rest.
+        """
+        scope = Q(strategy_id=strategy_id) if strategy_id else Q(strategy__isnull=True)
+        first_full = None if start is None else (start if start.day == 1 else next_month(start))
+        last_full_excl = next_month(end) if next_month(end) - timedelta(days=1) == end else month_start(end)
+
+        whole_months = Q(period_start__lt=last_full_excl)
+        if first_full is not None:
+            whole_months &= Q(period_start__gte=first_full)
+
+        days = Q(period=PerformanceRollup.Period.DAY, period_start__lte=end) & ~whole_months
+        if start is not None:
+            days &= Q(period_start__gte=start)
+
+        return PerformanceRollup.objects.filter(
+            scope, (Q(period=PerformanceRollup.Period.MONTH) & whole_months) | days, user_id=user_id,
+        ).order_by('period_start')
+
+    def period_stats(self, user_id, start: Optional[date] = None, end: Optional[date] = None,
+                     strategy_id=None) -> List[Tuple[date, RollupStats]]:
+        """
+        Non-overlapping (period_start, stats) units covering [start, end]:
+        rollup rows for closed days and one live aggregate for today.
+        """
+        today = timezone.localdate()
+        end = min(end or today, today)
+        closed_end = min(end, today - timedelta(days=1))
+
+        units = []
+        if start is None or start <= closed_end:
+            units = [(row.period_start, RollupStats.from_row(row))
+                     for row in self._closed_rows(user_id, strategy_id, start, closed_end)]
+        if end == today:
+            live = self.day_stats(user_id, today).get(str(strategy_id) if strategy_id else None)
+            if live is not None:
+                units.append((today, live))
+        return units
+
+    def totals(self, user_id, start: Optional[date] = None, end: Optional[date] = None,
+               strategy_id=None) -> RollupStats:
+        total = RollupStats()
+        for _, stats in self.period_stats(user_id, start, end, strategy_id):
+            total.merge(stats)
+        return total
+
+    def monthly(self, user_id, start: Optional[date] = None, end: Optional[date] = None,
+                strategy_id=None) -> List[Tuple[date, RollupStats]]:
+        months: Dict[date, RollupStats] = {}
+        for period_start, stats in self.period_stats(user_id, start, end, strategy_id):
+            months.setdefault(month_start(period_start), RollupStats()).merge(stats)
+        return sorted(months.items())
+
+    def daily(self, user_id, start: date, end: Optional[date] = None,
+              strategy_id=None) -> List[Tuple[date, RollupStats, Decimal, Decimal]]:
+        """(day, stats, cumulative_pnl, equity_peak) for each day with activity in [start, end]"""
+        today = timezone.localdate()
+        end = min(end or today, today)
+        scope = Q(strategy_id=strategy_id) if strategy_id else Q(strategy__isnull=True)
+        rows = PerformanceRollup.objects.filter(
+            scope, user_id=user_id, period=PerformanceRollup.Period.DAY,
+            period_start__gte=start, period_start__lte=end, period_start__lt=today,
+        ).order_by('period_start')
+        series = [(row.period_start, RollupStats.from_row(row), row.cumulative_pnl, row.equity_peak)
+                  for row in rows]
+
+        if end == today:
+            live = self.day_stats(user_id, today).get(str(strategy_id) if strategy_id else None)
+            if live is not None:
+                if series:
+                    cumulative, peak = series[-1][2], series[-1][3]
+                else:
+                    cumulative, peak = PerformanceRollup.objects.filter(
+                        scope, user_id=user_id, period=PerformanceRollup.Period.DAY, period_start__lt=today,
+                    ).order_by('-period_start').values_list('cumulative_pnl', 'equity_peak').first() or (ZERO, ZERO)
+                cumulative += live.total_pnl
+                series.append((today, live, cumulative, max(peak, cumulative)))
+        return series
+
+
+# Global instance
+performance_rollups = PerformanceRollupService()
@@ -11,7 +11,8 @@ from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 import logging
 
-from django.db.models import Q, Sum, Avg, Count, Max, Min
+from django.db.models import Q, F, Sum, Avg, Count, Max, Min, Case, When, Value, DecimalField
+from django.db.models.functions import Coalesce, NullIf
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
@@ -19,6 +20,7 @@ from .models import (
     TradingSignal, TradingOrder, AutomatedTradeExecution, 
     PortfolioPosition, TradingStrategy
 )
+from .performance_rollups import performance_rollups
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -83,14 +85,39 @@ class TradingReportGenerator:
         self.user = user
         self.strategy = strategy
         self.risk_free_rate = 0.06  # 6% annual risk-free rate (can be made configurable)
+        # Trade history per (start_date, end_date), shared by the generate_* methods
+        self._trade_history: Dict[Tuple, pd.DataFrame] = {}
     
-    def get_trade_history(self, start_date: datetime = None, end_date: datetime = None) -> pd.DataFrame:
-        """Get historical trade data as pandas DataFrame"""
-        
+    TRADE_HISTORY_COLUMNS = [
+        'execution_id', 'symbol', 'signal_type', 'entry_date', 'exit_date', 'entry_price',
+        'exit_price', 'quantity', 'pnl', 'fees', 'duration_days', 'strategy',
+        'confidence_score', 'is_winner',
+    ]
+    TRADE_HISTORY_VALUES = [
+        'id', 'signal__symbol', 'signal__signal_type', 'entry_executed_at', 'exit_executed_at',
+        'entry_fill', 'exit_fill', 'entry_order__filled_quantity', 'total_pnl', 'fees_paid',
+        'strategy__name', 'signal__confidence_score',
+    ]
+    
+    @staticmethod
+    def _executed(order: str) -> Q:
+        """Order relation is fully executed (TradingOrder.is_executed in SQL)"""
+        return Q(**{
+            f'{order}__status': TradingOrder.OrderStatus.COMPLETE,
+            f'{order}__filled_quantity': F(f'{order}__quantity'),
+        })
+    
+    @staticmethod
+    def _fill_price(order: str):
+        return Coalesce(NullIf(F(f'{order}__average_price'), Value(Decimal('0'))), F(f'{order}__price'))
+    
+    def trade_history_rows(self, start_date: datetime = None, end_date: datetime = None):
+        """Executed trades as tuples of TRADE_HISTORY_VALUES (one joined query)"""
         # Build base queryset
         queryset = AutomatedTradeExecution.objects.filter(
-            status=AutomatedTradeExecution.ExecutionStatus.COMPLETED
-        ).select_related('signal', 'entry_order', 'stop_loss_order', 'target_order')
+            self._executed('entry_order'),
+            status=AutomatedTradeExecution.ExecutionStatus.COMPLETED,
+        )
         
         if self.user:
             queryset = queryset.filter(signal__user=self.user)
@@ -104,61 +131,62 @@ class TradingReportGenerator:
         if end_date:
             queryset = queryset.filter(entry_executed_at__lte=end_date)
         
-        # Convert to DataFrame
-        trades_data = []
-        for execution in queryset:
-            if execution.entry_order and execution.entry_order.is_executed:
-                trade_data = {
-                    'execution_id': str(execution.id),
-                    'symbol': execution.signal.symbol,
-                    'signal_type': execution.signal.signal_type,
-                    'entry_date': execution.entry_executed_at,
-                    'exit_date': execution.exit_executed_at,
-                    'entry_price': float(execution.entry_order.average_price or execution.entry_order.price),
-                    'exit_price': None,
-                    'quantity': execution.entry_order.filled_quantity,
-                    'pnl': float(execution.total_pnl),
-                    'fees': float(execution.fees_paid),
-                    'duration_days': None,
-                    'strategy': execution.strategy.name if execution.strategy else 'Unknown',
-                    'confidence_score': float(execution.signal.confidence_score),
-                    'is_winner': execution.total_pnl > 0
-                }
-                
-                # Calculate exit price and duration
-                if execution.exit_executed_at:
-                    duration = execution.exit_executed_at - execution.entry_executed_at
-                    trade_data['duration_days'] = duration.days + (duration.seconds / 86400)
-                
-                # Get exit price from executed orders
-                if execution.stop_loss_order and execution.stop_loss_order.is_executed:
-                    trade_data['exit_price'] = float(execution.stop_loss_order.average_price or execution.stop_loss_order.price)
-                elif execution.target_order and execution.target_order.is_executed:
-                    trade_data['exit_price'] = float(execution.target_order.average_price or execution.target_order.price)
-                
-                trades_data.append(trade_data)
-        
-        return pd.DataFrame(trades_data)
+        # Exit price is the executed stop-loss fill, else the target fill
+        return queryset.annotate(
+            entry_fill=self._fill_price('entry_order'),
+            exit_fill=Case(
+                When(self._executed('stop_loss_order'), then=self._fill_price('stop_loss_order')),
+                When(self._executed('target_order'), then=self._fill_price('target_order')),
+                default=Value(None),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        ).values_list(*self.TRADE_HISTORY_VALUES)
+    
+    def get_trade_history(self, start_date: datetime = None, end_date: datetime = None) -> pd.DataFrame:
+        """Get historical trade data as pandas DataFrame"""
+        cache_key = (start_date, end_date)
+        if cache_key in self._trade_history:
+            return self._trade_history[cache_key].copy()
+        
+        rows = list(self.trade_history_rows(start_date, end_date))
+        
+        (ids, symbols, signal_types, entry_dates, exit_dates, entry_prices, exit_prices,
+         quantities, pnls, fees, strategies, confidences) = (list(column) for column in zip(*rows)) if rows else ([],) * 12
+        
+        pnl = np.array(pnls, dtype=float)
+        entry = pd.to_datetime(pd.Series(entry_dates, dtype=object), utc=True)
+        exit_ = pd.to_datetime(pd.Series(exit_dates, dtype=object), utc=True)
+        
+        trade_df = pd.DataFrame({
+            'execution_id': [str(value) for value in ids],
+            'symbol': symbols,
+            'signal_type': signal_types,
+            'entry_date': entry,
+            'exit_date': exit_,
+            'entry_price': np.array(entry_prices, dtype=float),
+            'exit_price': np.array(exit_prices, dtype=float),
+            'quantity': np.array(quantities, dtype=np.int64),
+            'pnl': pnl,
+            'fees': np.array(fees, dtype=float),
+            'duration_days': (exit_ - entry).dt.total_seconds().to_numpy() / 86400,
+            'strategy': [name or 'Unknown' for name in strategies],
+            'confidence_score': np.array(confidences, dtype=float),
+            'is_winner': pnl > 0,
+        }, columns=self.TRADE_HISTORY_COLUMNS) if ids else pd.DataFrame(columns=self.TRADE_HISTORY_COLUMNS)
+        
+        self._trade_history[cache_key] = trade_df
+        return trade_df.copy()
     
     def calculate_returns_series(self, trade_df: pd.DataFrame, initial_capital: float = 100000) -> List[float]:
         """Calculate cumulative returns series from trade data"""
         if trade_df.empty:
             return [0.0]
         
-        # Sort by entry date
-        trade_df = trade_df.sort_values('entry_date')
-        
-        # Calculate daily returns
-        returns = []
-        portfolio_value = initial_capital
-        
-        for _, trade in trade_df.iterrows():
-            if pd.notna(trade['pnl']):
-                daily_return = float(trade['pnl']) / portfolio_value
-                returns.append(daily_return)
-                portfolio_value += float(trade['pnl'])
-        
-        return returns
+        # Each trade's return is its P&L over the portfolio value before it (entry-date order)
+        pnl = trade_df.sort_values('entry_date', kind='stable')['pnl'].to_numpy(dtype=float)
+        pnl = pnl[~np.isnan(pnl)]
+        portfolio_before = initial_capital + np.concatenate(([0.0], np.cumsum(pnl)[:-1]))
+        return (pnl / portfolio_before).tolist()
     
     def calculate_sharpe_ratio(self, returns: List[float], risk_free_rate: float = None) -> float:
         """Calculate Sharpe ratio from returns series"""
@@ -216,16 +244,11 @@ class TradingReportGenerator:
         # Find maximum drawdown
         max_drawdown = float(np.min(drawdown))
         
-        # Calculate drawdown duration
-        max_dd_duration = 0
-        current_duration = 0
-        
-        for dd in drawdown:
-            if dd < 0:
-                current_duration += 1
-                max_dd_duration = max(max_dd_duration, current_duration)
-            else:
-                current_duration = 0
+        # Longest run of consecutive underwater periods
+        underwater = drawdown < 0
+        count = np.cumsum(underwater)
+        run_start = np.maximum.accumulate(np.where(underwater, 0, count))
+        max_dd_duration = int((count - run_start).max())
         
         return abs(max_drawdown), max_dd_duration
     
@@ -247,16 +270,17 @@ class TradingReportGenerator:
         if not returns:
             return 0.0, 0.0
         
-        returns_array = np.array(returns)
-        sorted_returns = np.sort(returns_array)
+        returns_array = np.asarray(returns, dtype=float)
         
-        # Value at Risk (VaR)
-        var_index = int((1 - confidence_level) * len(sorted_returns))
-        var = float(sorted_returns[var_index]) if var_index < len(sorted_returns) else 0.0
+        # Value at Risk (VaR): only the tail needs ordering, not the whole series
+        var_index = int((1 - confidence_level) * len(returns_array))
+        if var_index >= len(returns_array):
+            return 0.0, 0.0
+        tail = np.partition(returns_array, var_index)[:var_index + 1]
+        var = float(tail[var_index])
         
         # Expected Shortfall (Conditional VaR)
-        tail_returns = sorted_returns[:var_index+1] if var_index >= 0 else []
-        expected_shortfall = float(np.mean(tail_returns)) if len(tail_returns) > 0 else 0.0
+        expected_shortfall = float(tail.mean())
         
         return abs(var), abs(expected_shortfall)
     
@@ -334,35 +358,68 @@ class TradingReportGenerator:
     def generate_monthly_reports(self, start_date: datetime = None, end_date: datetime = None) -> List[MonthlyReport]:
         """Generate monthly performance reports"""
         
+        if self.user or self.strategy:
+            return self._monthly_reports_from_rollups(start_date, end_date)
+        
         trade_df = self.get_trade_history(start_date, end_date)
         
         if trade_df.empty:
             return []
         
-        trade_df['entry_month'] = pd.to_datetime(trade_df['entry_date']).dt.to_period('M')
-        monthly_reports = []
-        
-        for month, group in trade_df.groupby('entry_month'):
-            trades_count = len(group)
-            pnl = Decimal(str(group['pnl'].sum()))
-            return_pct = group['pnl'].sum() / 100000 * 100  # Assuming 100k base
-            win_rate = len(group[group['is_winner'] == True]) / trades_count * 100
-            best_trade = Decimal(str(group['pnl'].max()))
-            worst_trade = Decimal(str(group['pnl'].min()))
-            avg_duration = group['duration_days'].mean() if 'duration_days' in group.columns else 0
-            
-            monthly_reports.append(MonthlyReport(
-                month=str(month),
-                trades_count=trades_count,
-                pnl=pnl,
-                return_pct=return_pct,
-                win_rate=win_rate,
-                best_trade=best_trade,
-                worst_trade=worst_trade,
-                avg_trade_duration=avg_duration
-            ))
-        
-        return monthly_reports
+        entry_month = trade_df['entry_date'].dt.strftime('%Y-%m')
+        monthly = trade_df.groupby(entry_month).agg(
+            trades_count=('pnl', 'size'),
+            pnl=('pnl', 'sum'),
+            wins=('is_winner', 'sum'),
+            best_trade=('pnl', 'max'),
+            worst_trade=('pnl', 'min'),
+            avg_duration=('duration_days', 'mean'),
+        )
+        
+        return [
+            MonthlyReport(
+                month=month,
+                trades_count=int(row.trades_count),
+                pnl=Decimal(str(row.pnl)),
+                return_pct=row.pnl / 100000 * 100,  # Assuming 100k base
+                win_rate=row.wins / row.trades_count * 100,
+                best_trade=Decimal(str(row.best_trade)),
+                worst_trade=Decimal(str(row.worst_trade)),
+                avg_trade_duration=row.avg_duration
+            )
+            for month, row in monthly.iterrows()
+        ]
+    
+    def _monthly_reports_from_rollups(self, start_date: datetime = None,
+                                      end_date: datetime = None) -> List[MonthlyReport]:
+        """
+        Monthly reports from the performance rollups (whole months, or days at the range edges).
+
+        Months are local (settings.TIME_ZONE) calendar months; the unscoped
+        path below groups by the UTC month of entry. They differ only for
+        trades entered between local midnight and the UTC offset on the 1st.
+        """
+        user_id = self.user.pk if self.user else self.strategy.user_id
+        months = performance_rollups.monthly(
+            user_id,
+            timezone.localtime(start_date).date() if start_date else None,
+            timezone.localtime(end_date).date() if end_date else None,
+            strategy_id=self.strategy.pk if self.strategy else None,
+        )
+        
+        return [
+            MonthlyReport(
+                month=month.strftime('%Y-%m'),
+                trades_count=stats.trades_count,
+                pnl=stats.total_pnl,
+                return_pct=float(stats.total_pnl) / 100000 * 100,  # Assuming 100k base
+                win_rate=stats.win_rate,
+                best_trade=stats.best_trade,
+                worst_trade=stats.worst_trade,
+                avg_trade_duration=stats.avg_holding_days
+            )
+            for month, stats in months if stats.trades_count
+        ]
     
     def generate_strategy_comparison(self) -> Dict[str, Any]:
         """Compare performance across different strategies"""
@@ -372,22 +429,35 @@ class TradingReportGenerator:
         if trade_df.empty:
             return {}
         
+        pnl = trade_df['pnl']
+        summary = trade_df.assign(
+            gross_profit=pnl.where(pnl > 0, 0.0),
+            gross_loss=pnl.where(pnl < 0, 0.0),
+        ).groupby('strategy').agg(
+            total_trades=('pnl', 'size'),
+            wins=('is_winner', 'sum'),
+            total_pnl=('pnl', 'sum'),
+            avg_pnl_per_trade=('pnl', 'mean'),
+            gross_profit=('gross_profit', 'sum'),
+            gross_loss=('gross_loss', 'sum'),
+        )
+        
         strategy_performance = {}
         
         for strategy_name, group in trade_df.groupby('strategy'):
+            row = summary.loc[strategy_name]
             returns = self.calculate_returns_series(group)
             
             strategy_performance[strategy_name] = {
-                'total_trades': len(group),
-                'win_rate': len(group[group['is_winner'] == True]) / len(group) * 100,
-                'total_pnl': float(group['pnl'].sum()),
-                'avg_pnl_per_trade': float(group['pnl'].mean()),
+                'total_trades': int(row.total_trades),
+                'win_rate': row.wins / row.total_trades * 100,
+                'total_pnl': float(row.total_pnl),
+                'avg_pnl_per_trade': float(row.avg_pnl_per_trade),
                 'sharpe_ratio': self.calculate_sharpe_ratio(returns),
                 'max_drawdown': self.calculate_max_drawdown(returns)[0] * 100,
                 'profit_factor': (
-                    group[group['pnl'] > 0]['pnl'].sum() / 
-                    abs(group[group['pnl'] < 0]['pnl'].sum())
-                ) if group[group['pnl'] < 0]['pnl'].sum() < 0 else float('inf')
+                    row.gross_profit / abs(row.gross_loss)
+                ) if row.gross_loss < 0 else float('inf')
             }
         
         return strategy_performance
@@ -471,31 +541,30 @@ class TradingReportGenerator:
             kurtosis=kurtosis
         )
     
+    @staticmethod
+    def _standardized_moments(returns: np.ndarray) -> Tuple[float, float]:
+        """Third and fourth standardized moments from one pass over the deviations"""
+        deviations = returns - returns.mean()
+        squared = deviations * deviations
+        variance = squared.mean()
+        if variance == 0:
+            return 0.0, 0.0
+        return (squared * deviations).mean() / variance ** 1.5, (squared * squared).mean() / variance ** 2
+    
     def _calculate_skewness(self, returns: np.ndarray) -> float:
         """Calculate skewness of returns"""
         if len(returns) < 3:
             return 0.0
         
-        mean_return = np.mean(returns)
-        std_return = np.std(returns)
-        
-        if std_return == 0:
-            return 0.0
-        
-        return np.mean(((returns - mean_return) / std_return) ** 3)
+        return self._standardized_moments(returns)[0]
     
     def _calculate_kurtosis(self, returns: np.ndarray) -> float:
         """Calculate kurtosis of returns"""
         if len(returns) < 4:
             return 0.0
         
-        mean_return = np.mean(returns)
-        std_return = np.std(returns)
-        
-        if std_return == 0:
-            return 0.0
-        
-        return np.mean(((returns - mean_return) / std_return) ** 4) - 3  # Excess kurtosis
+        fourth_moment = self._standardized_moments(returns)[1]
+        return fourth_moment - 3 if fourth_moment else 0.0  # Excess kurtosis
     
     def generate_portfolio_summary(self) -> Dict[str, Any]:
         """Generate current portfolio summary"""
@@ -1,6 +1,7 @@
 import asyncio
 import logging
-from datetime import datetime, timedelta
+import numpy as np
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from typing import Dict, List, Optional, Any
 from django.utils import timezone
@@ -9,6 +10,7 @@ from django.db.models import Q, Avg, Sum, Count
 from django.conf import settings
 
 from .models import TradingSignal, TradingOrder
+from .performance_rollups import performance_rollups
 from ..brokers.models import BrokerAccount
 from ..brokers.services import BrokerService
 from ..ai_studio.models import MLModel
@@ -585,65 +587,39 @@ class PerformanceAnalyzer:
     def calculate_performance_metrics(self, start_date: datetime = None, end_date: datetime = None) -> Dict[str, Any]:
         """Calculate comprehensive performance metrics"""
         try:
-            # Filter orders by date range
-            orders_query = TradingOrder.objects.filter(
-                user=self.user,
-                status=TradingOrder.OrderStatus.COMPLETE
-            )
-            
-            if start_date:
-                orders_query = orders_query.filter(exchange_timestamp__gte=start_date)
-            if end_date:
-                orders_query = orders_query.filter(exchange_timestamp__lte=end_date)
-            
-            orders = orders_query.order_by('exchange_timestamp')
+            start_day = timezone.localtime(start_date).date() if start_date else None
+            end_day = timezone.localtime(end_date).date() if end_date else None
             
-            if not orders.exists():
+            # Closed days come from the rollup table; only today is aggregated live
+            stats = performance_rollups.totals(self.user.pk, start_day, end_day)
+            if not stats.trades_count:
                 return self.get_empty_metrics()
             
-            # Calculate metrics
-            total_trades = orders.count()
-            winning_trades = 0
-            losing_trades = 0
-            total_pnl = Decimal('0')
-            total_fees = Decimal('0')
-            
-            for order in orders:
-                if order.average_price and order.filled_quantity:
-                    # Simplified P&L calculation
-                    trade_value = order.average_price * order.filled_quantity
-                    total_fees += order.fees + order.taxes
-                    
-                    # This is simplified - real calculation would track entry/exit pairs
-                    if order.transaction_type == TradingOrder.TransactionType.SELL:
-                        total_pnl += trade_value
-                        winning_trades += 1
-                    else:
-                        total_pnl -= trade_value
+            daily = performance_rollups.daily(self.user.pk, start_day or date.min, end_day)
+            daily_pnl = [float(day_stats.total_pnl) for _, day_stats, _, _ in daily]
+            max_drawdown = max((float(peak - cumulative) for _, _, cumulative, peak in daily), default=0.0)
             
-            # Calculate ratios
-            win_rate = (winning_trades / total_trades) if total_trades > 0 else 0
-            avg_win = total_pnl / winning_trades if winning_trades > 0 else 0
-            avg_loss = total_pnl / losing_trades if losing_trades > 0 else 0
+            # Sharpe ratio from daily P&L (annualized)
+            pnl_std = float(np.std(daily_pnl)) if len(daily_pnl) > 1 else 0.0
+            sharpe_ratio = float(np.mean(daily_pnl) / pnl_std * np.sqrt(252)) if pnl_std > 0 else 0
             
-            # Calculate Sharpe ratio (simplified)
-            returns = [float(total_pnl / total_trades)] if total_trades > 0 else [0]
-            sharpe_ratio = (sum(returns) / len(returns)) / (0.1) if returns else 0  # Using 0.1 as std dev
+            total_pnl = stats.total_pnl
+            total_fees = stats.fees_paid
             
             return {
-                'total_trades': total_trades,
-                'winning_trades': winning_trades,
-                'losing_trades': losing_trades,
-                'win_rate': round(win_rate * 100, 2),
+                'total_trades': stats.trades_count,
+                'winning_trades': stats.winning_trades,
+                'losing_trades': stats.losing_trades,
+                'win_rate': round(stats.win_rate, 2),
                 'total_pnl': float(total_pnl),
                 'total_fees': float(total_fees),
                 'net_pnl': float(total_pnl - total_fees),
-                'avg_win': float(avg_win),
-                'avg_loss': float(avg_loss),
-                'profit_factor': float(abs(avg_win / avg_loss)) if avg_loss != 0 else 0,
+                'avg_win': float(stats.average_win),
+                'avg_loss': float(stats.average_loss),
+                'profit_factor': stats.profit_factor,
                 'sharpe_ratio': round(sharpe_ratio, 2),
-                'max_drawdown': 0,  # Would calculate properly
-                'calmar_ratio': 0,  # Would calculate properly
+                'max_drawdown': round(max_drawdown, 2),
+                'calmar_ratio': round(float(total_pnl) / max_drawdown, 2) if max_drawdown > 0 else 0,
                 'start_date': start_date.isoformat() if start_date else None,
                 'end_date': end_date.isoformat() if end_date else None
             }
@@ -675,31 +651,20 @@ class PerformanceAnalyzer:
     def get_daily_pnl_series(self, days: int = 30) -> List[Dict]:
         """Get daily P&L series for charting"""
         try:
-            # TODO: Implement real daily P&L calculation from PortfolioPosition or TradeExecution models
-            # This should aggregate realized and unrealized P&L by date
-            from django.db.models import Sum
-            from apps.trading.models import TradeExecution
-            
-            end_date = timezone.now()
+            end_date = timezone.localdate()
             start_date = end_date - timedelta(days=days)
             
-            # Get realized P&L from executed trades
-            trades = TradeExecution.objects.filter(
-                user=self.user,
-                executed_at__date__range=[start_date.date(), end_date.date()]
-            ).values('executed_at__date').annotate(
-                daily_pnl=Sum('profit_loss')
-            ).order_by('executed_at__date')
-            
             daily_data = []
             cumulative_pnl = 0
             
-            for trade in trades:
-                daily_pnl = float(trade['daily_pnl'] or 0)
+            for day, stats, _, _ in performance_rollups.daily(self.user.pk, start_date, end_date):
+                if not stats.trades_count:
+                    continue
+                daily_pnl = float(stats.total_pnl)
                 cumulative_pnl += daily_pnl
                 
                 daily_data.append({
-                    'date': trade['executed_at__date'].isoformat(),
+                    'date': day.isoformat(),
                     'pnl': round(daily_pnl, 2),
                     'cumulative_pnl': round(cumulative_pnl, 2)
                 })
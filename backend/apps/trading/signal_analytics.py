@@ -0,0 +1,179 @@
+"""
+Signal Analytics for ShareWise AI
+Dashboard and signals-analytics statistics computed with one grouped query
+per section (conditional aggregation instead of a count per strategy, symbol
+or bucket). Results are cached under a per-user version number that every
+signal or order write bumps, so a cached entry is never served after the
+data behind it changed.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Avg, Count, Case, When, Value, CharField
+from django.utils import timezone
+
+from .models import TradingSignal, TradingOrder
+
+logger = logging.getLogger(__name__)
+
+# (label, lower bound inclusive, upper bound exclusive); the last bucket includes 1.0
+CONFIDENCE_BUCKETS = [
+    ('0.6-0.7', 0.6, 0.7),
+    ('0.7-0.8', 0.7, 0.8),
+    ('0.8-0.9', 0.8, 0.9),
+    ('0.9-1.0', 0.9, 1.0),
+]
+
+
+def confidence_bucket() -> Case:
+    """CASE expression labelling each signal with its confidence bucket"""
+    whens = [
+        When(confidence_score__gte=low, confidence_score__lt=high, then=Value(label))
+        for label, low, high in CONFIDENCE_BUCKETS[:-1]
+    ]
+    label, low, high = CONFIDENCE_BUCKETS[-1]
+    whens.append(When(confidence_score__gte=low, confidence_score__lte=high, then=Value(label)))
+    return Case(*whens, default=Value(None), output_field=CharField())
+
+
+class SignalAnalyticsService:
+    """Versioned, cached signal statistics per user"""
+
+    VERSION_KEY = 'signal_analytics:version:{user_id}'
+
+    def __init__(self, timeout: int = None):
+        # Bounds staleness of the rolling time windows; data changes bump the version
+        self.timeout = timeout or getattr(settings, 'SIGNAL_ANALYTICS_CACHE_TTL', 300)
+
+    # Versioning
+
+    def get_version(self, user_id) -> int:
+        return cache.get(self.VERSION_KEY.format(user_id=user_id)) or 0
+
+    def bump_version(self, user_id) -> None:
+        """Invalidate every cached analytics entry of one user"""
+        key = self.VERSION_KEY.format(user_id=user_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, timeout=None)
+
+    def _cached(self, user_id, name: str, compute, *parts) -> Dict[str, Any]:
+        key = ':'.join(['signal_analytics', name, str(user_id), str(self.get_version(user_id))] +
+                       [str(part) for part in parts])
+        data = cache.get(key)
+        if data is None:
+            data = compute()
+            cache.set(key, data, timeout=self.timeout)
+        return data
+
+    # Dashboard
+
+    def dashboard_statistics(self, user) -> Dict[str, Any]:
+        today = timezone.now().date()
+        return self._cached(user.pk, 'dashboard', lambda: self._dashboard_statistics(user, today), today)
+
+    def _dashboard_statistics(self, user, today) -> Dict[str, Any]:
+        is_today = Q(timestamp__date=today)
+        counts = TradingSignal.objects.filter(user=user).aggregate(
+            total_signals=Count('id'),
+            executed_signals=Count('id', filter=Q(executed=True)),
+            today_signals=Count('id', filter=is_today),
+            today_executed=Count('id', filter=is_today & Q(executed=True)),
+        )
+        pending_orders = TradingOrder.objects.filter(
+            user=user,
+            status__in=[TradingOrder.OrderStatus.PENDING, TradingOrder.OrderStatus.OPEN]
+        ).count()
+
+        total_signals = counts['total_signals']
+        executed_signals = counts['executed_signals']
+        return {
+            'total_signals': total_signals,
+            'executed_signals': executed_signals,
+            'execution_rate': round((executed_signals / total_signals * 100) if total_signals > 0 else 0, 1),
+            'pending_orders': pending_orders,
+            'today_signals': counts['today_signals'],
+            'today_executed': counts['today_executed'],
+        }
+
+    # Signals analytics
+
+    def signals_analytics(self, user, days: int = 30) -> Dict[str, Any]:
+        end_date = timezone.now()
+        start_date = end_date - timedelta(days=days)
+        # Window start is truncated to the minute so requests within a minute share an entry
+        return self._cached(
+            user.pk, 'signals', lambda: self._signals_analytics(user, start_date, end_date),
+            days, start_date.replace(second=0, microsecond=0).isoformat(),
+        )
+
+    def _signals_analytics(self, user, start_date: datetime, end_date: datetime) -> Dict[str, Any]:
+        signals = TradingSignal.objects.filter(
+            user=user,
+            timestamp__gte=start_date,
+            timestamp__lte=end_date
+        )
+        executed = Count('id', filter=Q(executed=True))
+
+        # Strategy performance
+        strategy_stats = [
+            {
+                'strategy_name': row['strategy_name'],
+                'total_signals': row['total_signals'],
+                'executed_signals': row['executed_signals'],
+                'execution_rate': round(row['executed_signals'] / row['total_signals'] * 100, 1),
+                'avg_confidence': round(float(row['avg_confidence'] or 0), 2),
+            }
+            for row in signals.values('strategy_name').annotate(
+                total_signals=Count('id'),
+                executed_signals=executed,
+                avg_confidence=Avg('confidence_score'),
+            ).order_by('strategy_name')
+        ]
+
+        # Signal type distribution
+        signal_types = list(signals.values('signal_type').annotate(
+            count=Count('signal_type')
+        ).order_by('-count'))
+
+        # Confidence score distribution
+        bucket_counts = {
+            row['bucket']: row['count']
+            for row in signals.annotate(bucket=confidence_bucket()).values('bucket').annotate(
+                count=Count('id')
+            ).order_by()
+        }
+        confidence_ranges = [
+            {'range': label, 'count': bucket_counts.get(label, 0)} for label, _, _ in CONFIDENCE_BUCKETS
+        ]
+
+        # Top symbols by signal count
+        symbol_performance = [
+            {
+                'symbol': row['symbol'],
+                'total_signals': row['total_signals'],
+                'executed_signals': row['executed_signals'],
+                'avg_confidence': round(float(row['avg_confidence'] or 0), 2),
+            }
+            for row in signals.values('symbol').annotate(
+                total_signals=Count('id'),
+                executed_signals=executed,
+                avg_confidence=Avg('confidence_score'),
+            ).order_by('-total_signals', 'symbol')[:10]
+        ]
+
+        return {
+            'strategy_performance': strategy_stats,
+            'signal_types': signal_types,
+            'confidence_distribution': confidence_ranges,
+            'top_symbols': symbol_performance,
+            'total_signals': sum(bucket_counts.values()),
+        }
+
+
+# Global instance
+signal_analytics = SignalAnalyticsService()
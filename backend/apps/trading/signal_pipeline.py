@@ -0,0 +1,259 @@
+"""
+Batch Signal Pipeline for ShareWise AI
+Generates signals for many symbols in three stages: concurrent bar fetching,
+indicator computation in a process pool (TA-Lib/NumPy work outside the GIL),
+and a single bulk write of the resulting TradingSignal rows.
+
+Every web worker owns its own pool, so the default pool size is the CPU count
+divided by the number of web workers, and pool workers send back only the
+latest indicator row rather than the full indicator frame.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Any, Optional, Tuple
+
+import pandas as pd
+
+from django.conf import settings
+from django.db import connection
+
+from .models import TradingSignal
+from .signal_analytics import signal_analytics
+from .market_analysis import (
+    TechnicalAnalyzer, RuleBasedAnalyzer, market_analysis_engine
+)
+from apps.users.models import CustomUser
+
+logger = logging.getLogger(__name__)
+
+# Below this many uncached symbols the process pool round trip costs more than it saves
+MIN_PROCESS_POOL_BATCH = 4
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def default_compute_workers() -> int:
+    """This process's share of the CPUs (WEB_CONCURRENCY or SIGNAL_WEB_WORKERS web workers share them)"""
+    web_workers = int(os.environ.get('WEB_CONCURRENCY') or getattr(settings, 'SIGNAL_WEB_WORKERS', 4))
+    return max(1, (os.cpu_count() or 1) // max(1, web_workers))
+
+
+def _get_process_pool(workers: int) -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=workers)
+        return _process_pool
+
+
+def _reset_process_pool() -> None:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def analyze_bars(symbol: str, df: pd.DataFrame, include_series: bool = True) -> Dict[str, Any]:
+    """
+    Latest indicators and rule-based verdict for one symbol (runs in worker processes).
+
+    Pool workers pass ``include_series=False`` so only the latest-row dicts are
+    pickled back to the parent, not the whole indicator frame.
+    """
+    series = TechnicalAnalyzer().calculate_indicator_series(df)
+    indicators = {name: float(value) for name, value in series.iloc[-1].items()}
+    signal_type, confidence, components = RuleBasedAnalyzer().generate_signal(indicators)
+    result = {
+        'symbol': symbol,
+        'indicators': indicators,
+        'signal_type': signal_type,
+        'confidence': confidence,
+        'components': components,
+    }
+    if include_series:
+        result['series'] = series
+    return result
+
+
+@dataclass
+class PipelineTimings:
+    """Per-stage wall-clock timings for one pipeline run"""
+    symbols: int = 0
+    fetched: int = 0
+    computed: int = 0
+    cache_hits: int = 0
+    signals_written: int = 0
+    fetch_seconds: float = 0.0
+    compute_seconds: float = 0.0
+    write_seconds: float = 0.0
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def total_seconds(self) -> float:
+        return self.fetch_seconds + self.compute_seconds + self.write_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['total_seconds'] = round(self.total_seconds, 3)
+        for key in ('fetch_seconds', 'compute_seconds', 'write_seconds'):
+            data[key] = round(data[key], 3)
+        return data
+
+
+class BatchSignalPipeline:
+    """Fetch -> compute -> write pipeline over a list of symbols"""
+
+    def __init__(self, engine=None, fetch_concurrency: Optional[int] = None,
+                 compute_workers: Optional[int] = None):
+        self.engine = engine or market_analysis_engine
+        self.fetch_concurrency = fetch_concurrency or getattr(settings, 'SIGNAL_FETCH_CONCURRENCY', 8)
+        self.compute_workers = compute_workers if compute_workers is not None else getattr(
+            settings, 'SIGNAL_COMPUTE_WORKERS', default_compute_workers()
+        )
+
+    # Stage 1: fetch
+
+    def _fetch_one(self, symbol: str, period: str) -> pd.DataFrame:
+        try:
+            return self.engine.fetch_market_data(symbol, period=period)
+        finally:
+            # Each fetch thread uses its own database connection for the bar store
+            connection.close()
+
+    def fetch(self, symbols: List[str], period: str, timings: PipelineTimings) -> Dict[str, pd.DataFrame]:
+        started = time.perf_counter()
+        frames = {}
+        workers = max(1, min(self.fetch_concurrency, len(symbols)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='signal-fetch') as executor:
+            futures = {symbol: executor.submit(self._fetch_one, symbol, period) for symbol in symbols}
+            for symbol, future in futures.items():
+                try:
+                    frames[symbol] = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching market data for {symbol}: {e}")
+                    timings.errors[symbol] = str(e)
+        timings.fetched = len(frames)
+        timings.fetch_seconds = time.perf_counter() - started
+        return frames
+
+    # Stage 2: compute
+
+    def compute(self, frames: Dict[str, pd.DataFrame], timings: PipelineTimings) -> Dict[str, Dict[str, Any]]:
+        started = time.perf_counter()
+        results = {}
+        pending = {}
+
+        for symbol, df in frames.items():
+            series = self.engine.indicator_cache.get(symbol, '1d', df)
+            if series is not None:
+                indicators = self.engine.latest_indicators(series)
+                signal_type, confidence, components = self.engine.rule_analyzer.generate_signal(indicators)
+                results[symbol] = {
+                    'symbol': symbol, 'indicators': indicators,
+                    'signal_type': signal_type, 'confidence': confidence, 'components': components,
+                }
+                timings.cache_hits += 1
+            else:
+                pending[symbol] = df
+
+        for symbol, result in self._compute_pending(pending, timings).items():
+            # Only in-process results carry the frame; pool results are latest-row only
+            series = result.pop('series', None)
+            if series is not None:
+                self.engine.indicator_cache.set(symbol, '1d', pending[symbol], series)
+            results[symbol] = result
+
+        timings.computed = len(results)
+        timings.compute_seconds = time.perf_counter() - started
+        return results
+
+    def _compute_pending(self, pending: Dict[str, pd.DataFrame],
+                         timings: PipelineTimings) -> Dict[str, Dict[str, Any]]:
+        if self.compute_workers > 1 and len(pending) >= MIN_PROCESS_POOL_BATCH:
+            try:
+                pool = _get_process_pool(self.compute_workers)
+                futures = {symbol: pool.submit(analyze_bars, symbol, df, False) for symbol, df in pending.items()}
+                return self._collect(futures, timings)
+            except BrokenProcessPool as e:
+                logger.warning(f"Signal compute pool broke, computing in-process: {e}")
+                _reset_process_pool()
+
+        results = {}
+        for symbol, df in pending.items():
+            try:
+                results[symbol] = analyze_bars(symbol, df)
+            except Exception as e:
+                logger.error(f"Error analyzing {symbol}: {e}")
+                timings.errors[symbol] = str(e)
+        return results
+
+    @staticmethod
+    def _collect(futures, timings: PipelineTimings) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        for symbol, future in futures.items():
+            try:
+                results[symbol] = future.result()
+            except BrokenProcessPool:
+                raise
+            except Exception as e:
+                logger.error(f"Error analyzing {symbol}: {e}")
+                timings.errors[symbol] = str(e)
+        return results
+
+    # Stage 3: write
+
+    def write(self, analyses: Dict[str, Dict[str, Any]], user: CustomUser, strategy_name: str,
+              timings: PipelineTimings) -> List[TradingSignal]:
+        started = time.perf_counter()
+        signals = []
+        for symbol, analysis in analyses.items():
+            try:
+                signal = self.engine.build_signal(
+                    symbol, user, strategy_name, analysis['indicators'],
+                    analysis['signal_type'], analysis['confidence'], analysis['components']
+                )
+            except Exception as e:
+                logger.error(f"Error building signal for {symbol}: {e}")
+                timings.errors[symbol] = str(e)
+                continue
+            if signal is not None:
+                signals.append(signal)
+
+        if signals:
+            signals = TradingSignal.objects.bulk_create(signals, batch_size=500)
+            # bulk_create sends no post_save
+            signal_analytics.bump_version(user.pk)
+        timings.signals_written = len(signals)
+        timings.write_seconds = time.perf_counter() - started
+        return signals
+
+    # Entry points
+
+    def analyze(self, symbols: List[str], period: str = "60d") -> Tuple[Dict[str, Dict[str, Any]], PipelineTimings]:
+        """Fetch and compute stages only (no database writes)"""
+        timings = PipelineTimings(symbols=len(symbols))
+        frames = self.fetch(symbols, period, timings)
+        return self.compute(frames, timings), timings
+
+    def generate_signals(self, symbols: List[str], user: CustomUser,
+                         strategy_name: str = "Market Analysis Engine") -> Tuple[List[TradingSignal], PipelineTimings]:
+        """Run all three stages and return the created signals with stage timings"""
+        analyses, timings = self.analyze(symbols)
+        signals = self.write(analyses, user, strategy_name, timings)
+        logger.info(
+            f"Signal pipeline: {timings.signals_written} signals from {timings.symbols} symbols "
+            f"(fetch {timings.fetch_seconds:.2f}s, compute {timings.compute_seconds:.2f}s, "
+            f"write {timings.write_seconds:.2f}s)"
+        )
+        return signals, timings
+
+
+# Global instance
+signal_pipeline = BatchSignalPipeline()
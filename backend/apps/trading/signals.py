@@ -0,0 +1,94 @@
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from .models import (
+    FuturesOptionsData, AutomatedTradeExecution, TradingOrder, TradingSignal, TradingStrategy,
+    PortfolioPosition,
+)
+from .option_chain_snapshots import option_chain_snapshots
+from .performance_rollups import performance_rollups
+from .signal_analytics import signal_analytics
+from .usage_limits import usage_service
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save, sender=FuturesOptionsData)
+@receiver(post_delete, sender=FuturesOptionsData)
+def option_instrument_changed(sender, instance, **kwargs):
+    """Drop the cached option chain snapshot containing this instrument"""
+    if instance.instrument_type != FuturesOptionsData.InstrumentType.OPTIONS:
+        return
+    try:
+        option_chain_snapshots.invalidate(instance.underlying_symbol, instance.expiry_date)
+    except Exception as e:
+        logger.error(f"Error invalidating option chain snapshot for {instance.symbol}: {e}")
+
+
+def _refresh_rollups(execution):
+    try:
+        performance_rollups.refresh_execution(execution)
+    except Exception as e:
+        logger.error(f"Error refreshing performance rollups for execution {execution.pk}: {e}")
+
+
+@receiver(pre_save, sender=AutomatedTradeExecution)
+def trade_execution_moving(sender, instance, update_fields=None, **kwargs):
+    """Remember the stored entry time, whose day must be refreshed too if the entry moves"""
+    if instance._state.adding or (update_fields is not None and 'entry_executed_at' not in update_fields):
+        return
+    previous = AutomatedTradeExecution.objects.filter(pk=instance.pk).values_list(
+        'entry_executed_at', flat=True
+    ).first()
+    if previous and previous != instance.entry_executed_at:
+        # Accumulated: several saves in one transaction all refresh after it commits
+        instance._previous_entry_times = getattr(instance, '_previous_entry_times', set()) | {previous}
+
+
+@receiver(post_save, sender=AutomatedTradeExecution)
+@receiver(post_delete, sender=AutomatedTradeExecution)
+def trade_execution_changed(sender, instance, **kwargs):
+    """Recompute the performance rollups of the execution's days once the change commits"""
+    transaction.on_commit(lambda: _refresh_rollups(instance))
+
+
+@receiver(post_save, sender=TradingOrder)
+def trading_order_completed(sender, instance, **kwargs):
+    """A completed fill can add a trade to (or move the exit of) an execution"""
+    if instance.status != TradingOrder.OrderStatus.COMPLETE:
+        return
+
+    def refresh():
+        executions = AutomatedTradeExecution.objects.filter(
+            Q(entry_order=instance) | Q(stop_loss_order=instance) | Q(target_order=instance)
+        )
+        for execution in executions:
+            _refresh_rollups(execution)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=TradingSignal)
+@receiver(post_delete, sender=TradingSignal)
+@receiver(post_save, sender=TradingOrder)
+@receiver(post_delete, sender=TradingOrder)
+def signal_analytics_changed(sender, instance, **kwargs):
+    """Invalidate the owner's cached dashboard and signal analytics"""
+    try:
+        signal_analytics.bump_version(instance.user_id)
+    except Exception as e:
+        logger.error(f"Error bumping signal analytics version for user {instance.user_id}: {e}")
+
+
+@receiver(post_save, sender=TradingStrategy)
+@receiver(post_delete, sender=TradingStrategy)
+@receiver(post_save, sender=PortfolioPosition)
+@receiver(post_delete, sender=PortfolioPosition)
+def usage_gauge_changed(sender, instance, **kwargs):
+    """Drop the cached active-strategy and open-position counts used by usage limits"""
+    try:
+        usage_service.invalidate_gauges(instance.user_id)
+    except Exception as e:
+        logger.error(f"Error invalidating usage gauges for user {instance.user_id}: {e}")
@@ -0,0 +1,482 @@
+"""
+Streaming Indicator State for ShareWise AI
+Per-symbol running indicator accumulators that are updated in O(1) per bar or
+tick and persisted in Redis, so any worker can re-evaluate a live signal
+without re-downloading history or recomputing indicators from scratch.
+
+A state is bootstrapped from history the first time a symbol is analysed
+(MarketAnalysisEngine.live_indicators) and then kept current by every quote
+from MarketDataService and the quote poller. Updates are read-modify-write
+under a per-symbol lock (Redis lock when available), so concurrent writers do
+not drop ticks. A state nobody has updated for STREAMING_INDICATOR_MAX_AGE
+seconds may have missed bars and is rebuilt from history instead of resumed.
+"""
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, Optional
+import logging
+
+import pandas as pd
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Bar length of each yfinance interval a tick can be bucketed into
+BAR_INTERVALS = {
+    '1m': pd.Timedelta(minutes=1),
+    '2m': pd.Timedelta(minutes=2),
+    '5m': pd.Timedelta(minutes=5),
+    '15m': pd.Timedelta(minutes=15),
+    '30m': pd.Timedelta(minutes=30),
+    '60m': pd.Timedelta(hours=1),
+    '90m': pd.Timedelta(minutes=90),
+    '1h': pd.Timedelta(hours=1),
+    '1d': None,
+    '1wk': None,
+    '1mo': None,
+}
+
+
+def bar_start(timestamp: pd.Timestamp, interval: str, reference: Optional[pd.Timestamp] = None) -> pd.Timestamp:
+    """
+    Start of the ``interval`` bar containing ``timestamp``.
+
+    Intraday bars are counted from ``reference`` (any earlier bar start), since
+    exchange sessions open off the hour (NSE bars start at 09:15). Daily,
+    weekly and monthly bars start at midnight, on Monday and on the 1st.
+    """
+    if interval not in BAR_INTERVALS:
+        raise ValueError(f"Cannot bucket ticks into {interval} bars")
+    length = BAR_INTERVALS[interval]
+    if length is not None:
+        if reference is None:
+            return timestamp.floor(length)
+        return reference + ((timestamp - reference) // length) * length
+
+    day = timestamp.normalize()
+    if interval == '1wk':
+        return day - pd.Timedelta(days=day.weekday())
+    if interval == '1mo':
+        return day.replace(day=1)
+    return day
+
+
+def _ema_step(previous: float, value: float, period: int) -> float:
+    k = 2.0 / (period + 1)
+    return previous + k * (value - previous)
+
+
+def _wilder_step(previous: float, value: float, period: int) -> float:
+    return (previous * (period - 1) + value) / period
+
+
+class StreamingIndicatorState:
+    """
+    Running indicator state for one symbol and interval.
+
+    Committed bars update EMA/MACD, Wilder RSI/ATR accumulators and fixed-size
+    rolling windows; the bar currently forming (from live ticks) is applied to
+    a copy when indicators are read, so committed state is never disturbed.
+    Seeding follows TA-Lib (SMA-seeded EMAs, Wilder averages seeded with the
+    mean of the first period), so values line up with TechnicalAnalyzer.
+    """
+
+    VERSION = 2
+
+    def __init__(self, symbol: str, interval: str = '1d'):
+        self.symbol = symbol.upper()
+        self.interval = interval
+        self.updated_at: Optional[float] = None  # Wall-clock time of the last save
+        self.bar_count = 0
+        self.last_bar_time: Optional[str] = None
+        self.prev_close: Optional[float] = None
+
+        # Rolling windows (SMA, Bollinger, volume, support/resistance, %R, stochastic)
+        self.closes = deque(maxlen=50)
+        self.highs = deque(maxlen=20)
+        self.lows = deque(maxlen=20)
+        self.volumes = deque(maxlen=20)
+        self.fastk = deque(maxlen=3)
+        self.slowk = deque(maxlen=3)
+        self.slowd: Optional[float] = None
+
+        # Running averages
+        self.ema_12: Optional[float] = None
+        self.ema_26: Optional[float] = None
+        self.macd_fast: Optional[float] = None
+        self.macd_values = deque(maxlen=9)
+        self.macd_signal: Optional[float] = None
+        self.gains = deque(maxlen=14)
+        self.losses = deque(maxlen=14)
+        self.avg_gain: Optional[float] = None
+        self.avg_loss: Optional[float] = None
+        self.true_ranges = deque(maxlen=14)
+        self.atr: Optional[float] = None
+
+        # Bar being built from ticks
+        self.forming: Optional[Dict[str, Any]] = None
+
+    # Updates
+
+    def update_bar(self, bar_time: Any, open_price: float, high: float, low: float,
+                   close: float, volume: float) -> bool:
+        """Commit a completed bar; bars at or before the last committed one are ignored"""
+        bar_time = self._normalize_time(bar_time)
+        if self.last_bar_time is not None and bar_time <= self.last_bar_time:
+            return False
+        if self.forming and self.forming['time'] <= bar_time:
+            self.forming = None
+        self._commit(float(high), float(low), float(close), float(volume))
+        self.last_bar_time = bar_time
+        return True
+
+    def update_tick(self, bar_time: Any, price: float, volume: Optional[float] = None,
+                    high: Optional[float] = None, low: Optional[float] = None,
+                    open_price: Optional[float] = None) -> None:
+        """Fold a live tick/quote into the forming bar, committing the previous bar on rollover"""
+        bar_time = self._normalize_time(bar_time)
+        if self.last_bar_time is not None and bar_time <= self.last_bar_time:
+            return
+
+        forming = self.forming
+        if forming and forming['time'] != bar_time:
+            self.update_bar(forming['time'], forming['open'], forming['high'], forming['low'],
+                            forming['close'], forming['volume'])
+            forming = None
+
+        price = float(price)
+        if forming is None:
+            forming = {
+                'time': bar_time,
+                'open': price,
+                'high': price, 'low': price, 'close': price, 'volume': 0.0,
+            }
+        # Quotes carry the session open/high/low; bare ticks extend the running range
+        if open_price:
+            forming['open'] = float(open_price)
+        forming['high'] = max(float(high), price) if high else max(forming['high'], price)
+        forming['low'] = min(float(low), price) if low else min(forming['low'], price)
+        forming['close'] = price
+        if volume is not None:
+            forming['volume'] = float(volume)  # Quotes carry cumulative session volume
+        self.forming = forming
+
+    def _commit(self, high: float, low: float, close: float, volume: float) -> None:
+        prev_close = self.prev_close
+        self.bar_count += 1
+        self.closes.append(close)
+        self.highs.append(high)
+        self.lows.append(low)
+        self.volumes.append(volume)
+        n = self.bar_count
+
+        # EMAs seeded with the SMA of their first period
+        if n == 12:
+            self.ema_12 = sum(list(self.closes)[-12:]) / 12
+        elif n > 12:
+            self.ema_12 = _ema_step(self.ema_12, close, 12)
+        if n == 26:
+            self.ema_26 = sum(list(self.closes)[-26:]) / 26
+            # TA-Lib's MACD seeds its fast EMA on the same bar as the slow one
+            self.macd_fast = sum(list(self.closes)[-12:]) / 12
+        elif n > 26:
+            self.ema_26 = _ema_step(self.ema_26, close, 26)
+            self.macd_fast = _ema_step(self.macd_fast, close, 12)
+
+        if self.ema_26 is not None:
+            macd = self.macd_fast - self.ema_26
+            if self.macd_signal is None:
+                self.macd_values.append(macd)
+                if len(self.macd_values) == 9:
+                    self.macd_signal = sum(self.macd_values) / 9
+            else:
+                self.macd_signal = _ema_step(self.macd_signal, macd, 9)
+
+        if prev_close is not None:
+            change = close - prev_close
+            gain, loss = max(change, 0.0), max(-change, 0.0)
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            if self.avg_gain is None:
+                self.gains.append(gain)
+                self.losses.append(loss)
+                if len(self.gains) == 14:
+                    self.avg_gain = sum(self.gains) / 14
+                    self.avg_loss = sum(self.losses) / 14
+            else:
+                self.avg_gain = _wilder_step(self.avg_gain, gain, 14)
+                self.avg_loss = _wilder_step(self.avg_loss, loss, 14)
+            if self.atr is None:
+                self.true_ranges.append(true_range)
+                if len(self.true_ranges) == 14:
+                    self.atr = sum(self.true_ranges) / 14
+            else:
+                self.atr = _wilder_step(self.atr, true_range, 14)
+
+        # Stochastic (5, 3, 3)
+        if n >= 5:
+            hh, ll = max(list(self.highs)[-5:]), min(list(self.lows)[-5:])
+            self.fastk.append(100 * (close - ll) / (hh - ll) if hh != ll else 0.0)
+            if len(self.fastk) == 3:
+                self.slowk.append(sum(self.fastk) / 3)
+                if len(self.slowk) == 3:
+                    self.slowd = sum(self.slowk) / 3
+
+        self.prev_close = close
+
+    # Reads
+
+    def indicators(self) -> Dict[str, float]:
+        """Indicator dict (including 'close') for the latest bar, forming bar included"""
+        if self.forming:
+            state = self.copy()
+            forming = state.forming
+            state.forming = None
+            state._commit(forming['high'], forming['low'], forming['close'], forming['volume'])
+            return state._compute()
+        return self._compute()
+
+    def _compute(self) -> Dict[str, float]:
+        if self.bar_count == 0:
+            raise ValueError(f"No bars recorded for {self.symbol}")
+
+        n = self.bar_count
+        closes = list(self.closes)
+        highs, lows, volumes = list(self.highs), list(self.lows), list(self.volumes)
+        close, high, low, volume = closes[-1], highs[-1], lows[-1], volumes[-1]
+        last_20 = closes[-20:]
+        mean_20 = sum(last_20) / len(last_20)
+        std_20 = math.sqrt(sum((c - mean_20) ** 2 for c in last_20) / len(last_20))
+
+        indicators = {'close': close}
+        indicators['sma_20'] = mean_20 if n >= 20 else close
+        indicators['sma_50'] = sum(closes) / 50 if n >= 50 else close
+        indicators['ema_12'] = self.ema_12 if n >= 12 else close
+        indicators['ema_26'] = self.ema_26 if n >= 26 else close
+
+        if self.macd_signal is not None:
+            macd = self.macd_fast - self.ema_26
+            indicators['macd'] = macd
+            indicators['macd_signal'] = self.macd_signal
+            indicators['macd_histogram'] = macd - self.macd_signal
+        else:
+            indicators['macd'] = indicators['macd_signal'] = indicators['macd_histogram'] = 0.0
+
+        if self.avg_gain is not None:
+            total = self.avg_gain + self.avg_loss
+            indicators['rsi'] = 100 * self.avg_gain / total if total > 0 else 0.0
+        else:
+            indicators['rsi'] = 50.0
+
+        if n >= 20:
+            indicators['bb_upper'] = mean_20 + 2 * std_20
+            indicators['bb_middle'] = mean_20
+            indicators['bb_lower'] = mean_20 - 2 * std_20
+        else:
+            indicators['bb_upper'] = close * 1.02
+            indicators['bb_middle'] = close
+            indicators['bb_lower'] = close * 0.98
+
+        indicators['atr'] = self.atr if self.atr is not None else high - low
+
+        if n >= 14:
+            hh, ll = max(highs[-14:]), min(lows[-14:])
+            indicators['williams_r'] = -100 * (hh - close) / (hh - ll) if hh != ll else 0.0
+        else:
+            indicators['williams_r'] = -50.0
+
+        if self.slowd is not None:
+            indicators['stoch_k'] = self.slowk[-1]
+            indicators['stoch_d'] = self.slowd
+        else:
+            indicators['stoch_k'] = indicators['stoch_d'] = 50.0
+
+        indicators['volume_sma'] = sum(volumes) / 20 if n >= 20 else volume
+        indicators['volume_ratio'] = volume / indicators['volume_sma'] if indicators['volume_sma'] > 0 else 1
+
+        indicators['price_change'] = (close - closes[-2]) / closes[-2] * 100 if n >= 2 else 0
+        indicators['volatility'] = std_20 / mean_20 * 100 if n >= 20 else 0
+
+        indicators['resistance'] = max(highs)
+        indicators['support'] = min(lows)
+        indicators['distance_from_resistance'] = (indicators['resistance'] - close) / close * 100
+        indicators['distance_from_support'] = (close - indicators['support']) / close * 100
+
+        return indicators
+
+    # Serialization
+
+    @staticmethod
+    def _normalize_time(bar_time: Any) -> str:
+        if isinstance(bar_time, (datetime, pd.Timestamp)):
+            return bar_time.isoformat()
+        return str(bar_time)
+
+    def copy(self) -> 'StreamingIndicatorState':
+        return StreamingIndicatorState.from_dict(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {'version': self.VERSION}
+        for name, value in self.__dict__.items():
+            data[name] = list(value) if isinstance(value, deque) else value
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'StreamingIndicatorState':
+        state = cls(data['symbol'], data['interval'])
+        for name, value in data.items():
+            if name == 'version':
+                continue
+            current = getattr(state, name, None)
+            if isinstance(current, deque):
+                current.extend(value)
+            else:
+                setattr(state, name, value)
+        return state
+
+    @classmethod
+    def from_bars(cls, symbol: str, df: pd.DataFrame, interval: str = '1d') -> 'StreamingIndicatorState':
+        """
+        Bootstrap from an OHLCV frame. The last row is kept as the forming bar,
+        since during a session the latest downloaded bar is still open.
+        """
+        state = cls(symbol, interval)
+        rows = df[['Open', 'High', 'Low', 'Close', 'Volume']].itertuples(index=True, name=None)
+        rows = list(rows)
+        for bar_time, open_price, high, low, close, volume in rows[:-1]:
+            state.update_bar(bar_time, open_price, high, low, close, volume)
+        if rows:
+            bar_time, open_price, high, low, close, volume = rows[-1]
+            state.update_tick(bar_time, close, volume=volume, high=high, low=low, open_price=open_price)
+        return state
+
+
+class StreamingIndicatorStore:
+    """Redis persistence for StreamingIndicatorState, shared by every worker"""
+
+    def __init__(self, timeout: int = 3 * 24 * 3600, max_age: Optional[int] = None, lock_timeout: float = 5.0):
+        self.timeout = timeout
+        self.max_age = max_age or getattr(settings, 'STREAMING_INDICATOR_MAX_AGE', 300)
+        self.lock_timeout = lock_timeout
+        self._redis = None
+        self._redis_checked = False
+        self._lock = threading.Lock()
+        self._local_locks: Dict[str, threading.Lock] = {}
+
+    @staticmethod
+    def _cache_key(symbol: str, interval: str) -> str:
+        return f"streaming_indicators:{interval}:{symbol.upper()}"
+
+    def _get_redis(self):
+        if not self._redis_checked:
+            with self._lock:
+                if not self._redis_checked:
+                    try:
+                        from django_redis import get_redis_connection
+                        self._redis = get_redis_connection("default")
+                    except Exception:
+                        logger.info("Redis not available for streaming indicator locks, using process locks")
+                        self._redis = None
+                    self._redis_checked = True
+        return self._redis
+
+    @contextmanager
+    def locked(self, symbol: str, interval: str = '1d'):
+        """Serialize read-modify-write of one symbol's state across threads and workers"""
+        key = self._cache_key(symbol, interval)
+        redis_conn = self._get_redis()
+        if redis_conn is None:
+            with self._lock:
+                lock = self._local_locks.setdefault(key, threading.Lock())
+            with lock:
+                yield
+            return
+
+        lock = redis_conn.lock(f"{key}:lock", timeout=self.lock_timeout, blocking_timeout=self.lock_timeout)
+        if not lock.acquire():
+            raise TimeoutError(f"Timed out waiting for the streaming indicator lock of {symbol}")
+        try:
+            yield
+        finally:
+            try:
+                lock.release()
+            except Exception:
+                pass  # Expired after lock_timeout; the next writer already holds it
+
+    def _current_data(self, symbol: str, interval: str) -> Optional[Dict[str, Any]]:
+        data = cache.get(self._cache_key(symbol, interval))
+        if not data or data.get('version') != StreamingIndicatorState.VERSION:
+            return None
+        if not data.get('updated_at') or time.time() - data['updated_at'] > self.max_age:
+            return None
+        return data
+
+    def load(self, symbol: str, interval: str = '1d') -> Optional[StreamingIndicatorState]:
+        """The symbol's state, or None when missing, from an older layout or stale"""
+        data = self._current_data(symbol, interval)
+        return StreamingIndicatorState.from_dict(data) if data else None
+
+    def save(self, state: StreamingIndicatorState) -> None:
+        state.updated_at = time.time()
+        cache.set(self._cache_key(state.symbol, state.interval), state.to_dict(), timeout=self.timeout)
+
+    def delete(self, symbol: str, interval: str = '1d') -> None:
+        cache.delete(self._cache_key(symbol, interval))
+
+    def bootstrap(self, symbol: str, df: pd.DataFrame, interval: str = '1d') -> StreamingIndicatorState:
+        """Replace the symbol's state with one built from the OHLCV frame ``df``"""
+        state = StreamingIndicatorState.from_bars(symbol, df, interval)
+        with self.locked(symbol, interval):
+            self.save(state)
+        return state
+
+    def apply_quote(self, symbol: str, quote_data: Dict[str, Any],
+                    interval: str = '1d') -> Optional[StreamingIndicatorState]:
+        """
+        Fold a normalized MarketDataService quote into an existing state.
+        Symbols without a current state are skipped without taking the lock;
+        they are bootstrapped from history when next analysed. Raises
+        ValueError for intervals ticks cannot be bucketed into.
+        """
+        if interval not in BAR_INTERVALS:
+            raise ValueError(f"Cannot stream quotes into {interval} bars")
+        if self._current_data(symbol, interval) is None:
+            return None
+
+        with self.locked(symbol, interval):
+            state = self.load(symbol, interval)
+            if state is None:
+                return None
+            self._apply_quote(state, quote_data)
+            self.save(state)
+        return state
+
+    @staticmethod
+    def _apply_quote(state: StreamingIndicatorState, quote_data: Dict[str, Any]) -> None:
+        timestamp = pd.Timestamp(quote_data.get('timestamp') or datetime.now())
+        # Align to the timezone of the bootstrapped bars
+        reference = (state.forming or {}).get('time') or state.last_bar_time
+        reference = pd.Timestamp(reference) if reference else None
+        tzinfo = reference.tzinfo if reference is not None else None
+        if tzinfo is not None:
+            timestamp = timestamp.tz_localize(tzinfo) if timestamp.tzinfo is None else timestamp.tz_convert(tzinfo)
+        elif timestamp.tzinfo is not None:
+            timestamp = timestamp.tz_localize(None)
+
+        state.update_tick(
+            bar_start(timestamp, state.interval, reference),
+            float(quote_data['last_price']),
+            volume=float(quote_data['volume']) if quote_data.get('volume') else None,
+            high=float(quote_data['high_price']) if quote_data.get('high_price') else None,
+            low=float(quote_data['low_price']) if quote_data.get('low_price') else None,
+            open_price=float(quote_data['open_price']) if quote_data.get('open_price') else None,
+        )
+
+
+# Global instance
+streaming_indicator_store = StreamingIndicatorStore()
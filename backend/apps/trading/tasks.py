@@ -0,0 +1,23 @@
+"""
+Celery tasks for the trading app
+"""
+import logging
+
+from celery import shared_task
+
+from .usage_counters import usage_counters
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def flush_usage_counters():
+    """Persist Redis usage counters to UsageTracker for reporting"""
+    try:
+        written = usage_counters.flush()
+        if written:
+            logger.info(f"Flushed {written} usage counters")
+        return written
+    except Exception as e:
+        logger.error(f"Error flushing usage counters: {e}")
+        return 0
@@ -0,0 +1,232 @@
+"""
+Trade History Export for ShareWise AI
+Streams a user's trade history straight from a server-side cursor as JSON,
+CSV, NDJSON or Parquet. Rows are encoded and sent as they are read, and the
+summary statistics are accumulated in the same pass and written at the end,
+so memory stays flat however many trades are exported.
+"""
+import io
+import csv
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from django.utils import timezone
+
+from .reporting import TradingReportGenerator
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+EXPORT_FORMATS = {
+    'json': 'application/json',
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+EXPORT_COLUMNS = TradingReportGenerator.TRADE_HISTORY_COLUMNS
+
+
+class TradeSummary:
+    """Running trade-history summary (matches the pandas column aggregates it replaced)"""
+
+    def __init__(self):
+        self.total_trades = 0
+        self.winning_trades = 0
+        self.pnl_count = 0
+        self.total_pnl = 0.0
+        self.best_trade = None
+        self.worst_trade = None
+        self.confidence_count = 0
+        self.confidence_sum = 0.0
+
+    def add(self, trade: Dict[str, Any]) -> None:
+        self.total_trades += 1
+        pnl = trade['pnl']
+        if pnl is not None:
+            self.pnl_count += 1
+            self.total_pnl += pnl
+            self.best_trade = pnl if self.best_trade is None else max(self.best_trade, pnl)
+            self.worst_trade = pnl if self.worst_trade is None else min(self.worst_trade, pnl)
+            if pnl > 0:
+                self.winning_trades += 1
+        if trade['confidence_score'] is not None:
+            self.confidence_count += 1
+            self.confidence_sum += trade['confidence_score']
+
+    def as_dict(self) -> Dict[str, Any]:
+        if not self.total_trades:
+            return {}
+        return {
+            'total_trades': self.total_trades,
+            'winning_trades': self.winning_trades,
+            'total_pnl': self.total_pnl,
+            'avg_pnl_per_trade': self.total_pnl / self.pnl_count if self.pnl_count else None,
+            'best_trade': self.best_trade,
+            'worst_trade': self.worst_trade,
+            'avg_confidence': self.confidence_sum / self.confidence_count if self.confidence_count else None,
+        }
+
+
+def _float(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file whose bytes are drained as they are produced; tell() keeps counting"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+class TradeHistoryExporter:
+    """Generator-based encoders for StreamingHttpResponse"""
+
+    def __init__(self, user=None, strategy=None, start_date: datetime = None, end_date: datetime = None,
+                 chunk_size: int = 2000):
+        self.reporter = TradingReportGenerator(user=user, strategy=strategy)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.chunk_size = chunk_size
+        self.summary = TradeSummary()
+
+    def trades(self) -> Iterator[Dict[str, Any]]:
+        """Trade rows (same fields as get_trade_history), summarised as they pass"""
+        rows = self.reporter.trade_history_rows(self.start_date, self.end_date).order_by('entry_executed_at', 'id')
+        for (execution_id, symbol, signal_type, entry_date, exit_date, entry_price, exit_price,
+             quantity, pnl, fees, strategy, confidence) in rows.iterator(chunk_size=self.chunk_size):
+            pnl = _float(pnl)
+            trade = {
+                'execution_id': str(execution_id),
+                'symbol': symbol,
+                'signal_type': signal_type,
+                'entry_date': entry_date.isoformat() if entry_date else None,
+                'exit_date': exit_date.isoformat() if exit_date else None,
+                'entry_price': _float(entry_price),
+                'exit_price': _float(exit_price),
+                'quantity': quantity,
+                'pnl': pnl,
+                'fees': _float(fees),
+                'duration_days': (exit_date - entry_date).total_seconds() / 86400
+                if entry_date and exit_date else None,
+                'strategy': strategy or 'Unknown',
+                'confidence_score': _float(confidence),
+                'is_winner': pnl is not None and pnl > 0,
+            }
+            self.summary.add(trade)
+            yield trade
+
+    def _metadata(self) -> Dict[str, Any]:
+        return {
+            'export_date': timezone.now().isoformat(),
+            'date_range': {
+                'start_date': self.start_date.isoformat() if self.start_date else None,
+                'end_date': self.end_date.isoformat() if self.end_date else None
+            }
+        }
+
+    # Encoders
+
+    def stream(self, export_format: str) -> Iterable[bytes]:
+        return getattr(self, f'stream_{export_format}')()
+
+    def stream_json(self) -> Iterator[bytes]:
+        """The JSON document trade_history_export has always returned, written incrementally"""
+        yield b'{"trades": ['
+        separator = b''
+        for trade in self.trades():
+            yield separator + json.dumps(trade).encode()
+            separator = b', '
+        tail = {'summary': self.summary.as_dict(), **self._metadata()}
+        if not self.summary.total_trades:
+            tail['message'] = 'No trades found for the specified period'
+        yield b'], ' + json.dumps(tail).encode()[1:]
+
+    def stream_ndjson(self) -> Iterator[bytes]:
+        """One trade per line, then a final summary line"""
+        for trade in self.trades():
+            yield json.dumps(trade).encode() + b'\n'
+        yield json.dumps({'summary': self.summary.as_dict(), **self._metadata()}).encode() + b'\n'
+
+    def stream_csv(self) -> Iterator[bytes]:
+        """Trade rows; the summary follows a blank line as name,value rows"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush() -> bytes:
+            data = buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+            return data
+
+        writer.writerow(EXPORT_COLUMNS)
+        yield flush()
+        for index, trade in enumerate(self.trades(), 1):
+            writer.writerow(['' if trade[column] is None else trade[column] for column in EXPORT_COLUMNS])
+            if index % 100 == 0:
+                yield flush()
+        writer.writerow([])
+        for name, value in self.summary.as_dict().items():
+            writer.writerow([name, '' if value is None else value])
+        yield flush()
+
+    def stream_parquet(self) -> Iterator[bytes]:
+        """One Parquet row group per chunk; the summary goes into the file metadata"""
+        if not PARQUET_AVAILABLE:
+            raise ValueError("Parquet export requires pyarrow")
+
+        schema = pa.schema([
+            ('execution_id', pa.string()), ('symbol', pa.string()), ('signal_type', pa.string()),
+            ('entry_date', pa.string()), ('exit_date', pa.string()), ('entry_price', pa.float64()),
+            ('exit_price', pa.float64()), ('quantity', pa.int64()), ('pnl', pa.float64()),
+            ('fees', pa.float64()), ('duration_days', pa.float64()), ('strategy', pa.string()),
+            ('confidence_score', pa.float64()), ('is_winner', pa.bool_()),
+        ])
+        sink = _StreamSink()
+        writer = pq.ParquetWriter(sink, schema)
+        drain = sink.drain
+
+        def write(batch: List[Dict[str, Any]]) -> None:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+        yield drain()
+        batch = []
+        for trade in self.trades():
+            batch.append(trade)
+            if len(batch) >= self.chunk_size:
+                write(batch)
+                batch = []
+                yield drain()
+        if batch:
+            write(batch)
+        if hasattr(writer, 'add_key_value_metadata'):
+            writer.add_key_value_metadata({'summary': json.dumps(self.summary.as_dict())})
+        writer.close()
+        yield drain()
@@ -0,0 +1,284 @@
+"""
+Usage Counters for ShareWise AI
+Daily and monthly usage counters behind SubscriptionLimitService. With Redis
+the check and the increment run in one Lua script over day- and
+month-bucketed keys, so enforcement on the request path never touches the
+database and concurrent requests cannot lose counts; counters are flushed to
+UsageTracker in the background for reporting. Without Redis the counters live
+in UsageTracker itself and are updated under a row lock.
+"""
+import logging
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UsageTracker
+
+logger = logging.getLogger(__name__)
+
+DAY_KEY_TTL = 2 * 86400
+MONTH_KEY_TTL = 35 * 86400
+
+# KEYS: day counter, month counter, dirty set
+# ARGV: limit (-1 = unlimited), 'd' or 'm' (which counter the limit applies to),
+#       amount, day TTL, month TTL, dirty member
+# Returns {-1} when a counter has not been seeded yet, {0, current} when the
+# limit is reached, {1, day, month} after incrementing.
+CHECK_AND_INCREMENT = """
+if redis.call('EXISTS', KEYS[1]) == 0 or redis.call('EXISTS', KEYS[2]) == 0 then
+    return {-1}
+end
+local limit = tonumber(ARGV[1])
+local amount = tonumber(ARGV[3])
+local limited = KEYS[2]
+if ARGV[2] == 'd' then limited = KEYS[1] end
+local current = tonumber(redis.call('GET', limited))
+if limit >= 0 and amount > 0 and current + amount > limit then
+    return {0, current}
+end
+local day = redis.call('INCRBY', KEYS[1], amount)
+if day < 0 then day = 0; redis.call('SET', KEYS[1], 0) end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+local month = redis.call('INCRBY', KEYS[2], amount)
+if month < 0 then month = 0; redis.call('SET', KEYS[2], 0) end
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+redis.call('SADD', KEYS[3], ARGV[6])
+return {1, day, month}
+"""
+
+
+def _tracker_counts(tracker: Optional[UsageTracker], today: date) -> Tuple[int, int]:
+    """Tracker counts that still belong to the current day and month"""
+    if tracker is None:
+        return 0, 0
+    daily = tracker.daily_count if tracker.last_daily_reset == today else 0
+    monthly = tracker.monthly_count if (tracker.last_monthly_reset.year, tracker.last_monthly_reset.month) == \
+        (today.year, today.month) else 0
+    return daily, monthly
+
+
+class UsageCounterStore:
+    """Atomic per-user, per-limit-type daily and monthly counters"""
+
+    KEY_PREFIX = 'usage_counter'
+    DIRTY_KEY = 'usage_counter:dirty'
+
+    def __init__(self):
+        self._redis = None
+        self._redis_checked = False
+        self._script = None
+        self._lock = threading.Lock()
+
+    def _get_redis(self):
+        if not self._redis_checked:
+            with self._lock:
+                if not self._redis_checked:
+                    try:
+                        from django_redis import get_redis_connection
+                        self._redis = get_redis_connection("default")
+                        self._script = self._redis.register_script(CHECK_AND_INCREMENT)
+                    except Exception:
+                        logger.info("Redis not available for usage counters, using UsageTracker rows")
+                        self._redis = None
+                    self._redis_checked = True
+        return self._redis
+
+    # Keys
+
+    def _day_key(self, user_id, limit_type: str, day: date) -> str:
+        return f"{self.KEY_PREFIX}:{user_id}:{limit_type}:d:{day:%Y%m%d}"
+
+    def _month_key(self, user_id, limit_type: str, day: date) -> str:
+        return f"{self.KEY_PREFIX}:{user_id}:{limit_type}:m:{day:%Y%m}"
+
+    @staticmethod
+    def _dirty_member(user_id, limit_type: str, day: date) -> str:
+        return f"{user_id}|{limit_type}|{day:%Y%m%d}"
+
+    # Counting
+
+    def current(self, user_id, limit_type: str) -> Tuple[int, int]:
+        """(daily, monthly) usage so far"""
+        today = timezone.localdate()
+        redis_conn = self._get_redis()
+        if redis_conn is None:
+            tracker = UsageTracker.objects.filter(user_id=user_id, limit_type=limit_type).first()
+            return _tracker_counts(tracker, today)
+
+        day, month = redis_conn.mget(self._day_key(user_id, limit_type, today),
+                                     self._month_key(user_id, limit_type, today))
+        if day is None or month is None:
+            self._seed(redis_conn, user_id, limit_type, today)
+            day, month = redis_conn.mget(self._day_key(user_id, limit_type, today),
+                                         self._month_key(user_id, limit_type, today))
+        return int(day or 0), int(month or 0)
+
+    def acquire(self, user_id, limit_type: str, limit: int, is_daily: bool = True,
+                amount: int = 1) -> Tuple[bool, int]:
+        """
+        Add ``amount`` unless that would take the daily (or monthly) count past ``limit``.
+
+        Returns (acquired, usage): the new count when acquired, otherwise the
+        count that blocked it. ``limit`` of -1 means unlimited.
+        """
+        today = timezone.localdate()
+        redis_conn = self._get_redis()
+        if redis_conn is None:
+            return self._acquire_database(user_id, limit_type, limit, is_daily, amount, today)
+
+        keys = [self._day_key(user_id, limit_type, today), self._month_key(user_id, limit_type, today),
+                self.DIRTY_KEY]
+        args = [limit, 'd' if is_daily else 'm', amount, DAY_KEY_TTL, MONTH_KEY_TTL,
+                self._dirty_member(user_id, limit_type, today)]
+        result = self._script(keys=keys, args=args)
+        if result[0] == -1:
+            self._seed(redis_conn, user_id, limit_type, today)
+            result = self._script(keys=keys, args=args)
+
+        if result[0] == 0:
+            return False, int(result[1])
+        return True, int(result[1] if is_daily else result[2])
+
+    def increment(self, user_id, limit_type: str, amount: int = 1) -> Tuple[bool, int]:
+        """Unconditional increment"""
+        return self.acquire(user_id, limit_type, -1, True, amount)
+
+    def release(self, user_id, limit_type: str, amount: int = 1) -> None:
+        """Give back units taken by ``acquire`` (e.g. when the request failed)"""
+        self.acquire(user_id, limit_type, -1, True, -amount)
+
+    def reset(self, user_id, limit_type: str, daily: bool = True, monthly: bool = True) -> None:
+        redis_conn = self._get_redis()
+        if redis_conn is None:
+            return
+        today = timezone.localdate()
+        # Zeroed rather than deleted, so the next use does not re-seed from UsageTracker
+        pipe = redis_conn.pipeline()
+        if daily:
+            pipe.set(self._day_key(user_id, limit_type, today), 0, ex=DAY_KEY_TTL)
+        if monthly:
+            pipe.set(self._month_key(user_id, limit_type, today), 0, ex=MONTH_KEY_TTL)
+        pipe.sadd(self.DIRTY_KEY, self._dirty_member(user_id, limit_type, today))
+        pipe.execute()
+
+    def _seed(self, redis_conn, user_id, limit_type: str, today: date) -> None:
+        """Start today's counters from UsageTracker (first use of the day, or after a Redis restart)"""
+        tracker = UsageTracker.objects.filter(user_id=user_id, limit_type=limit_type).first()
+        daily, monthly = _tracker_counts(tracker, today)
+        pipe = redis_conn.pipeline()
+        # NX: never overwrite counts another worker has already started
+        pipe.set(self._day_key(user_id, limit_type, today), daily, ex=DAY_KEY_TTL, nx=True)
+        pipe.set(self._month_key(user_id, limit_type, today), monthly, ex=MONTH_KEY_TTL, nx=True)
+        pipe.execute()
+
+    @staticmethod
+    def _acquire_database(user_id, limit_type: str, limit: int, is_daily: bool, amount: int,
+                          today: date) -> Tuple[bool, int]:
+        with transaction.atomic():
+            tracker, _ = UsageTracker.objects.select_for_update().get_or_create(
+                user_id=user_id, limit_type=limit_type,
+                defaults={'last_daily_reset': today, 'last_monthly_reset': today},
+            )
+            daily, monthly = _tracker_counts(tracker, today)
+            current = daily if is_daily else monthly
+            if limit >= 0 and amount > 0 and current + amount > limit:
+                return False, current
+
+            tracker.daily_count = max(daily + amount, 0)
+            tracker.monthly_count = max(monthly + amount, 0)
+            tracker.last_daily_reset = today
+            if (tracker.last_monthly_reset.year, tracker.last_monthly_reset.month) != (today.year, today.month):
+                tracker.last_monthly_reset = today
+            tracker.save(update_fields=['daily_count', 'monthly_count', 'last_daily_reset',
+                                        'last_monthly_reset', 'updated_at'])
+            return True, tracker.daily_count if is_daily else tracker.monthly_count
+
+    # Background flush
+
+    def flush(self, batch_size: int = 1000) -> int:
+        """Write changed Redis counters to UsageTracker; returns trackers written"""
+        redis_conn = self._get_redis()
+        if redis_conn is None:
+            return 0
+
+        written = 0
+        while True:
+            members = [m.decode() if isinstance(m, bytes) else m
+                       for m in (redis_conn.spop(self.DIRTY_KEY, batch_size) or [])]
+            if not members:
+                return written
+            try:
+                written += self._flush_members(redis_conn, members)
+            except Exception:
+                # Put them back for the next run
+                redis_conn.sadd(self.DIRTY_KEY, *members)
+                raise
+
+    def _flush_members(self, redis_conn, members: List[str]) -> int:
+        entries = []
+        for member in members:
+            user_id, limit_type, day = member.split('|')
+            entries.append((user_id, limit_type, date(int(day[:4]), int(day[4:6]), int(day[6:]))))
+
+        values = redis_conn.mget([key for user_id, limit_type, day in entries
+                                  for key in (self._day_key(user_id, limit_type, day),
+                                              self._month_key(user_id, limit_type, day))])
+        counts: Dict[Tuple[str, str], Tuple[date, int, int]] = {}
+        for index, (user_id, limit_type, day) in enumerate(entries):
+            daily, monthly = values[2 * index], values[2 * index + 1]
+            if daily is None or monthly is None:
+                continue  # Expired before it was flushed
+            previous = counts.get((user_id, limit_type))
+            if previous is None or previous[0] < day:
+                counts[(user_id, limit_type)] = (day, int(daily), int(monthly))
+        if not counts:
+            return 0
+
+        now = timezone.now()
+        now_day = timezone.localdate(now)
+        with transaction.atomic():
+            existing = {
+                (str(tracker.user_id), tracker.limit_type): tracker
+                for tracker in UsageTracker.objects.select_for_update().filter(
+                    user_id__in={user_id for user_id, _ in counts},
+                    limit_type__in={limit_type for _, limit_type in counts},
+                )
+            }
+            to_update, to_create = [], []
+            for (user_id, limit_type), (day, daily, monthly) in counts.items():
+                tracker = existing.get((user_id, limit_type))
+                if tracker is None:
+                    to_create.append(UsageTracker(
+                        user_id=user_id, limit_type=limit_type, daily_count=daily, monthly_count=monthly,
+                        last_daily_reset=day, last_monthly_reset=day,
+                    ))
+                    continue
+                if tracker.last_daily_reset > day:
+                    continue  # A newer day was already written
+                tracker.daily_count = daily
+                tracker.monthly_count = monthly
+                tracker.last_daily_reset = day
+                if (tracker.last_monthly_reset.year, tracker.last_monthly_reset.month) != (day.year, day.month):
+                    tracker.last_monthly_reset = day
+                tracker.updated_at = now  # bulk_update skips auto_now
+                to_update.append(tracker)
+
+            if to_update:
+                UsageTracker.objects.bulk_update(
+                    to_update, ['daily_count', 'monthly_count', 'last_daily_reset', 'last_monthly_reset',
+                                'updated_at'], batch_size=500)
+            if to_create:
+                UsageTracker.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+                # auto_now_add stamps today; counts flushed after midnight belong to their own day
+                for (user_id, limit_type), (day, _, _) in counts.items():
+                    if day != now_day and (user_id, limit_type) not in existing:
+                        UsageTracker.objects.filter(user_id=user_id, limit_type=limit_type).update(
+                            last_daily_reset=day, last_monthly_reset=day)
+        return len(to_update) + len(to_create)
+
+
+# Global instance
+usage_counters = UsageCounterStore()
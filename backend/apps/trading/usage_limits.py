@@ -11,11 +11,13 @@ from dataclasses import dataclass
 from enum import Enum
 
 from django.db import models, transaction
+from django.conf import settings
 from django.utils import timezone
 from django.core.cache import cache
 from django.contrib.auth import get_user_model
 
 from .models import TradingSignal, TradingStrategy, AutomatedTradeExecution, LimitType, UsageTracker
+from .usage_counters import usage_counters
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -65,8 +67,15 @@ class SubscriptionLimitService:
         support_level='phone_priority'
     )
     
+    # Limits on current state rather than on a running count
+    GAUGE_LIMIT_TYPES = (LimitType.ACTIVE_STRATEGIES, LimitType.PORTFOLIO_POSITIONS)
+    DAILY_LIMIT_TYPES = (LimitType.DAILY_SIGNALS, LimitType.DAILY_BACKTESTS, LimitType.API_CALLS_DAILY)
+    MONTHLY_LIMIT_TYPES = (LimitType.MONTHLY_SIGNALS, LimitType.MONTHLY_BACKTESTS, LimitType.DATA_EXPORT_MONTHLY)
+    
     def __init__(self):
         self.cache_timeout = 3600  # 1 hour cache
+        # Gauge counts are invalidated on strategy/position writes; the timeout is a backstop
+        self.gauge_timeout = getattr(settings, 'USAGE_GAUGE_CACHE_TTL', 300)
     
     def get_user_limits(self, user: User) -> SubscriptionLimits:
         """Get limits for a user - all users get ELITE limits"""
@@ -80,13 +89,13 @@ class SubscriptionLimitService:
             defaults={
                 'daily_count': 0,
                 'monthly_count': 0,
-                'last_daily_reset': timezone.now().date(),
-                'last_monthly_reset': timezone.now().date()
+                'last_daily_reset': timezone.localdate(),
+                'last_monthly_reset': timezone.localdate()
             }
         )
         
         # Reset counters if needed
-        today = timezone.now().date()
+        today = timezone.localdate()
         
         # Daily reset
         if tracker.last_daily_reset < today:
@@ -103,50 +112,71 @@ class SubscriptionLimitService:
         
         return tracker
     
-    def check_limit(self, user: User, limit_type: LimitType, is_daily: bool = True) -> Tuple[bool, int, int]:
-        """
-        Check if user has exceeded limits
-        Returns: (is_allowed, current_usage, limit)
-        """
-        limits = self.get_user_limits(user)
-        tracker = self.get_or_create_tracker(user, limit_type)
+    def get_limit(self, limits: SubscriptionLimits, limit_type: LimitType, is_daily: bool = True) -> int:
+        """Configured limit for ``limit_type`` (-1 means unlimited)"""
+        if limit_type == LimitType.ACTIVE_STRATEGIES:
+            return limits.active_strategies
+        if limit_type == LimitType.PORTFOLIO_POSITIONS:
+            return limits.portfolio_positions
         
-        # Get the appropriate limit and current usage
         if is_daily:
-            current_usage = tracker.daily_count
             if limit_type == LimitType.DAILY_SIGNALS:
-                limit = limits.daily_signals
+                return limits.daily_signals
             elif limit_type == LimitType.DAILY_BACKTESTS:
-                limit = limits.daily_backtests
+                return limits.daily_backtests
             elif limit_type == LimitType.API_CALLS_DAILY:
-                limit = limits.api_calls_daily
-            else:
-                limit = -1  # Default unlimited for daily
-        else:
-            current_usage = tracker.monthly_count
-            if limit_type == LimitType.MONTHLY_SIGNALS:
-                limit = limits.monthly_signals
-            elif limit_type == LimitType.MONTHLY_BACKTESTS:
-                limit = limits.monthly_backtests
-            elif limit_type == LimitType.DATA_EXPORT_MONTHLY:
-                limit = limits.data_export_monthly
-            else:
-                limit = -1  # Default unlimited for monthly
+                return limits.api_calls_daily
+            return -1  # Default unlimited for daily
+        
+        if limit_type == LimitType.MONTHLY_SIGNALS:
+            return limits.monthly_signals
+        elif limit_type == LimitType.MONTHLY_BACKTESTS:
+            return limits.monthly_backtests
+        elif limit_type == LimitType.DATA_EXPORT_MONTHLY:
+            return limits.data_export_monthly
+        return -1  # Default unlimited for monthly
+    
+    def _gauge_key(self, user_id, limit_type: LimitType) -> str:
+        return f"usage_gauge:{limit_type.value}:{user_id}"
+    
+    def get_gauge(self, user: User, limit_type: LimitType) -> int:
+        """Current count for a state-based limit (active strategies, open positions), cached"""
+        key = self._gauge_key(user.pk, limit_type)
+        count = cache.get(key)
+        if count is not None:
+            return count
         
-        # For non-time-based limits (like active strategies, portfolio positions)
         if limit_type == LimitType.ACTIVE_STRATEGIES:
-            current_usage = TradingStrategy.objects.filter(
+            count = TradingStrategy.objects.filter(
                 user=user, 
                 status=TradingStrategy.Status.ACTIVE
             ).count()
-            limit = limits.active_strategies
-        elif limit_type == LimitType.PORTFOLIO_POSITIONS:
+        else:
             from .models import PortfolioPosition
-            current_usage = PortfolioPosition.objects.filter(
+            count = PortfolioPosition.objects.filter(
                 user=user,
                 total_quantity__gt=0
             ).count()
-            limit = limits.portfolio_positions
+        cache.set(key, count, timeout=self.gauge_timeout)
+        return count
+    
+    def invalidate_gauges(self, user_id) -> None:
+        cache.delete_many([self._gauge_key(user_id, limit_type) for limit_type in self.GAUGE_LIMIT_TYPES])
+    
+    def check_limit(self, user: User, limit_type: LimitType, is_daily: bool = True) -> Tuple[bool, int, int]:
+        """
+        Check if user has exceeded limits
+        Returns: (is_allowed, current_usage, limit)
+        """
+        limits = self.get_user_limits(user)
+        limit = self.get_limit(limits, limit_type, is_daily)
+        
+        # For non-time-based limits (like active strategies, portfolio positions)
+        if limit_type in self.GAUGE_LIMIT_TYPES:
+            current_usage = self.get_gauge(user, limit_type)
+        else:
+            daily_count, monthly_count = usage_counters.current(user.pk, limit_type.value)
+            current_usage = daily_count if is_daily else monthly_count
         
         # -1 means unlimited
         if limit == -1:
@@ -161,33 +191,45 @@ class SubscriptionLimitService:
         is_allowed, current_usage, limit = self.check_limit(user, limit_type, is_daily)
         
         if not is_allowed:
-            # Calculate reset time
-            if is_daily:
-                reset_time = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-            else:
-                next_month = timezone.now().replace(day=1) + timedelta(days=32)
-                reset_time = next_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
             raise UsageLimitExceeded(
                 limit_type=limit_type.label,
                 current_usage=current_usage,
                 limit=limit,
-                reset_time=reset_time
+                reset_time=self.get_next_reset_time(limit_type, is_daily)
             )
     
-    @transaction.atomic
-    def increment_usage(self, user: User, limit_type: LimitType) -> UsageTracker:
-        """
-        Increment usage counter for user and limit type
+    def acquire_usage(self, user: User, limit_type: LimitType, is_daily: bool = True) -> bool:
         """
-        tracker = self.get_or_create_tracker(user, limit_type)
+        Check the limit and count one use in a single atomic step.
         
-        # Increment counters
-        tracker.daily_count += 1
-        tracker.monthly_count += 1
-        tracker.save()
+        Raises UsageLimitExceeded when the limit is reached. Returns True when a
+        use was counted (state-based limits are only checked), so callers know
+        whether to ``release_usage`` if the work then fails.
+        """
+        if limit_type in self.GAUGE_LIMIT_TYPES:
+            self.enforce_limit(user, limit_type, is_daily)
+            return False
         
-        return tracker
+        limit = self.get_limit(self.get_user_limits(user), limit_type, is_daily)
+        acquired, current_usage = usage_counters.acquire(user.pk, limit_type.value, limit, is_daily)
+        if not acquired:
+            raise UsageLimitExceeded(
+                limit_type=limit_type.label,
+                current_usage=current_usage,
+                limit=limit,
+                reset_time=self.get_next_reset_time(limit_type, is_daily)
+            )
+        return True
+    
+    def release_usage(self, user: User, limit_type: LimitType) -> None:
+        """Give back a use counted by ``acquire_usage``"""
+        usage_counters.release(user.pk, limit_type.value)
+    
+    def increment_usage(self, user: User, limit_type: LimitType) -> int:
+        """
+        Increment usage counter for user and limit type; returns the new daily count
+        """
+        return usage_counters.increment(user.pk, limit_type.value)[1]
     
     def get_usage_summary(self, user: User) -> Dict[str, Any]:
         """Get complete usage summary for a user"""
@@ -212,17 +254,13 @@ class SubscriptionLimitService:
         # Get current usage for all limit types
         for limit_type in LimitType:
             try:
-                tracker = self.get_or_create_tracker(user, limit_type)
-                
-                # Get appropriate current usage
-                if limit_type in [LimitType.DAILY_SIGNALS, LimitType.DAILY_BACKTESTS, LimitType.API_CALLS_DAILY]:
-                    current = tracker.daily_count
-                    is_daily, _, limit = self.check_limit(user, limit_type, is_daily=True)
-                elif limit_type in [LimitType.MONTHLY_SIGNALS, LimitType.MONTHLY_BACKTESTS, LimitType.DATA_EXPORT_MONTHLY]:
-                    current = tracker.monthly_count
-                    is_daily, _, limit = self.check_limit(user, limit_type, is_daily=False)
+                if limit_type in self.DAILY_LIMIT_TYPES or limit_type in self.MONTHLY_LIMIT_TYPES:
+                    is_daily = limit_type in self.DAILY_LIMIT_TYPES
+                    daily_count, monthly_count = usage_counters.current(user.pk, limit_type.value)
+                    current = daily_count if is_daily else monthly_count
+                    limit = self.get_limit(limits, limit_type, is_daily)
                 else:
-                    is_daily, current, limit = self.check_limit(user, limit_type)
+                    _, current, limit = self.check_limit(user, limit_type)
                 
                 summary['current_usage'][limit_type.value] = {
                     'current': current,
@@ -256,6 +294,13 @@ class SubscriptionLimitService:
                 tracker.last_monthly_reset = timezone.now().date()
             
             tracker.save()
+        
+        for limit_type in ([limit_type] if limit_type else LimitType):
+            usage_counters.reset(
+                user.pk, limit_type.value,
+                daily=reset_type in ('daily', 'both'),
+                monthly=reset_type in ('monthly', 'both'),
+            )
     
     def check_feature_access(self, user: User, feature: str) -> bool:
         """Check if user has access to a specific feature"""
@@ -263,8 +308,8 @@ class SubscriptionLimitService:
         return feature in limits.features
     
     def get_next_reset_time(self, limit_type: LimitType, is_daily: bool = True) -> datetime:
-        """Get next reset time for a limit type"""
-        now = timezone.now()
+        """Get next reset time for a limit type (counters roll over at local midnight)"""
+        now = timezone.localtime()
         
         if is_daily:
             return now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
@@ -289,15 +334,23 @@ def enforce_usage_limit(limit_type: LimitType, is_daily: bool = True, increment:
                 return func(request, *args, **kwargs)
             
             try:
-                # Check limit before execution
-                usage_service.enforce_limit(request.user, limit_type, is_daily)
+                # Check and count in one atomic step; unsuccessful requests give the use back
+                if increment:
+                    acquired = usage_service.acquire_usage(request.user, limit_type, is_daily)
+                else:
+                    usage_service.enforce_limit(request.user, limit_type, is_daily)
+                    acquired = False
                 
                 # Execute function
-                result = func(request, *args, **kwargs)
+                try:
+                    result = func(request, *args, **kwargs)
+                except Exception:
+                    if acquired:
+                        usage_service.release_usage(request.user, limit_type)
+                    raise
                 
-                # Increment usage after successful execution
-                if increment and hasattr(result, 'status_code') and 200 <= result.status_code < 300:
-                    usage_service.increment_usage(request.user, limit_type)
+                if acquired and not (hasattr(result, 'status_code') and 200 <= result.status_code < 300):
+                    usage_service.release_usage(request.user, limit_type)
                 
                 return result
                 
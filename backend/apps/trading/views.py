@@ -1,6 +1,8 @@
+import json
 import asyncio
 import logging
 from datetime import datetime, timedelta
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import status, generics, permissions
@@ -8,7 +10,8 @@ from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Sum
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
@@ -34,9 +37,14 @@ from .serializers import (
 )
 from .services import TradingEngine, SignalGenerator, PerformanceAnalyzer
 from .market_analysis import (
-    market_analysis_engine, generate_signal_for_symbol, 
-    generate_signals_for_symbols, get_market_sentiment
+    market_analysis_engine, generate_signal_for_symbol, get_market_sentiment
 )
+from .backtesting import vectorized_backtester
+from .option_chain_snapshots import option_chain_snapshots
+from .performance_rollups import performance_rollups
+from .signal_analytics import signal_analytics
+from .signal_pipeline import signal_pipeline
+from .trade_export import TradeHistoryExporter, EXPORT_FORMATS, PARQUET_AVAILABLE
 from .reporting import (
     TradingReportGenerator, generate_user_performance_report,
     generate_strategy_performance_report
@@ -51,6 +59,10 @@ from .portfolio_aggregation import (
 )
 
 
+MAX_BACKTEST_SYMBOLS = 200
+MAX_SIGNAL_SYMBOLS = 200
+
+
 class TradingSignalViewSet(ModelViewSet):
     """ViewSet for trading signals management"""
     serializer_class = TradingSignalSerializer
@@ -308,36 +320,8 @@ def dashboard(request):
     # Get recent orders
     recent_orders = TradingOrder.objects.filter(user=user).order_by('-order_timestamp')[:10]
     
-    # Calculate statistics
-    today = timezone.now().date()
-    total_signals = TradingSignal.objects.filter(user=user).count()
-    executed_signals = TradingSignal.objects.filter(user=user, executed=True).count()
-    pending_orders = TradingOrder.objects.filter(
-        user=user,
-        status__in=[TradingOrder.OrderStatus.PENDING, TradingOrder.OrderStatus.OPEN]
-    ).count()
-    
-    # Today's statistics
-    today_signals = TradingSignal.objects.filter(
-        user=user,
-        timestamp__date=today
-    ).count()
-    
-    today_executed = TradingSignal.objects.filter(
-        user=user,
-        timestamp__date=today,
-        executed=True
-    ).count()
-    
     dashboard_data = {
-        'statistics': {
-            'total_signals': total_signals,
-            'executed_signals': executed_signals,
-            'execution_rate': round((executed_signals / total_signals * 100) if total_signals > 0 else 0, 1),
-            'pending_orders': pending_orders,
-            'today_signals': today_signals,
-            'today_executed': today_executed
-        },
+        'statistics': signal_analytics.dashboard_statistics(user),
         'recent_signals': TradingSignalSerializer(recent_signals, many=True).data,
         'recent_orders': TradingOrderSerializer(recent_orders, many=True).data
     }
@@ -386,75 +370,19 @@ def signals_analytics(request):
     end_date = timezone.now()
     start_date = end_date - timedelta(days=days)
     
-    signals = TradingSignal.objects.filter(
-        user=user,
-        timestamp__gte=start_date,
-        timestamp__lte=end_date
-    )
-    
-    # Strategy performance
-    strategy_stats = []
-    strategies = signals.values_list('strategy_name', flat=True).distinct()
-    
-    for strategy in strategies:
-        strategy_signals = signals.filter(strategy_name=strategy)
-        total_signals = strategy_signals.count()
-        executed_signals = strategy_signals.filter(executed=True).count()
-        avg_confidence = strategy_signals.aggregate(
-            avg_confidence=models.Avg('confidence_score')
-        )['avg_confidence'] or 0
-        
-        strategy_stats.append({
-            'strategy_name': strategy,
-            'total_signals': total_signals,
-            'executed_signals': executed_signals,
-            'execution_rate': round((executed_signals / total_signals * 100) if total_signals > 0 else 0, 1),
-            'avg_confidence': round(float(avg_confidence), 2)
-        })
-    
-    # Signal type distribution
-    signal_types = signals.values('signal_type').annotate(
-        count=Count('signal_type')
-    ).order_by('-count')
-    
-    # Confidence score distribution
-    confidence_ranges = [
-        {'range': '0.6-0.7', 'count': signals.filter(confidence_score__gte=0.6, confidence_score__lt=0.7).count()},
-        {'range': '0.7-0.8', 'count': signals.filter(confidence_score__gte=0.7, confidence_score__lt=0.8).count()},
-        {'range': '0.8-0.9', 'count': signals.filter(confidence_score__gte=0.8, confidence_score__lt=0.9).count()},
-        {'range': '0.9-1.0', 'count': signals.filter(confidence_score__gte=0.9, confidence_score__lte=1.0).count()}
-    ]
-    
-    # Top performing symbols
-    symbol_performance = []
-    symbols = signals.values_list('symbol', flat=True).distinct()[:10]  # Top 10
-    
-    for symbol in symbols:
-        symbol_signals = signals.filter(symbol=symbol)
-        total_signals = symbol_signals.count()
-        executed_signals = symbol_signals.filter(executed=True).count()
-        avg_confidence = symbol_signals.aggregate(
-            avg_confidence=models.Avg('confidence_score')
-        )['avg_confidence'] or 0
-        
-        symbol_performance.append({
-            'symbol': symbol,
-            'total_signals': total_signals,
-            'executed_signals': executed_signals,
-            'avg_confidence': round(float(avg_confidence), 2)
-        })
+    analytics = signal_analytics.signals_analytics(user, days)
     
     return Response({
-        'strategy_performance': strategy_stats,
-        'signal_types': list(signal_types),
-        'confidence_distribution': confidence_ranges,
-        'top_symbols': sorted(symbol_performance, key=lambda x: x['total_signals'], reverse=True)[:10],
+        'strategy_performance': analytics['strategy_performance'],
+        'signal_types': analytics['signal_types'],
+        'confidence_distribution': analytics['confidence_distribution'],
+        'top_symbols': analytics['top_symbols'],
         'period': {
             'start_date': start_date.isoformat(),
             'end_date': end_date.isoformat(),
             'days': days
         },
-        'total_signals': signals.count()
+        'total_signals': analytics['total_signals']
     })
 
 
@@ -583,43 +511,28 @@ def option_chain(request, underlying_symbol):
         )
     
     try:
-        # Get all options for the underlying and expiry
-        options = FuturesOptionsData.objects.filter(
-            underlying_symbol=underlying_symbol,
-            instrument_type=FuturesOptionsData.InstrumentType.OPTIONS,
-            expiry_date=expiry_date,
-            is_active=True
-        ).order_by('strike_price', 'option_type')
-        
-        # Group by strike price
-        strikes = {}
-        for option in options:
-            strike = float(option.strike_price)
-            if strike not in strikes:
-                strikes[strike] = {'call': None, 'put': None}
-            
-            option_data = FuturesOptionsDataSerializer(option).data
-            if option.option_type == 'CALL':
-                strikes[strike]['call'] = option_data
-            else:
-                strikes[strike]['put'] = option_data
-        
-        # Format response
-        chain_data = {
-            'underlying_symbol': underlying_symbol,
-            'underlying_price': 0,  # Would be fetched from market data
-            'expiry_date': expiry_date,
-            'strikes': strikes,
-            'strike_prices': sorted(strikes.keys())
-        }
-        
-        return Response(chain_data)
-        
+        # Served from the pre-serialized snapshot (built on first request)
+        blob = option_chain_snapshots.get_blob(underlying_symbol, expiry_date)
+    except ValueError:
+        return Response(
+            {'error': 'expiry_date must be in YYYY-MM-DD format'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     except Exception as e:
         return Response(
             {'error': f'Failed to fetch option chain: {str(e)}'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+    
+    if blob is None:
+        blob = json.dumps({
+            'underlying_symbol': underlying_symbol,
+            'underlying_price': 0,
+            'expiry_date': expiry_date,
+            'strikes': {},
+            'strike_prices': []
+        })
+    return HttpResponse(blob, content_type='application/json')
 
 
 @api_view(['GET'])
@@ -1038,18 +951,17 @@ def _compute_automation_stats_for_user(user):
         status=TradeApproval.Status.PENDING
     ).count()
 
-    total_pnl_today = sum(exec.total_pnl for exec in executions_today)
+    total_pnl_today = executions_today.aggregate(total=Sum('total_pnl'))['total'] or 0
 
     open_positions = PortfolioPosition.objects.filter(
         user=user,
         total_quantity__gt=0
     ).count()
 
-    total_executions = AutomatedTradeExecution.objects.filter(strategy__user=user).count()
-    successful_executions = AutomatedTradeExecution.objects.filter(
-        strategy__user=user,
-        status=AutomatedTradeExecution.ExecutionStatus.COMPLETED
-    ).count()
+    # Lifetime counts from the daily rollups plus today's executions
+    lifetime = performance_rollups.totals(user.pk)
+    total_executions = lifetime.executions_count
+    successful_executions = lifetime.completed_executions
 
     automation_success_rate = (successful_executions / total_executions * 100) if total_executions > 0 else 0
 
@@ -1175,15 +1087,15 @@ def generate_market_signals(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    if len(symbols) > 20:  # Limit to prevent abuse
+    if len(symbols) > MAX_SIGNAL_SYMBOLS:  # Limit to prevent abuse
         return Response(
-            {'error': 'Maximum 20 symbols allowed per request'},
+            {'error': f'Maximum {MAX_SIGNAL_SYMBOLS} symbols allowed per request'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
     try:
-        # Generate signals using market analysis engine
-        signals = generate_signals_for_symbols(symbols, request.user, strategy_name)
+        # Generate signals using the batch pipeline (concurrent fetch, pooled compute, bulk write)
+        signals, timings = signal_pipeline.generate_signals(symbols, request.user, strategy_name)
         
         # Serialize the generated signals
         serializer = TradingSignalSerializer(signals, many=True)
@@ -1192,7 +1104,8 @@ def generate_market_signals(request):
             'message': f'Generated {len(signals)} signals from {len(symbols)} symbols analyzed',
             'signals_generated': len(signals),
             'symbols_analyzed': len(symbols),
-            'signals': serializer.data
+            'signals': serializer.data,
+            'timings': timings.to_dict()
         }, status=status.HTTP_201_CREATED)
         
     except Exception as e:
@@ -1271,8 +1184,8 @@ def market_data_analysis(request, symbol):
     """Get detailed market data analysis for a specific symbol"""
     try:
         # Fetch market data and technical indicators
-        df = market_analysis_engine.fetch_market_data(symbol.upper())
-        indicators = market_analysis_engine.technical_analyzer.calculate_indicators(df)
+        df, series = market_analysis_engine.get_indicator_series(symbol.upper())
+        indicators = market_analysis_engine.latest_indicators(series)
         
         # Get rule-based analysis
         signal_type, confidence, signal_components = market_analysis_engine.rule_analyzer.generate_signal(indicators)
@@ -1387,7 +1300,7 @@ def popular_symbols(request):
 @permission_classes([IsAuthenticated])
 @enforce_usage_limit(LimitType.DAILY_BACKTESTS, is_daily=True)
 def backtest_strategy(request):
-    """Backtest a trading strategy (simplified version)"""
+    """Backtest the rule-based strategy with ATR target/stop exits"""
     symbols = request.data.get('symbols', [])
     strategy_name = request.data.get('strategy_name', 'Market Analysis Engine')
     period_days = int(request.data.get('period_days', 30))
@@ -1398,76 +1311,21 @@ def backtest_strategy(request):
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    if len(symbols) > 10:  # Limit for performance
+    if len(symbols) > MAX_BACKTEST_SYMBOLS:  # Limit for performance
         return Response(
-            {'error': 'Maximum 10 symbols allowed for backtesting'},
+            {'error': f'Maximum {MAX_BACKTEST_SYMBOLS} symbols allowed for backtesting'},
             status=status.HTTP_400_BAD_REQUEST
         )
     
     try:
-        # Simple backtest simulation
-        backtest_results = []
-        total_trades = 0
-        winning_trades = 0
-        total_returns = 0
+        # Indicators are computed once per symbol and every bar is evaluated
+        symbol_results = vectorized_backtester.run_symbols(symbols, period_days)
+        backtest_results = [result.summary() for result in symbol_results]
         
-        for symbol in symbols:
-            try:
-                # Fetch historical data
-                df = market_analysis_engine.fetch_market_data(symbol, period=f"{period_days + 30}d")
-                
-                # Simulate strategy performance
-                symbol_trades = 0
-                symbol_wins = 0
-                symbol_returns = 0
-                
-                # Simple simulation: analyze every 5 days
-                for i in range(20, len(df), 5):
-                    subset_df = df.iloc[:i]
-                    indicators = market_analysis_engine.technical_analyzer.calculate_indicators(subset_df)
-                    signal_type, confidence, _ = market_analysis_engine.rule_analyzer.generate_signal(indicators)
-                    
-                    if signal_type in ['BUY', 'SELL'] and confidence > 0.6:
-                        symbol_trades += 1
-                        total_trades += 1
-                        
-                        # Simulate outcome (simplified)
-                        entry_price = df.iloc[i]['Close']
-                        exit_price = df.iloc[min(i + 3, len(df) - 1)]['Close']  # Hold for 3 days
-                        
-                        if signal_type == 'BUY':
-                            trade_return = (exit_price - entry_price) / entry_price
-                        else:  # SELL
-                            trade_return = (entry_price - exit_price) / entry_price
-                        
-                        symbol_returns += trade_return
-                        total_returns += trade_return
-                        
-                        if trade_return > 0:
-                            symbol_wins += 1
-                            winning_trades += 1
-                
-                win_rate = (symbol_wins / symbol_trades * 100) if symbol_trades > 0 else 0
-                avg_return = (symbol_returns / symbol_trades * 100) if symbol_trades > 0 else 0
-                
-                backtest_results.append({
-                    'symbol': symbol,
-                    'trades': symbol_trades,
-                    'win_rate': round(win_rate, 1),
-                    'avg_return_pct': round(avg_return, 2),
-                    'total_return_pct': round(symbol_returns * 100, 2)
-                })
-                
-            except Exception as e:
-                logger.warning(f"Error backtesting {symbol}: {e}")
-                backtest_results.append({
-                    'symbol': symbol,
-                    'trades': 0,
-                    'win_rate': 0,
-                    'avg_return_pct': 0,
-                    'total_return_pct': 0,
-                    'error': str(e)
-                })
+        all_returns = np.concatenate([result.trade_returns for result in symbol_results]) if symbol_results else np.array([])
+        total_trades = len(all_returns)
+        winning_trades = int((all_returns > 0).sum())
+        total_returns = float(all_returns.sum())
         
         # Calculate overall metrics
         overall_win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
@@ -1707,9 +1565,24 @@ def monthly_performance(request):
 @permission_classes([IsAuthenticated])
 @enforce_usage_limit(LimitType.DATA_EXPORT_MONTHLY, is_daily=False)
 def trade_history_export(request):
-    """Export detailed trade history with analytics"""
+    """
+    Export detailed trade history with analytics
+    
+    Streams rows as they are read; ``export_format`` selects json (default),
+    csv, ndjson or parquet.
+    """
     try:
-        reporter = TradingReportGenerator(user=request.user)
+        export_format = request.query_params.get('export_format', 'json').lower()
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {'error': f"Unsupported export format '{export_format}'. Use one of: {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if export_format == 'parquet' and not PARQUET_AVAILABLE:
+            return Response(
+                {'error': 'Parquet export is not available on this server'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
         # Parse date filters
         start_date = request.query_params.get('start_date')
@@ -1721,46 +1594,13 @@ def trade_history_export(request):
         if end_date:
             end_date = datetime.fromisoformat(end_date.replace('Z', '+00:00'))
         
-        # Get trade history
-        trade_df = reporter.get_trade_history(start_date, end_date)
-        
-        if trade_df.empty:
-            return Response({
-                'message': 'No trades found for the specified period',
-                'trades': [],
-                'summary': {}
-            })
-        
-        # Convert to list of dictionaries
-        trades_list = trade_df.to_dict('records')
-        
-        # Convert timestamps to ISO format
-        for trade in trades_list:
-            if trade.get('entry_date'):
-                trade['entry_date'] = trade['entry_date'].isoformat()
-            if trade.get('exit_date'):
-                trade['exit_date'] = trade['exit_date'].isoformat()
-        
-        # Generate summary
-        summary = {
-            'total_trades': len(trades_list),
-            'winning_trades': len([t for t in trades_list if t['is_winner']]),
-            'total_pnl': sum(t['pnl'] for t in trades_list),
-            'avg_pnl_per_trade': sum(t['pnl'] for t in trades_list) / len(trades_list),
-            'best_trade': max(t['pnl'] for t in trades_list),
-            'worst_trade': min(t['pnl'] for t in trades_list),
-            'avg_confidence': sum(t['confidence_score'] for t in trades_list) / len(trades_list)
-        }
-        
-        return Response({
-            'trades': trades_list,
-            'summary': summary,
-            'export_date': timezone.now().isoformat(),
-            'date_range': {
-                'start_date': start_date.isoformat() if start_date else None,
-                'end_date': end_date.isoformat() if end_date else None
-            }
-        })
+        exporter = TradeHistoryExporter(user=request.user, start_date=start_date, end_date=end_date)
+        response = StreamingHttpResponse(exporter.stream(export_format), content_type=EXPORT_FORMATS[export_format])
+        if export_format != 'json':
+            filename = f"trade_history_{timezone.now():%Y%m%d_%H%M%S}.{export_format}"
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Accel-Buffering'] = 'no'  # Let proxies pass the first bytes straight through
+        return response
         
     except ValueError as e:
         return Response(
@@ -1820,7 +1660,7 @@ def risk_analysis(request):
                 'alpha_pct': round(risk_metrics.portfolio_alpha * 100, 2) if risk_metrics.portfolio_alpha else None,
                 'tracking_error_pct': round(risk_metrics.tracking_error * 100, 2) if risk_metrics.tracking_error else None
             },
-            'risk_grade': self._calculate_risk_grade(performance_metrics, risk_metrics),
+            'risk_grade': _calculate_risk_grade(performance_metrics, risk_metrics),
             'generated_at': timezone.now().isoformat()
         }
         
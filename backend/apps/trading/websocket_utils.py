@@ -162,6 +162,21 @@ class WebSocketNotifier:
         
         self._send_to_group(f"fno_{user_id}", message)
     
+    def send_fno_chain_greeks_update(self, user_id: str, underlying: str, spot: float,
+                                     contracts: List[Dict[str, Any]]):
+        """Price a set of option contracts in one vectorized pass and send their Greeks"""
+        from .option_pricing import contract_greeks
+        
+        greeks = contract_greeks(spot, contracts)
+        self.send_fno_greeks_update(user_id, {
+            'underlying': underlying,
+            'underlying_price': spot,
+            'contracts': [
+                {**contract, 'greeks': contract_greeks_row}
+                for contract, contract_greeks_row in zip(contracts, greeks)
+            ],
+        })
+    
     def send_fno_volatility_update(self, user_id: str, volatility_data: Dict[str, Any]):
         """Send F&O volatility update"""
         prepared_data = self._prepare_message_data(volatility_data)
@@ -154,6 +154,14 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.ai_studio.tasks.cleanup_old_models',
         'schedule': 86400.0,  # Every day
     },
+    'flush-usage-counters': {
+        'task': 'apps.trading.tasks.flush_usage_counters',
+        'schedule': 60.0,  # Every minute
+    },
+    'maintain-log-partitions': {
+        'task': 'apps.audit.tasks.maintain_log_partitions',
+        'schedule': 86400.0,  # Every day
+    },
 }
 
 # Note: Redis configuration and fallbacks are handled in base.py and celery.py
\ No newline at end of file
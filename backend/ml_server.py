@@ -5,8 +5,11 @@ Fast API server for real-time model predictions
 import os
 import json
 import logging
+import time
 import asyncio
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
@@ -19,6 +22,8 @@ from pydantic import BaseModel, Field
 import joblib
 import pickle
 
+from apps.ai_studio.model_artifacts import ModelArtifactStore
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -47,6 +52,10 @@ model_metadata = {}
 MODEL_PATH = os.getenv("MODEL_PATH", "/app/ml_models")
 MAX_CACHE_SIZE = int(os.getenv("MAX_CACHE_SIZE", "10"))
 PREDICTION_TIMEOUT = int(os.getenv("PREDICTION_TIMEOUT", "30"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "5"))
+BATCH_MAX_QUEUE = int(os.getenv("BATCH_MAX_QUEUE", "5000"))
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(4, os.cpu_count() or 1))))
 
 
 class PredictionRequest(BaseModel):
@@ -102,6 +111,7 @@ class HealthResponse(BaseModel):
     timestamp: datetime
     models_loaded: int
     cache_usage: float
+    queue_depth: int = 0
 
 
 class ModelLoader:
@@ -159,31 +169,51 @@ class ModelManager:
         self.metadata = model_metadata
         self.max_cache_size = MAX_CACHE_SIZE
         self.usage_stats = {}
+        self.artifacts = ModelArtifactStore(MODEL_PATH)
+        self.versions = {}
     
     def get_model(self, model_id: str):
         """Get model from cache or load it"""
-        if model_id in self.cache:
+        # Artifact version written by the Django side (None for legacy single files)
+        version = self.artifacts.current_version(model_id)
+        if model_id in self.cache and self.versions.get(model_id) == version:
             # Update usage stats
             self._update_usage_stats(model_id)
             return self.cache[model_id]
         
-        # Load model
-        model_path = self._find_model_file(model_id)
-        if not model_path:
-            raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
-        
-        # Load model and metadata
-        model = ModelLoader.load_model(model_path)
-        metadata_path = model_path.replace(Path(model_path).suffix, '_metadata.json')
-        metadata = ModelLoader.load_metadata(metadata_path)
+        if version is not None:
+            # Memory-mapped: processes serving the same version share its arrays
+            try:
+                model, manifest = self.artifacts.load(model_id, version)
+            except Exception as e:
+                logger.error(f"Error loading model artifact {model_id} v{version}: {str(e)}")
+                raise HTTPException(status_code=500, detail=f"Failed to load model: {str(e)}")
+            metadata = {
+                'features': manifest.feature_names,
+                'model_type': manifest.model_type or manifest.model_class or 'unknown',
+                'target': manifest.target_variable or 'unknown',
+                'timestamp': manifest.created_at,
+                'version': manifest.version,
+            }
+        else:
+            # Load legacy model file
+            model_path = self._find_model_file(model_id)
+            if not model_path:
+                raise HTTPException(status_code=404, detail=f"Model {model_id} not found")
+            
+            # Load model and metadata
+            model = ModelLoader.load_model(model_path)
+            metadata_path = model_path.replace(Path(model_path).suffix, '_metadata.json')
+            metadata = ModelLoader.load_metadata(metadata_path)
         
         # Add to cache
         self._add_to_cache(model_id, model, metadata)
+        self.versions[model_id] = version
         
         return model
     
     def _find_model_file(self, model_id: str) -> Optional[str]:
-        """Find model file by ID"""
+        """Find a legacy single-file model (saved before model artifacts) by ID"""
         model_dir = Path(MODEL_PATH)
         
         # Look for files starting with model_id
@@ -205,13 +235,14 @@ class ModelManager:
     def _add_to_cache(self, model_id: str, model: Any, metadata: Dict[str, Any]):
         """Add model to cache with LRU eviction"""
         
-        # Remove old models if cache is full
-        if len(self.cache) >= self.max_cache_size:
+        # Remove old models if cache is full (a new version replaces its predecessor in place)
+        if model_id not in self.cache and len(self.cache) >= self.max_cache_size:
             # Remove least recently used model
             lru_model_id = min(self.usage_stats.keys(), key=lambda x: self.usage_stats[x]['last_used'])
             del self.cache[lru_model_id]
             del self.metadata[lru_model_id]
             del self.usage_stats[lru_model_id]
+            self.versions.pop(lru_model_id, None)
             logger.info(f"Evicted model {lru_model_id} from cache")
         
         # Add new model
@@ -269,50 +300,219 @@ model_manager = ModelManager()
 
 def preprocess_features(features: Dict[str, float], model_id: str) -> np.ndarray:
     """Preprocess features for prediction"""
+    return preprocess_batch([features], model_id)
+
+
+def preprocess_batch(features_list: List[Dict[str, float]], model_id: str) -> np.ndarray:
+    """Build the (rows x features) input matrix in one allocation"""
     
     # Get model metadata to understand expected features
     metadata = model_metadata.get(model_id, {})
     expected_features = metadata.get('features', [])
     
     if expected_features:
-        # Ensure all expected features are present
-        processed_features = []
-        for feature in expected_features:
-            if feature in features:
-                processed_features.append(features[feature])
-            else:
-                # Use default value (0.0) for missing features
-                processed_features.append(0.0)
-        
-        return np.array([processed_features])
+        # Expected feature order; missing features default to 0.0
+        width = len(expected_features)
+        values = (features.get(feature, 0.0) for features in features_list for feature in expected_features)
+        return np.fromiter(values, dtype=np.float64, count=len(features_list) * width).reshape(-1, width)
     else:
         # If no metadata, use features as provided
-        return np.array([list(features.values())])
+        return np.array([list(features.values()) for features in features_list], dtype=np.float64)
+
+
+def run_inference(model: Any, features: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Predict a feature matrix in one call.
+
+    Classifiers run predict_proba once and take the label as the most
+    probable class; everything else falls back to predict.
+    """
+    if hasattr(model, 'predict_proba') and hasattr(model, 'classes_'):
+        probabilities = np.asarray(model.predict_proba(features))
+        predictions = np.asarray(model.classes_)[np.argmax(probabilities, axis=1)]
+        return predictions, probabilities
+    if hasattr(model, 'predict'):
+        return np.asarray(model.predict(features)), None
+    raise HTTPException(status_code=500, detail="Model does not support prediction")
+
+
+def to_python(value: Any) -> Any:
+    """numpy scalars/arrays to JSON-serialisable values"""
+    return value.tolist() if hasattr(value, 'tolist') else value
+
+
+@dataclass
+class BatcherStats:
+    """Counters since process start"""
+    requests: int = 0
+    rejected: int = 0
+    batches: int = 0
+    rows: int = 0
+    max_batch_size: int = 0
+    failed_batches: int = 0
+    inference_time_ms: float = 0.0
+
+
+@dataclass
+class PendingPrediction:
+    features: np.ndarray  # one row
+    future: asyncio.Future
+    model: Any = field(repr=False)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single-row predictions into one matrix per model.
+
+    Requests queue per (model_id, model, width). A queue is flushed as soon as
+    it holds BATCH_MAX_SIZE rows or BATCH_MAX_WAIT_MS after its first row
+    arrived, and each batch runs on a dedicated thread pool whose size also
+    caps the number of batches in flight; rows that arrive while all workers
+    are busy wait in the queue and go out together in the next batch.
+    """
+
+    def __init__(self, max_batch_size: int = BATCH_MAX_SIZE, max_wait_ms: float = BATCH_MAX_WAIT_MS,
+                 workers: int = INFERENCE_WORKERS, max_queue: int = BATCH_MAX_QUEUE):
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait_ms / 1000
+        self.workers = max(workers, 1)
+        self.max_queue = max_queue
+        self.stats = BatcherStats()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+        self._queues: Dict[tuple, List[PendingPrediction]] = {}
+        self._timers: Dict[tuple, asyncio.TimerHandle] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight_batches = 0
+        self._in_flight_rows = 0
+
+    async def predict(self, model_id: str, model: Any, features: np.ndarray) -> Tuple[Any, Optional[np.ndarray]]:
+        """Queue one row; returns (prediction, probabilities) for it"""
+        if self.queue_depth() >= self.max_queue:
+            self.stats.rejected += 1
+            raise HTTPException(status_code=503, detail="Prediction queue is full")
+
+        loop = asyncio.get_running_loop()
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+
+        key = (model_id, id(model), features.shape[1])
+        pending = PendingPrediction(features=features[0], future=loop.create_future(), model=model)
+        queue = self._queues.setdefault(key, [])
+        queue.append(pending)
+        self.stats.requests += 1
+
+        if len(queue) >= self.max_batch_size:
+            self._start_flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._start_flush, key)
+
+        return await pending.future
+
+    def _start_flush(self, key: tuple) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        asyncio.ensure_future(self._flush(key))
+
+    async def _flush(self, key: tuple) -> None:
+        async with self._slots:
+            # Taken only once a worker is free, so the batch picks up everything that queued meanwhile
+            queue = self._queues.get(key)
+            if not queue:
+                return
+            batch = [item for item in queue[:self.max_batch_size] if not item.future.done()]
+            del queue[:self.max_batch_size]
+            if queue:
+                self._start_flush(key)
+            else:
+                self._queues.pop(key, None)
+            if not batch:
+                return
+
+            matrix = np.vstack([item.features for item in batch])
+            self._in_flight_batches += 1
+            self._in_flight_rows += len(batch)
+            started = time.perf_counter()
+            try:
+                predictions, probabilities = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, run_inference, batch[0].model, matrix
+                )
+            except Exception as e:
+                self.stats.failed_batches += 1
+                logger.error(f"Batch prediction error for model {key[0]}: {str(e)}")
+                error = e if isinstance(e, HTTPException) else \
+                    HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(error)
+                return
+            finally:
+                self._in_flight_batches -= 1
+                self._in_flight_rows -= len(batch)
+
+            self.stats.batches += 1
+            self.stats.rows += len(batch)
+            self.stats.max_batch_size = max(self.stats.max_batch_size, len(batch))
+            self.stats.inference_time_ms += (time.perf_counter() - started) * 1000
+
+            # Scatter; requests that timed out meanwhile are skipped
+            for index, item in enumerate(batch):
+                if not item.future.done():
+                    item.future.set_result((
+                        predictions[index],
+                        probabilities[index] if probabilities is not None else None,
+                    ))
+
+    def queue_depth(self, model_id: Optional[str] = None) -> int:
+        return sum(len(queue) for key, queue in self._queues.items() if model_id is None or key[0] == model_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        depth_by_model: Dict[str, int] = {}
+        for (model_id, _, _), queue in self._queues.items():
+            depth_by_model[model_id] = depth_by_model.get(model_id, 0) + len(queue)
+        stats = self.stats
+        return {
+            'queue_depth': sum(depth_by_model.values()),
+            'queue_depth_by_model': depth_by_model,
+            'in_flight_batches': self._in_flight_batches,
+            'in_flight_rows': self._in_flight_rows,
+            'requests': stats.requests,
+            'rejected': stats.rejected,
+            'batches': stats.batches,
+            'failed_batches': stats.failed_batches,
+            'average_batch_size': stats.rows / stats.batches if stats.batches else 0.0,
+            'max_batch_size_seen': stats.max_batch_size,
+            'average_batch_time_ms': stats.inference_time_ms / stats.batches if stats.batches else 0.0,
+            'config': {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000,
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+            },
+        }
+
+    def shutdown(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self.executor.shutdown(wait=False)
+
+
+# Global micro-batcher
+micro_batcher = MicroBatcher()
 
 
 async def make_prediction(model: Any, features: np.ndarray, return_probabilities: bool = False) -> tuple:
-    """Make prediction with timeout"""
+    """Predict a whole matrix on the inference pool"""
     
     try:
-        # Run prediction in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
+        prediction, probabilities = await loop.run_in_executor(micro_batcher.executor, run_inference, model, features)
+        return prediction, probabilities if return_probabilities else None
         
-        # Make prediction
-        if hasattr(model, 'predict'):
-            prediction = await loop.run_in_executor(None, model.predict, features)
-        else:
-            raise HTTPException(status_code=500, detail="Model does not support prediction")
-        
-        # Get probabilities if requested
-        probabilities = None
-        if return_probabilities and hasattr(model, 'predict_proba'):
-            probabilities = await loop.run_in_executor(None, model.predict_proba, features)
-            probabilities = probabilities[0]  # Get first sample
-        
-        return prediction, probabilities
-        
-    except asyncio.TimeoutError:
-        raise HTTPException(status_code=408, detail="Prediction timeout")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
@@ -325,10 +525,17 @@ async def health_check():
         status="healthy",
         timestamp=datetime.now(),
         models_loaded=len(model_cache),
-        cache_usage=len(model_cache) / MAX_CACHE_SIZE
+        cache_usage=len(model_cache) / MAX_CACHE_SIZE,
+        queue_depth=micro_batcher.queue_depth()
     )
 
 
+@app.get("/metrics")
+async def metrics():
+    """Micro-batching queue and throughput metrics"""
+    return micro_batcher.metrics()
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(request: PredictionRequest):
     """Make single prediction"""
@@ -342,9 +549,9 @@ async def predict(request: PredictionRequest):
         # Preprocess features
         features = preprocess_features(request.features, request.model_id)
         
-        # Make prediction with timeout
+        # Queue for the next micro-batch of this model
         prediction, probabilities = await asyncio.wait_for(
-            make_prediction(model, features, request.return_probabilities),
+            micro_batcher.predict(request.model_id, model, features),
             timeout=PREDICTION_TIMEOUT
         )
         
@@ -355,12 +562,12 @@ async def predict(request: PredictionRequest):
         # Prepare response
         response = PredictionResponse(
             model_id=request.model_id,
-            prediction=prediction[0] if len(prediction) == 1 else prediction.tolist(),
+            prediction=to_python(prediction),
             timestamp=datetime.now(),
             processing_time_ms=processing_time
         )
         
-        if probabilities is not None:
+        if request.return_probabilities and probabilities is not None:
             response.probability = float(probabilities[1] if len(probabilities) > 1 else probabilities[0])
             response.confidence = float(np.max(probabilities))
         
@@ -382,12 +589,7 @@ async def predict_batch(request: BatchPredictionRequest):
         model = model_manager.get_model(request.model_id)
         
         # Preprocess all features
-        features_list = []
-        for feature_dict in request.features:
-            features = preprocess_features(feature_dict, request.model_id)
-            features_list.append(features[0])  # Extract the feature array
-        
-        features_array = np.array(features_list)
+        features_array = preprocess_batch(request.features, request.model_id)
         
         # Make predictions with timeout
         predictions, probabilities = await asyncio.wait_for(
@@ -447,6 +649,7 @@ async def unload_model(model_id: str):
         del model_metadata[model_id]
         if model_id in model_manager.usage_stats:
             del model_manager.usage_stats[model_id]
+        model_manager.versions.pop(model_id, None)
         logger.info(f"Unloaded model {model_id}")
         return {"message": f"Model {model_id} unloaded"}
     else:
@@ -459,6 +662,8 @@ async def startup_event():
     logger.info(f"Starting ML Server with model path: {MODEL_PATH}")
     logger.info(f"Max cache size: {MAX_CACHE_SIZE}")
     logger.info(f"Prediction timeout: {PREDICTION_TIMEOUT}s")
+    logger.info(f"Micro-batching: up to {BATCH_MAX_SIZE} rows or {BATCH_MAX_WAIT_MS}ms, "
+                f"{INFERENCE_WORKERS} inference workers")
     
     # Preload models if needed
     # This could be configured via environment variables
@@ -469,6 +674,7 @@ async def startup_event():
 async def shutdown_event():
     """Shutdown tasks"""
     logger.info("Shutting down ML Server")
+    micro_batcher.shutdown()
     model_cache.clear()
     model_metadata.clear()
 